@@ -0,0 +1,158 @@
+"""
+Vectorized water sort simulation over a batch of boards with NumPy.
+
+A batch is a `[boards, bottles, capacity]` uint8 array laid out like `PackedState`: each slot holds
+`water_id + 1` or `EMPTY_SLOT`, bottom slot first. Every board in a batch has the same number of
+bottles and the same capacity.
+"""
+from __future__ import annotations
+from packed_state import PackedState, EMPTY_SLOT
+
+import numpy as np
+
+def from_states(states: list[PackedState]) -> np.ndarray:
+  """
+  Args:
+      states (list[PackedState]): The boards to batch.
+
+  Returns:
+      np.ndarray: The `[boards, bottles, capacity]` batch.
+  """
+  capacity = states[0].capacity
+  data = b"".join(state.data for state in states)
+  return np.frombuffer(data, dtype=np.uint8).reshape(len(states), -1, capacity).copy()
+
+def to_states(boards: np.ndarray) -> list[PackedState]:
+  """
+  Args:
+      boards (np.ndarray): The `[boards, bottles, capacity]` batch.
+
+  Returns:
+      list[PackedState]: A packed state for each board.
+  """
+  capacity = boards.shape[2]
+  return [PackedState(board.tobytes(), capacity) for board in boards]
+
+def get_fill_levels(boards: np.ndarray) -> np.ndarray:
+  """
+  Returns:
+      np.ndarray: The `[boards, bottles]` amount of water in each bottle.
+  """
+  return (boards != EMPTY_SLOT).sum(axis=2)
+
+def get_tops(boards: np.ndarray, fill_levels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  """
+  Gets the top water of each bottle.
+
+  Args:
+      boards (np.ndarray): The `[boards, bottles, capacity]` batch.
+      fill_levels (np.ndarray): The fill levels from `get_fill_levels`.
+
+  Returns:
+      tuple[np.ndarray, np.ndarray]: The `[boards, bottles]` slot value of the top water segment
+        (`EMPTY_SLOT` for empty bottles) and its amount.
+  """
+  top_index = np.maximum(fill_levels - 1, 0)
+  tops = np.take_along_axis(boards, top_index[..., None], axis=2)[..., 0]
+  tops = np.where(fill_levels > 0, tops, EMPTY_SLOT)
+
+  # the top segment runs down to just above the highest filled slot of a different water
+  slot_index = np.arange(boards.shape[2])
+  mismatches = (boards != tops[..., None]) & (slot_index < fill_levels[..., None])
+  last_mismatch = np.where(mismatches, slot_index, -1).max(axis=2)
+  top_amounts = np.where(fill_levels > 0, fill_levels - 1 - last_mismatch, 0)
+
+  return tops, top_amounts
+
+def get_legal_moves(boards: np.ndarray) -> np.ndarray:
+  """
+  Gets which moves `move_water_segment` would accept on each board.
+
+  Args:
+      boards (np.ndarray): The `[boards, bottles, capacity]` batch.
+
+  Returns:
+      np.ndarray: A `[boards, from_bottle, to_bottle]` boolean mask of legal moves.
+  """
+  capacity = boards.shape[2]
+  fill_levels = get_fill_levels(boards)
+  tops, _ = get_tops(boards, fill_levels)
+
+  can_pour = fill_levels > 0
+  can_fill = fill_levels < capacity
+  same_top = (tops[:, :, None] == tops[:, None, :]) | (fill_levels[:, None, :] == 0)
+  not_same_bottle = ~np.eye(boards.shape[1], dtype=bool)
+
+  return can_pour[:, :, None] & can_fill[:, None, :] & same_top & not_same_bottle
+
+def apply_moves(boards: np.ndarray, from_indices: np.ndarray, to_indices: np.ndarray) -> np.ndarray:
+  """
+  Applies one move to each board in place. Illegal moves leave their board unchanged.
+
+  Args:
+      boards (np.ndarray): The `[boards, bottles, capacity]` batch.
+      from_indices (np.ndarray): The `[boards]` index of the bottle to remove water from.
+      to_indices (np.ndarray): The `[boards]` index of the bottle to add water to.
+
+  Returns:
+      np.ndarray: The `[boards]` amount of water moved on each board, 0 where the move was illegal.
+  """
+  capacity = boards.shape[2]
+  board_index = np.arange(boards.shape[0])
+  fill_levels = get_fill_levels(boards)
+  tops, top_amounts = get_tops(boards, fill_levels)
+
+  from_fill = fill_levels[board_index, from_indices]
+  to_fill = fill_levels[board_index, to_indices]
+  from_top = tops[board_index, from_indices]
+  to_top = tops[board_index, to_indices]
+
+  legal = (from_fill > 0) & (to_fill < capacity) & (from_indices != to_indices) & ((to_fill == 0) | (to_top == from_top))
+  amounts = np.where(legal, np.minimum(top_amounts[board_index, from_indices], capacity - to_fill), 0)
+
+  # capacity is small, so loop over the slots moved and vectorize over the boards
+  for k in range(capacity):
+    moving = amounts > k
+    moving_boards = board_index[moving]
+    boards[moving_boards, from_indices[moving], from_fill[moving] - 1 - k] = EMPTY_SLOT
+    boards[moving_boards, to_indices[moving], to_fill[moving] + k] = from_top[moving]
+
+  return amounts
+
+def is_solved(boards: np.ndarray) -> np.ndarray:
+  """
+  Checks each board with the `WaterSortPuzzle.is_puzzle_solved` rule: every bottle is empty or full of one water.
+
+  Args:
+      boards (np.ndarray): The `[boards, bottles, capacity]` batch.
+
+  Returns:
+      np.ndarray: The `[boards]` boolean solved flags.
+  """
+  empty = (boards == EMPTY_SLOT).all(axis=2)
+  full_of_one = (boards != EMPTY_SLOT).all(axis=2) & (boards == boards[:, :, :1]).all(axis=2)
+
+  return (empty | full_of_one).all(axis=1)
+
+def sample_legal_moves(boards: np.ndarray, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+  """
+  Picks a uniformly random legal move for each board.
+
+  Args:
+      boards (np.ndarray): The `[boards, bottles, capacity]` batch.
+      rng (np.random.Generator): The random number generator.
+
+  Returns:
+      tuple[np.ndarray, np.ndarray]: The `[boards]` from and to bottle indices, -1 for boards with no legal move.
+  """
+  bottle_count = boards.shape[1]
+  legal = get_legal_moves(boards).reshape(boards.shape[0], -1)
+
+  scores = np.where(legal, rng.random(legal.shape), -1.0)
+  moves = scores.argmax(axis=1)
+  has_move = legal.any(axis=1)
+
+  from_indices = np.where(has_move, moves // bottle_count, -1)
+  to_indices = np.where(has_move, moves % bottle_count, -1)
+
+  return from_indices, to_indices
@@ -0,0 +1,87 @@
+"""
+Compares random play throughput of the NumPy batch simulator against the `Bottle` object model.
+
+Run from the repository root with `python -m benchmarks.bench_batch`.
+"""
+from bottle import Bottle, move_water_segment
+from helpers.bottle_setup import init_bottles, top_off_bottles
+from helpers.shuffle import shuffle_bottles
+from packed_state import PackedState
+import batch_simulator
+
+import numpy as np
+import random
+import time
+
+BOARD_COUNTS = [100, 1_000, 10_000]
+MOVE_COUNT = 50
+OBJECT_BOARD_COUNT = 200
+
+def make_boards(board_count: int) -> list[list[Bottle]]:
+  random.seed(0)
+  boards: list[list[Bottle]] = []
+  for _ in range(board_count):
+    bottles = init_bottles(2, 8, 4, {i: (0, 0, 0) for i in range(8)})
+    shuffle_bottles(bottles, 1000)
+    top_off_bottles(bottles)
+    boards.append(bottles)
+
+  return boards
+
+def get_object_legal_moves(bottles: list[Bottle]) -> list[tuple[int, int]]:
+  moves: list[tuple[int, int]] = []
+  for from_index, from_bottle in enumerate(bottles):
+    if from_bottle.is_empty():
+      continue
+    for to_index, to_bottle in enumerate(bottles):
+      if from_index == to_index or to_bottle.get_remaining_capacity() == 0:
+        continue
+      if to_bottle.is_empty() or to_bottle.get_top_water() == from_bottle.get_top_water():
+        moves.append((from_index, to_index))
+
+  return moves
+
+def bench_objects(boards: list[list[Bottle]]) -> float:
+  """
+  Returns:
+      float: Board moves per second with the object model.
+  """
+  start_time = time.perf_counter()
+  for _ in range(MOVE_COUNT):
+    for bottles in boards:
+      moves = get_object_legal_moves(bottles)
+      if len(moves) > 0:
+        from_index, to_index = random.choice(moves)
+        move_water_segment(bottles[from_index], bottles[to_index])
+
+  return len(boards) * MOVE_COUNT / (time.perf_counter() - start_time)
+
+def bench_batch(boards: np.ndarray) -> float:
+  """
+  Returns:
+      float: Board moves per second with the batch simulator.
+  """
+  rng = np.random.default_rng(0)
+
+  start_time = time.perf_counter()
+  for _ in range(MOVE_COUNT):
+    from_indices, to_indices = batch_simulator.sample_legal_moves(boards, rng)
+    batch_simulator.apply_moves(boards, from_indices, to_indices)
+    batch_simulator.is_solved(boards)
+
+  return boards.shape[0] * MOVE_COUNT / (time.perf_counter() - start_time)
+
+def main() -> None:
+  object_boards = make_boards(OBJECT_BOARD_COUNT)
+  states = [PackedState.from_bottles(bottles) for bottles in object_boards]
+
+  object_rate = bench_objects(object_boards)
+  print(f"object model ({OBJECT_BOARD_COUNT} boards): {object_rate:>12.0f} board-moves/s")
+
+  for board_count in BOARD_COUNTS:
+    boards = batch_simulator.from_states([states[i % len(states)] for i in range(board_count)])
+    batch_rate = bench_batch(boards)
+    print(f"batch simulator ({board_count} boards): {batch_rate:>12.0f} board-moves/s ({batch_rate / object_rate:.1f}x)")
+
+if __name__ == "__main__":
+  main()
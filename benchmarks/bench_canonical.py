@@ -0,0 +1,113 @@
+"""
+Checks that `canonicalize` gives the same form to boards that only differ by bottle order or water ids,
+then counts the states reachable from generated puzzles with and without symmetry canonicalization.
+
+Run from the repository root with `python -m benchmarks.bench_canonical`.
+"""
+from game import get_difficulty_params
+from helpers.bottle_setup import init_bottles, top_off_bottles
+from helpers.canonical import canonicalize
+from helpers.shuffle import shuffle_bottles
+from packed_state import PackedState, EMPTY_SLOT
+
+import random
+import time
+
+# the same layout `game_loop` builds
+WATER_ID_MAP = {i: (0, 0, 0) for i in range(8)}
+BOTTLE_CAPACITY = 4
+EMPTY_BOTTLE_COUNT = 2
+MAX_SHUFFLE_MOVES = 1000
+
+MAX_STATES = 20_000
+PUZZLE_COUNT = 3
+PERMUTED_BOARD_COUNT = 20_000
+
+def permute(state: PackedState) -> PackedState:
+  """
+  Returns:
+      PackedState: `state` with the bottles in a random order and the water ids randomly renamed.
+  """
+  bottles = [state.get_bottle(i) for i in range(state.bottle_count())]
+  random.shuffle(bottles)
+
+  water_ids = list(range(EMPTY_SLOT + 1, 256))
+  random.shuffle(water_ids)
+  table = bytearray(range(256))
+  table[EMPTY_SLOT + 1:] = bytes(water_ids)
+
+  return PackedState(b"".join(water.translate(table).ljust(state.capacity, bytes([EMPTY_SLOT])) for water in bottles), state.capacity)
+
+def check_permuted() -> None:
+  """Canonicalizes random boards and a permuted copy of each, which must get the same form."""
+  mismatches = 0
+  for _ in range(PERMUTED_BOARD_COUNT):
+    colored_bottle_count = random.randint(2, len(WATER_ID_MAP))
+    bottles = init_bottles(EMPTY_BOTTLE_COUNT, colored_bottle_count, BOTTLE_CAPACITY, WATER_ID_MAP)
+    shuffle_bottles(bottles, random.randint(0, MAX_SHUFFLE_MOVES))
+    state = PackedState.from_bottles(bottles)
+    if canonicalize(state) != canonicalize(permute(state)):
+      mismatches += 1
+
+  print(f"{mismatches} of {PERMUTED_BOARD_COUNT} permuted boards got a different canonical form")
+  assert mismatches == 0, "canonicalize depends on the bottle order or water ids"
+
+def count_states(start: PackedState, canonical: bool, max_depth: int | None = None) -> tuple[int, int]:
+  """
+  Counts the distinct states reachable from `start` with a breadth first search. Without a
+  `max_depth` the search stops after the first layer that reaches `MAX_STATES` states.
+
+  Args:
+      start (PackedState): The state to search from.
+      canonical (bool): True to count canonical forms instead of raw states.
+      max_depth (int | None, optional): The number of moves to search. Defaults to None.
+
+  Returns:
+      tuple[int, int]: The number of distinct states found and the depth searched.
+  """
+  get_key = canonicalize if canonical else lambda state: state
+  seen = {get_key(start)}
+  layer = [start]
+  depth = 0
+
+  while len(layer) > 0 and depth != max_depth and (max_depth != None or len(seen) < MAX_STATES):
+    next_layer: list[PackedState] = []
+    for state in layer:
+      for from_index, to_index, _ in state.legal_moves():
+        next_state = state.apply_move(from_index, to_index)
+        key = get_key(next_state)
+        if key not in seen:
+          seen.add(key)
+          next_layer.append(next_state)
+    layer = next_layer
+    depth += 1
+
+  return len(seen), depth
+
+def main() -> None:
+  random.seed(0)
+  check_permuted()
+  names = ["easy", "medium", "hard"]
+
+  for difficulty, name in enumerate(names):
+    colored_bottle_count, shuffle_moves = get_difficulty_params(difficulty, len(WATER_ID_MAP), MAX_SHUFFLE_MOVES)
+    raw_total = 0
+    canonical_total = 0
+    start_time = time.perf_counter()
+
+    for _ in range(PUZZLE_COUNT):
+      bottles = init_bottles(EMPTY_BOTTLE_COUNT, colored_bottle_count, BOTTLE_CAPACITY, WATER_ID_MAP)
+      shuffle_bottles(bottles, shuffle_moves)
+      top_off_bottles(bottles)
+      start = PackedState.from_bottles(bottles)
+
+      raw_count, depth = count_states(start, False)
+      canonical_count, _ = count_states(start, True, depth)
+      raw_total += raw_count
+      canonical_total += canonical_count
+
+    elapsed = time.perf_counter() - start_time
+    print(f"{name:>6}: raw={raw_total:>8} canonical={canonical_total:>8} reduction={raw_total / canonical_total:.2f}x ({elapsed:.1f}s)")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,58 @@
+"""
+Measures how many puzzles per second `difficulty` can rate, with and without the memo of canonical states,
+and how the scores spread across the game's difficulty settings.
+
+Run from the repository root with `python -m benchmarks.bench_difficulty`.
+"""
+from difficulty import DifficultyRater, rate_state
+from helpers.bottle_setup import init_bottles, top_off_bottles
+from helpers.shuffle import shuffle_bottles
+from packed_state import PackedState
+
+import random
+import statistics
+import time
+
+PUZZLE_COUNT = 40
+MAX_NODES = 200_000
+# (colored bottles, shuffle moves) of the game's easy, medium and hard settings for 9 colors
+SETTINGS = [("easy", 3, 333), ("medium", 4, 500), ("hard", 9, 1000)]
+
+def make_states(colored_bottle_count: int, shuffle_moves: int) -> list[PackedState]:
+  random.seed(0)
+  states: list[PackedState] = []
+  while len(states) < PUZZLE_COUNT:
+    bottles = init_bottles(2, colored_bottle_count, 4, {i: (0, 0, 0) for i in range(colored_bottle_count)})
+    shuffle_bottles(bottles, shuffle_moves)
+    top_off_bottles(bottles)
+    state = PackedState.from_bottles(bottles)
+    if not state.is_solved():
+      states.append(state)
+
+  return states
+
+def main() -> None:
+  for name, colored_bottle_count, shuffle_moves in SETTINGS:
+    states = make_states(colored_bottle_count, shuffle_moves)
+
+    start_time = time.perf_counter()
+    ratings = [rate_state(state, max_nodes=MAX_NODES) for state in states]
+    cold_time = time.perf_counter() - start_time
+
+    rater = DifficultyRater(max_nodes=MAX_NODES)
+    for state in states:
+      rater.rate(state)
+
+    start_time = time.perf_counter()
+    for state in states:
+      rater.rate(state)
+    warm_time = time.perf_counter() - start_time
+
+    scores = [rating.score for rating in ratings if rating != None]
+    lengths = [rating.solution_length for rating in ratings if rating != None]
+    print(f"{name:>6}: {len(states) / cold_time:8.1f} ratings/s, {len(states) / warm_time:8.0f} ratings/s memoized ({rater})")
+    if len(scores) > 0:
+      print(f"        score min={min(scores):.1f} median={statistics.median(scores):.1f} max={max(scores):.1f}, moves median={statistics.median(lengths)}, unrated={len(states) - len(scores)}")
+
+if __name__ == "__main__":
+  main()
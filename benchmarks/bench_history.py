@@ -0,0 +1,57 @@
+"""
+Measures the memory held by `WaterSortPuzzle.history` as moves are made and checks the memory per move stays flat.
+
+Run from the repository root with `python -m benchmarks.bench_history`.
+"""
+from water_sort_puzzle import WaterSortPuzzle
+
+import random
+import time
+import tracemalloc
+
+MOVE_COUNT = 10_000
+REPORT_EVERY = 2_000
+# the most the memory per move may grow between the first and the last report
+MAX_GROWTH = 0.10
+
+def main() -> None:
+  random.seed(0)
+  puzzle = WaterSortPuzzle()
+  puzzle.create_bottles(2, 8, 4, {i: (0, 0, 0) for i in range(8)}, 1000)
+  bottle_count = len(puzzle.bottles)
+
+  tracemalloc.start()
+  base_memory, _ = tracemalloc.get_traced_memory()
+  start_time = time.perf_counter()
+
+  bytes_per_move: list[float] = []
+  moves = 0
+  failed_moves = 0
+  while moves < MOVE_COUNT:
+    history_length = len(puzzle.history)
+    puzzle.select_bottle(random.randrange(bottle_count))
+    puzzle.select_bottle(random.randrange(bottle_count))
+    if len(puzzle.history) == history_length:
+      failed_moves += 1
+      # back out of boards with no legal moves left
+      if failed_moves > 1000:
+        puzzle.go_back()
+        failed_moves = 0
+      continue
+
+    moves += 1
+    failed_moves = 0
+    if moves % REPORT_EVERY == 0:
+      memory, _ = tracemalloc.get_traced_memory()
+      bytes_per_move.append((memory - base_memory) / len(puzzle.history))
+      print(f"{moves:>6} moves: {len(puzzle.history):>6} in history, {bytes_per_move[-1]:6.1f} bytes/move")
+
+  elapsed = time.perf_counter() - start_time
+  tracemalloc.stop()
+  print(f"{MOVE_COUNT / elapsed:.0f} moves/s")
+
+  growth = bytes_per_move[-1] / bytes_per_move[0] - 1
+  assert abs(growth) <= MAX_GROWTH, f"memory per move changed by {growth:.0%} from {REPORT_EVERY} to {MOVE_COUNT} moves"
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,43 @@
+"""
+Measures the time to import the model, solver and generator modules in a fresh interpreter
+and checks that none of them load pygame.
+
+Run from the repository root with `python -m benchmarks.bench_import`.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+RUN_COUNT = 10
+MODULES = ["bottle", "helpers.shuffle", "helpers.bottle_setup", "water_sort_puzzle", "solver", "generator", "replay_log", "pygame", "game"]
+
+IMPORT_SCRIPT = """
+import sys, time
+start_time = time.perf_counter()
+import {module}
+print(time.perf_counter() - start_time, "pygame" in sys.modules)
+"""
+
+def time_import(module: str) -> tuple[float, bool]:
+  """
+  Returns:
+      tuple[float, bool]: The median import time in seconds over `RUN_COUNT` fresh interpreters and if pygame was loaded.
+  """
+  times: list[float] = []
+  loads_pygame = False
+  for _ in range(RUN_COUNT):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module)], capture_output=True, text=True, check=True, env={**os.environ, "PYGAME_HIDE_SUPPORT_PROMPT": "1"}).stdout
+    seconds, pygame_loaded = output.split()[-2:]
+    times.append(float(seconds))
+    loads_pygame = pygame_loaded == "True"
+
+  return statistics.median(times), loads_pygame
+
+def main() -> None:
+  for module in MODULES:
+    seconds, loads_pygame = time_import(module)
+    print(f"{module:>22}: {seconds * 1000:7.1f} ms{'  (loads pygame)' if loads_pygame else ''}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,90 @@
+"""
+Compares click hit testing and frame times of the linear `get_mouse_colliding_rect`/`draw_bottles` path
+against `BottleRenderer`'s spatial grid and viewport culling as the bottle count grows.
+
+Run from the repository root with `python -m benchmarks.bench_layout`.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from benchmarks.bench_render import make_bottles, SCREEN_SIZE
+from game import draw_bottles, get_mouse_colliding_rect
+from renderer import BottleRenderer
+from water_wave import wave_cache
+import constants.colors as colors
+
+import pygame
+import random
+import statistics
+import time
+
+BOTTLE_COUNTS = [10, 100, 1_000, 5_000]
+CLICK_COUNT = 2_000
+FRAME_COUNT = 30
+
+def time_clicks(hit_test) -> float:
+  """
+  Returns:
+      float: The mean time of a hit test in microseconds.
+  """
+  random.seed(0)
+  points = [(random.randrange(SCREEN_SIZE[0]), random.randrange(SCREEN_SIZE[1])) for _ in range(CLICK_COUNT)]
+
+  start_time = time.perf_counter()
+  for point in points:
+    hit_test(point)
+
+  return (time.perf_counter() - start_time) / CLICK_COUNT * 1_000_000
+
+def time_frames(render, frame_count: int) -> float:
+  """
+  Returns:
+      float: The median frame time in milliseconds.
+  """
+  times: list[float] = []
+  for frame in range(frame_count):
+    start_time = time.perf_counter()
+    render(frame)
+    times.append(time.perf_counter() - start_time)
+
+  return statistics.median(times) * 1000
+
+def main() -> None:
+  pygame.init()
+  print(f"{'bottles':>8} {'linear click':>13} {'grid click':>11} {'draw_bottles':>13} {'renderer':>9} {'scrolling':>10} {'wave hits':>10}")
+
+  for bottle_count in BOTTLE_COUNTS:
+    bottles = make_bottles(bottle_count)
+    screen = pygame.Surface(SCREEN_SIZE)
+
+    bottle_rects = draw_bottles(screen, bottles, 100, 275)
+    renderer = BottleRenderer(100, 275)
+    renderer.draw(screen, bottles)
+
+    linear_click = time_clicks(lambda point: get_mouse_colliding_rect(point, bottle_rects))
+    grid_click = time_clicks(renderer.get_bottle_at)
+
+    def render_all(frame: int) -> None:
+      screen.fill(colors.BLACK)
+      draw_bottles(screen, bottles, 100, 275)
+
+    def render_culled(frame: int) -> None:
+      renderer.draw(screen, bottles)
+
+    def render_scrolling(frame: int) -> None:
+      renderer.viewport.scroll_by(0, 37 if frame % 20 < 10 else -37)
+      renderer.draw(screen, bottles)
+
+    # drawing every bottle gets slow, fewer frames are enough to see it
+    all_time = time_frames(render_all, max(3, FRAME_COUNT * 10 // bottle_count))
+    culled_time = time_frames(render_culled, FRAME_COUNT)
+    wave_cache.hits = wave_cache.misses = 0
+    scrolling_time = time_frames(render_scrolling, FRAME_COUNT)
+    # a scrolled wave is the same polygon moved on screen, misses only come from waves animating to a new phase or amplitude
+    lookups = wave_cache.hits + wave_cache.misses
+    wave_hits = f"{wave_cache.hits / lookups:.0%}" if lookups > 0 else "-"
+
+    print(f"{bottle_count:>8} {linear_click:>10.2f} us {grid_click:>8.2f} us {all_time:>10.2f} ms {culled_time:>6.2f} ms {scrolling_time:>7.2f} ms {wave_hits:>10}")
+
+if __name__ == "__main__":
+  main()
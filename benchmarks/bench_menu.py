@@ -0,0 +1,73 @@
+"""
+Measures the frame time of the `main_menu` drawing with and without the `GameMenu` text cache.
+
+Runs headless with SDL's dummy video driver. Run from the repository root with
+`python -m benchmarks.bench_menu`.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from game_menu import GameMenu, FONT_SIZE, draw_text
+from water_wave import draw_sin_wave
+import constants.colors as colors
+import pygame
+import time
+
+FRAME_COUNT = 600
+SCREEN_SIZE = (1280, 720)
+
+def draw_menu_uncached(game_menu: GameMenu, surface: pygame.Surface, pos: tuple[int, int], mouse_pos: tuple[int, int]) -> None:
+  """The previous `GameMenu.draw`, which loads fonts and renders every label each frame."""
+  menu_item_font = pygame.font.SysFont(None, FONT_SIZE)
+  title_font = pygame.font.SysFont(None, FONT_SIZE*2)
+
+  x, y = pos
+  draw_text(surface, "Water Sort Puzzle", title_font, colors.GRAY, (x, y))
+  y += FONT_SIZE*2
+  x += 10
+  for menu_item in game_menu.menu_items:
+    rect = draw_text(surface, menu_item.name, menu_item_font, colors.GRAY, (x, y))
+    if rect.collidepoint(mouse_pos):
+      draw_text(surface, menu_item.name, menu_item_font, colors.LIGHT_GRAY, (x, y))
+    y += FONT_SIZE
+
+def run_frames(screen: pygame.Surface, cached: bool) -> float:
+  """
+  Returns:
+      float: The average frame time in milliseconds.
+  """
+  game_menu = GameMenu()
+  menu_start_pos = (screen.get_width()//20, screen.get_height()//20)
+  # hover over the first menu item so the highlighted label is drawn too
+  mouse_pos = (menu_start_pos[0] + 15, menu_start_pos[1] + FONT_SIZE*2 + 5)
+  offset = 1
+  amplitude = 5
+
+  start_time = time.perf_counter()
+  for _ in range(FRAME_COUNT):
+    screen.fill(colors.BLACK)
+    if cached:
+      game_menu.draw(screen, menu_start_pos, mouse_pos=mouse_pos)
+    else:
+      draw_menu_uncached(game_menu, screen, menu_start_pos, mouse_pos)
+
+    pygame.draw.rect(screen, colors.BLUE, (0, screen.get_height()//2, screen.get_width(), screen.get_height()//2 ))
+    draw_sin_wave(screen, screen.get_width(), colors.LIGHT_BLUE, screen.get_height()//2, shift=offset, amplitude=amplitude, spread=7, frequency=0.02)
+    draw_sin_wave(screen, screen.get_width(), colors.LIGHT_BLUE, screen.get_height()//2, shift=1, amplitude=amplitude, spread=7, frequency=0.02)
+    offset += 1/30
+
+  return (time.perf_counter() - start_time) / FRAME_COUNT * 1000
+
+def main() -> None:
+  pygame.init()
+  screen = pygame.Surface(SCREEN_SIZE)
+
+  before = run_frames(screen, cached=False)
+  after = run_frames(screen, cached=True)
+  print(f"uncached: {before:.3f} ms/frame")
+  print(f"  cached: {after:.3f} ms/frame ({before / after:.1f}x)")
+
+  pygame.quit()
+
+if __name__ == "__main__":
+  main()
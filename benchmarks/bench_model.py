@@ -0,0 +1,53 @@
+"""
+Microbenchmarks for the `Bottle` and `Water` model.
+
+Run from the repository root with `python -m benchmarks.bench_model`.
+"""
+from bottle import Bottle, Water, move_water_segment, copy_bottles
+from helpers.bottle_setup import init_bottles
+from helpers.shuffle import shuffle_bottles
+
+import random
+import timeit
+
+REPEAT = 5
+NUMBER = 20_000
+
+def make_bottles() -> list[Bottle]:
+  random.seed(0)
+  bottles = init_bottles(2, 8, 4, {i: (0, 0, 0) for i in range(8)})
+  shuffle_bottles(bottles, 1000)
+  return bottles
+
+def bench_push_pop(bottle: Bottle) -> None:
+  water = bottle.pop_water(1)
+  bottle.push_water(water)
+
+def bench_remaining_capacity(bottles: list[Bottle]) -> None:
+  for bottle in bottles:
+    bottle.get_remaining_capacity()
+
+def bench_move(from_bottle: Bottle, to_bottle: Bottle) -> None:
+  move_water_segment(from_bottle, to_bottle)
+  move_water_segment(to_bottle, from_bottle)
+
+def bench_copy(bottles: list[Bottle]) -> None:
+  copy_bottles(bottles)
+
+def report(name: str, statement) -> None:
+  best = min(timeit.repeat(statement, repeat=REPEAT, number=NUMBER))
+  print(f"{name:>24}: {best / NUMBER * 1e6:8.2f} us/op")
+
+def main() -> None:
+  bottles = make_bottles()
+  bottle = Bottle(4, [Water(0, 1, (0, 0, 0)), Water(1, 2, (0, 0, 0))])
+  from_bottle = Bottle(4, [Water(1, 1, (0, 0, 0)), Water(0, 2, (0, 0, 0))])
+  to_bottle = Bottle(4, [Water(0, 1, (0, 0, 0))])
+
+  report("push + pop", lambda: bench_push_pop(bottle))
+  report("remaining capacity x10", lambda: bench_remaining_capacity(bottles))
+  report("move_water_segment x2", lambda: bench_move(from_bottle, to_bottle))
+  report("copy_bottles", lambda: bench_copy(bottles))
+
+if __name__ == "__main__":
+  main()
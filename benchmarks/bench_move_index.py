@@ -0,0 +1,101 @@
+"""
+Checks the incremental `LegalMoveIndex` of `WaterSortPuzzle` against `PackedState.legal_moves` and a brute force
+stuck check over random play, undos, redos, restarts and loaded boards, and compares the cost of asking for the
+legal moves and whether the board is stuck against scanning every pair of bottles.
+
+Run from the repository root with `python -m benchmarks.bench_move_index`.
+"""
+from bottle import Bottle
+from helpers.bottle_setup import init_bottles, top_off_bottles
+from helpers.shuffle import shuffle_bottles
+from packed_state import PackedState
+from water_sort_puzzle import WaterSortPuzzle
+
+import random
+import time
+
+CHECK_STEP_COUNT = 20_000
+# (empty bottle count, colored bottle count, bottle capacity) of the loaded boards, one empty bottle gets stuck often
+LOAD_PARAMS = [(1, 4, 4), (1, 6, 4), (2, 8, 4), (2, 6, 5)]
+QUERY_REPEATS = 20_000
+WATER_COLOR_MAP = {i: (0, 0, 0) for i in range(20)}
+
+def make_bottles(empty_count: int, color_count: int, capacity: int) -> list[Bottle]:
+  bottles = init_bottles(empty_count, color_count, capacity, WATER_COLOR_MAP)
+  shuffle_bottles(bottles, 1000)
+  top_off_bottles(bottles)
+  return bottles
+
+def is_stuck_by_scan(state: PackedState) -> bool:
+  """The unsolved board has no legal move other than pouring a bottle holding a single water segment into an empty bottle."""
+  if state.is_solved():
+    return False
+
+  for from_index, to_index, _ in state.legal_moves():
+    from_water = state.get_bottle(from_index)
+    if len(state.get_bottle(to_index)) > 0 or from_water.count(from_water[0]) != len(from_water):
+      return False
+
+  return True
+
+def check_index() -> None:
+  """Plays random moves, undos, redos, restarts and loads and checks the index after every step."""
+  random.seed(0)
+  puzzle = WaterSortPuzzle()
+  puzzle.create_bottles(2, 8, 4, WATER_COLOR_MAP, 1000)
+  stuck_count = 0
+
+  for _ in range(CHECK_STEP_COUNT):
+    roll = random.random()
+    legal_moves = puzzle.get_legal_moves()
+    if roll < 0.2 or len(legal_moves) == 0:
+      puzzle.go_back()
+    elif roll < 0.3:
+      puzzle.go_forward()
+    elif roll < 0.31:
+      puzzle.restart_puzzle()
+    elif roll < 0.32 or puzzle.is_puzzle_solved():
+      puzzle.load_bottles(make_bottles(*random.choice(LOAD_PARAMS)))
+    else:
+      puzzle.select_bottle(-1)
+      from_index, to_index = random.choice(legal_moves)
+      puzzle.select_bottle(from_index)
+      puzzle.select_bottle(to_index)
+
+    state = PackedState.from_bottles(puzzle.bottles)
+    expected_moves = sorted((from_index, to_index) for from_index, to_index, _ in state.legal_moves())
+    assert sorted(puzzle.get_legal_moves()) == expected_moves, "the index has different legal moves than a full scan"
+    assert puzzle.has_legal_moves() == (len(expected_moves) > 0), "has_legal_moves disagrees with a full scan"
+
+    stuck = is_stuck_by_scan(state)
+    assert puzzle.is_stuck() == stuck, "is_stuck disagrees with a full scan"
+    stuck_count += stuck
+
+  print(f"legal moves and is_stuck matched a full scan after {CHECK_STEP_COUNT} moves, undos, redos, restarts and loads ({stuck_count} stuck boards)")
+
+def bench_queries() -> None:
+  random.seed(1)
+  puzzle = WaterSortPuzzle()
+  puzzle.create_bottles(4, 20, 6, WATER_COLOR_MAP, 4000)
+
+  start_time = time.perf_counter()
+  for _ in range(QUERY_REPEATS):
+    state = PackedState.from_bottles(puzzle.bottles)
+    state.legal_moves()
+    is_stuck_by_scan(state)
+  scan_rate = QUERY_REPEATS / (time.perf_counter() - start_time)
+
+  start_time = time.perf_counter()
+  for _ in range(QUERY_REPEATS):
+    puzzle.get_legal_moves()
+    puzzle.is_stuck()
+  index_rate = QUERY_REPEATS / (time.perf_counter() - start_time)
+
+  print(f"24 bottle board: full scan {scan_rate:9.0f} queries/s, index {index_rate:9.0f} queries/s ({index_rate / scan_rate:.1f}x)")
+
+def main() -> None:
+  check_index()
+  bench_queries()
+
+if __name__ == "__main__":
+  main()
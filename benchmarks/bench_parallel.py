@@ -0,0 +1,65 @@
+"""
+Reports the speedup of `solve_state_parallel` with 1, 2, 4 and 8 worker processes over `solve_state` on a standard set of large boards,
+and checks that every parallel solution is valid and no longer than the sequential one.
+
+The speedup is bounded by the number of cores, workers beyond it only add message passing and extra expansions.
+
+Run from the repository root with `python -m benchmarks.bench_parallel`.
+"""
+from packed_state import PackedState
+from parallel_solver import solve_state_parallel
+from prefetch import build_puzzle_state
+from solver import solve_state, SolveResult
+
+import os
+
+WORKER_COUNTS = [1, 2, 4, 8]
+# (empty bottle count, colored bottle count, bottle capacity, shuffle moves) and seed of each board
+BOARDS = [
+  ((2, 16, 4, 3000), 0),
+  ((2, 16, 4, 3000), 1),
+  ((3, 20, 4, 4000), 0),
+  ((4, 20, 6, 4000), 0),
+]
+MAX_NODES = 200_000
+TIME_LIMIT = 60
+
+def check_solution(state: PackedState, result: SolveResult) -> bool:
+  if result.moves == None:
+    return False
+
+  for from_index, to_index in result.moves:
+    state = state.apply_move(from_index, to_index)
+    if state == None:
+      return False
+
+  return state.is_solved()
+
+def main() -> None:
+  print(f"{os.cpu_count()} cores")
+
+  totals = {workers: 0.0 for workers in WORKER_COUNTS}
+  sequential_total = 0.0
+  for params, seed in BOARDS:
+    state = build_puzzle_state(params, seed)
+    # the parallel search always uses canonical keys
+    sequential = solve_state(state, max_nodes=MAX_NODES, time_limit=TIME_LIMIT, canonical=True)
+    sequential_total += sequential.wall_time
+    print(f"{str(params):>18} seed={seed} sequential: {sequential}")
+
+    for workers in WORKER_COUNTS:
+      result = solve_state_parallel(state, workers=workers, max_nodes=MAX_NODES, time_limit=TIME_LIMIT)
+      totals[workers] += result.wall_time
+
+      valid = check_solution(state, result)
+      assert valid or not sequential.is_solved(), f"{workers} workers found no valid solution"
+      assert not valid or sequential.moves == None or len(result.moves) <= len(sequential.moves), f"{workers} workers found a longer solution"
+      speedup = sequential.wall_time / result.wall_time
+      print(f"{'':>27} {workers} workers: {result} speedup={speedup:.2f}x")
+
+  print(f"{'total':>18} sequential: {sequential_total:.3f}s")
+  for workers in WORKER_COUNTS:
+    print(f"{'':>18} {workers} workers: {totals[workers]:.3f}s speedup={sequential_total / totals[workers]:.2f}x")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,59 @@
+"""
+Compares the time to start the next puzzle with `create_bottles` against taking it from a `PuzzlePrefetcher`.
+
+Run from the repository root with `python -m benchmarks.bench_prefetch`.
+"""
+from prefetch import PuzzlePrefetcher
+from water_sort_puzzle import WaterSortPuzzle
+
+import statistics
+import time
+
+TRANSITION_COUNT = 200
+# the game's hard setting
+PARAMS = (2, 8, 4, 1000)
+WATER_COLOR_MAP = {i: (0, 0, 0) for i in range(8)}
+# the frame budget at 60 FPS, levels are started at most once per frame
+FRAME_TIME = 1 / 60
+
+def report(name: str, times: list[float]) -> None:
+  times.sort()
+  p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+  print(f"{name:>12}: p50={statistics.median(times) * 1000:7.3f}ms p99={p99 * 1000:7.3f}ms max={times[-1] * 1000:7.3f}ms")
+
+def main() -> None:
+  empty_bottle_count, colored_bottle_count, bottle_capacity, shuffle_moves = PARAMS
+  puzzle = WaterSortPuzzle()
+
+  times: list[float] = []
+  for _ in range(TRANSITION_COUNT):
+    start_time = time.perf_counter()
+    puzzle.create_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, WATER_COLOR_MAP, shuffle_moves)
+    times.append(time.perf_counter() - start_time)
+  report("synchronous", times)
+
+  prefetcher = PuzzlePrefetcher()
+  prefetcher.prefetch(PARAMS)
+
+  times = []
+  misses = 0
+  for _ in range(TRANSITION_COUNT):
+    # a frame passes between level transitions, as in the game loop
+    time.sleep(FRAME_TIME)
+    prefetcher.poll()
+
+    start_time = time.perf_counter()
+    state = prefetcher.take(PARAMS)
+    if state == None:
+      misses += 1
+      puzzle.create_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, WATER_COLOR_MAP, shuffle_moves)
+    else:
+      puzzle.load_bottles(state.to_bottles(WATER_COLOR_MAP))
+    times.append(time.perf_counter() - start_time)
+
+  prefetcher.shutdown()
+  report("prefetched", times)
+  print(f"{misses} of {TRANSITION_COUNT} transitions had no puzzle ready")
+
+if __name__ == "__main__":
+  main()
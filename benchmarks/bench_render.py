@@ -0,0 +1,146 @@
+"""
+Headless frame-time benchmarks for the menu and bottle rendering.
+
+Every scenario renders to an off-screen `pygame.Surface` under SDL's dummy video driver and reports
+the p50/p95/p99 frame times, plus the average peak memory allocated per frame from a second traced run.
+
+Run from the repository root with `python -m benchmarks.bench_render [--frames N] [--scenario NAME ...]`.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from bottle import Bottle, move_water_segment
+from game import draw_bottles, draw_main_menu
+from game_menu import GameMenu
+from helpers.bottle_setup import init_bottles
+from helpers.shuffle import shuffle_bottles
+from renderer import BottleRenderer
+from water_wave import WaterWave
+import constants.colors as colors
+
+import argparse
+import pygame
+import random
+import statistics
+import time
+import tracemalloc
+
+SCREEN_SIZE = (1280, 720)
+PALETTE = [colors.RED, colors.GREEN, colors.BLUE, colors.YELLOW, colors.PINK, colors.ORANGE, colors.PURPLE, colors.CYAN]
+
+class Scenario:
+  """
+  A named sequence of frames to render.
+  """
+  def __init__(self, name: str, setup) -> None:
+    """
+    Args:
+        name (str): The name of the scenario.
+        setup (Callable[[], Callable[[int], None]]): Builds the scenario state and returns a function that renders frame `i`.
+    """
+    self.name = name
+    self.setup = setup
+
+def make_bottles(bottle_count: int) -> list[Bottle]:
+  random.seed(bottle_count)
+  color_count = bottle_count - 2
+  water_id_map = {i: PALETTE[i % len(PALETTE)] for i in range(color_count)}
+  bottles = init_bottles(2, color_count, 4, water_id_map)
+  shuffle_bottles(bottles, 1000)
+
+  return bottles
+
+def make_board_surface(bottle_count: int) -> pygame.Surface:
+  # tall enough for every wrapped row of bottles
+  rows = bottle_count // 11 + 1
+  return pygame.Surface((SCREEN_SIZE[0], 275 + rows * 325))
+
+def main_menu_scenario():
+  screen = pygame.Surface(SCREEN_SIZE)
+  game_menu = GameMenu()
+  menu_start_pos = (screen.get_width()//20, screen.get_height()//20)
+  wave = WaterWave(1, 5)
+
+  def render(frame: int) -> None:
+    draw_main_menu(screen, game_menu, menu_start_pos, (-1, -1), wave)
+
+  return render
+
+def draw_bottles_scenario(bottle_count: int):
+  def setup():
+    bottles = make_bottles(bottle_count)
+    surface = make_board_surface(bottle_count)
+
+    def render(frame: int) -> None:
+      surface.fill(colors.BLACK)
+      draw_bottles(surface, bottles, 100, 275)
+
+    return render
+
+  return setup
+
+def renderer_scenario(bottle_count: int, selection_changes = False, moves = False):
+  def setup():
+    bottles = make_bottles(bottle_count)
+    surface = make_board_surface(bottle_count)
+    renderer = BottleRenderer(100, 275)
+
+    def render(frame: int) -> None:
+      selected_bottle_index = frame % bottle_count if selection_changes else -1
+      if moves and frame % 10 == 0:
+        move_water_segment(bottles[random.randrange(bottle_count)], bottles[random.randrange(bottle_count)])
+
+      renderer.draw(surface, bottles, selected_bottle_index=selected_bottle_index)
+
+    return render
+
+  return setup
+
+SCENARIOS = [
+  Scenario("main menu", main_menu_scenario),
+  Scenario("draw_bottles 10", draw_bottles_scenario(10)),
+  Scenario("draw_bottles 50", draw_bottles_scenario(50)),
+  Scenario("draw_bottles 200", draw_bottles_scenario(200)),
+  Scenario("renderer 10 waves only", renderer_scenario(10)),
+  Scenario("renderer 50 waves only", renderer_scenario(50)),
+  Scenario("renderer 200 waves only", renderer_scenario(200)),
+  Scenario("renderer 50 selection changes", renderer_scenario(50, selection_changes=True)),
+  Scenario("renderer 50 with moves", renderer_scenario(50, moves=True)),
+]
+
+def run(scenario: Scenario, frame_count: int) -> None:
+  render = scenario.setup()
+  frame_times: list[float] = []
+  for frame in range(frame_count):
+    start_time = time.perf_counter()
+    render(frame)
+    frame_times.append((time.perf_counter() - start_time) * 1000)
+
+  render = scenario.setup()
+  tracemalloc.start()
+  peak_total = 0
+  for frame in range(frame_count):
+    tracemalloc.reset_peak()
+    start_memory, _ = tracemalloc.get_traced_memory()
+    render(frame)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    peak_total += peak_memory - start_memory
+  tracemalloc.stop()
+
+  percentiles = statistics.quantiles(frame_times, n=100)
+  print(f"{scenario.name:>30}: p50={percentiles[49]:7.3f}ms p95={percentiles[94]:7.3f}ms p99={percentiles[98]:7.3f}ms alloc={peak_total / frame_count / 1024:7.1f}KiB/frame")
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="Headless rendering benchmarks.")
+  parser.add_argument("--frames", type=int, default=300, help="frames rendered per scenario")
+  parser.add_argument("--scenario", action="append", help="only run scenarios with this name (repeatable)")
+  args = parser.parse_args()
+
+  pygame.init()
+  for scenario in SCENARIOS:
+    if args.scenario == None or scenario.name in args.scenario:
+      run(scenario, args.frames)
+  pygame.quit()
+
+if __name__ == "__main__":
+  main()
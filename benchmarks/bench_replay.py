@@ -0,0 +1,56 @@
+"""
+Records games played through `WaterSortPuzzle` with random moves, undos, redos and restarts, then
+measures how fast `replay_log` verifies them.
+
+Run from the repository root with `python -m benchmarks.bench_replay`.
+"""
+from replay_log import ReplayRecorder, read_events, verify_replays
+from water_sort_puzzle import WaterSortPuzzle
+
+import io
+import random
+import time
+
+GAME_COUNT = 500
+ACTIONS_PER_GAME = 60
+# a recorded game is copied this many times to make the log large enough to time
+REPEAT_COUNT = 200
+
+def record_games(file: io.BytesIO) -> None:
+  random.seed(0)
+  puzzle = WaterSortPuzzle(recorder=ReplayRecorder(file))
+  water_color_map = {i: (0, 0, 0) for i in range(8)}
+
+  for _ in range(GAME_COUNT):
+    puzzle.create_bottles(2, 8, 4, water_color_map, 1000)
+    bottle_count = len(puzzle.bottles)
+
+    for _ in range(ACTIONS_PER_GAME):
+      action = random.random()
+      if action < 0.8:
+        puzzle.select_bottle(random.randrange(bottle_count))
+        puzzle.select_bottle(random.randrange(bottle_count))
+      elif action < 0.9:
+        puzzle.go_back()
+      elif action < 0.98:
+        puzzle.go_forward()
+      else:
+        puzzle.restart_puzzle()
+
+  puzzle.end_recording()
+
+def main() -> None:
+  file = io.BytesIO()
+  start_time = time.perf_counter()
+  record_games(file)
+  print(f"recorded {GAME_COUNT} games in {time.perf_counter() - start_time:.2f}s ({len(file.getvalue()) / GAME_COUNT:.0f} bytes/game)")
+
+  log = file.getvalue() * REPEAT_COUNT
+  report = verify_replays(read_events(io.BytesIO(log)))
+  print(report)
+
+  if report.valid_games != report.games:
+    print(f"invalid games: {report.errors[:10]}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,102 @@
+"""
+Compares the throughput of `shuffle_bottles` against the previous rejection sampling shuffle
+and checks both pick their moves with the same distribution.
+
+Run from the repository root with `python -m benchmarks.bench_shuffle`.
+"""
+from bottle import Bottle, copy_bottles
+from helpers.bottle_setup import init_bottles
+from helpers.shuffle import shuffle_bottles, shuffle_move_water
+
+import random
+import time
+
+# (label, color count, empty bottle count, bottle capacity, shuffle moves)
+SCENARIOS = [
+  ("default board, 1k moves", 8, 2, 4, 1_000),
+  ("large board, 100k moves", 200, 2, 4, 100_000),
+  ("large board, capacity 8, 100k moves", 200, 4, 8, 100_000),
+]
+DISTRIBUTION_TRIALS = 50_000
+# the largest total variation distance between the sampled move distributions, sampling noise alone stays well below it
+MAX_DISTRIBUTION_DISTANCE = 0.03
+
+def rejection_shuffle_bottles(bottles: list[Bottle], move_count: int) -> None:
+  """The previous `shuffle_bottles`, which retries random bottle pairs until a move succeeds."""
+  i = 0
+  while i < move_count:
+    from_index = random.randint(0, len(bottles) - 1)
+    to_index = random.randint(0, len(bottles) - 1)
+
+    if from_index == to_index:
+      continue
+
+    from_bottle_top = bottles[from_index].get_top_water()
+    if from_bottle_top == None:
+      continue
+
+    max_amount = min(bottles[to_index].get_remaining_capacity(), from_bottle_top.amount)
+    if max_amount <= 0:
+      continue
+
+    amount = random.randint(1, max_amount)
+
+    suc = shuffle_move_water(bottles, from_index, to_index, amount)
+    if not suc:
+      continue
+
+    i += 1
+
+def measure(shuffle, color_count: int, empty_count: int, capacity: int, move_count: int) -> float:
+  """
+  Returns:
+      float: The shuffle moves made per second.
+  """
+  water_id_map = {i: (0, 0, 0) for i in range(color_count)}
+  bottles = init_bottles(empty_count, color_count, capacity, water_id_map)
+
+  start_time = time.perf_counter()
+  shuffle(bottles, move_count)
+  elapsed = time.perf_counter() - start_time
+
+  return move_count / elapsed
+
+def get_move_counts(shuffle, bottles: list[Bottle]) -> dict[tuple[int, int, int], int]:
+  """
+  Returns:
+      dict[tuple[int, int, int], int]: How often each `(from_index, to_index, amount)` move was the first move made from `bottles`.
+  """
+  counts: dict[tuple[int, int, int], int] = {}
+  fills = [bottle.capacity - bottle.get_remaining_capacity() for bottle in bottles]
+  for _ in range(DISTRIBUTION_TRIALS):
+    shuffled = copy_bottles(bottles)
+    shuffle(shuffled, 1)
+    changes = [bottle.capacity - bottle.get_remaining_capacity() - fill for bottle, fill in zip(shuffled, fills)]
+    move = (changes.index(min(changes)), changes.index(max(changes)), max(changes))
+    counts[move] = counts.get(move, 0) + 1
+
+  return counts
+
+def check_distribution() -> None:
+  """Compares how often each first move is picked on a board with full, partly filled and empty bottles."""
+  random.seed(1)
+  bottles = init_bottles(2, 4, 4, {i: (0, 0, 0) for i in range(4)})
+  rejection_shuffle_bottles(bottles, 7)
+
+  old_counts = get_move_counts(rejection_shuffle_bottles, bottles)
+  new_counts = get_move_counts(shuffle_bottles, bottles)
+  distance = sum(abs(old_counts.get(move, 0) - new_counts.get(move, 0)) for move in old_counts.keys() | new_counts.keys()) / 2 / DISTRIBUTION_TRIALS
+
+  print(f"{len(old_counts | new_counts)} first moves: total variation distance {distance:.4f} from the rejection shuffle")
+  assert distance <= MAX_DISTRIBUTION_DISTANCE, "shuffle_bottles picks moves with a different distribution than the rejection shuffle"
+
+def main() -> None:
+  check_distribution()
+  random.seed(0)
+  for label, color_count, empty_count, capacity, move_count in SCENARIOS:
+    old_rate = measure(rejection_shuffle_bottles, color_count, empty_count, capacity, move_count)
+    new_rate = measure(shuffle_bottles, color_count, empty_count, capacity, move_count)
+    print(f"{label:>36}: rejection={old_rate:>10.0f} moves/s legal moves={new_rate:>10.0f} moves/s ({new_rate / old_rate:.1f}x)")
+
+if __name__ == "__main__":
+  main()
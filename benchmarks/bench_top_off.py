@@ -0,0 +1,120 @@
+"""
+Compares `top_off_bottles` against the unit by unit version it replaced, checks both leave the same bottles,
+and checks process memory stays flat across many `WaterSortPuzzle.create_bottles` calls.
+
+Run from the repository root with `python -m benchmarks.bench_top_off [--calls N]`.
+"""
+from bottle import Bottle, copy_bottles
+from helpers.bottle_setup import init_bottles, top_off_bottles
+from helpers.shuffle import shuffle_bottles
+from water_sort_puzzle import WaterSortPuzzle
+
+import argparse
+import random
+import time
+import tracemalloc
+
+BOARD_COUNT = 2_000
+# (colored bottles, empty bottles, capacity)
+LAYOUTS = [(8, 2, 4), (20, 4, 6), (200, 20, 8)]
+# the traced memory may grow by this much after warm up, less than leaking a byte per call over the default 100k calls
+MAX_GROWTH_KIB = 64
+
+def find_largest_bottle_cap(bottles: list[Bottle]) -> int:
+  largest_bottle_cap_index = -1
+  largest_bottle_cap = float('-inf')
+  for index, bottle in enumerate(bottles):
+    bottle_cap = bottle.get_remaining_capacity()
+    if not bottle.is_empty() and bottle_cap != 0 and largest_bottle_cap < bottle_cap:
+      largest_bottle_cap_index = index
+      largest_bottle_cap = bottle_cap
+
+  return largest_bottle_cap_index
+
+def find_smallest_bottle_cap(bottles: list[Bottle]) -> int:
+  smallest_bottle_cap_index = -1
+  smallest_bottle_cap = float('inf')
+  for index, bottle in enumerate(bottles):
+    bottle_cap = bottle.get_remaining_capacity()
+    if not bottle.is_empty() and bottle_cap != 0 and smallest_bottle_cap >= bottle_cap:
+      smallest_bottle_cap_index = index
+      smallest_bottle_cap = bottle_cap
+
+  return smallest_bottle_cap_index
+
+def top_off_bottles_by_unit(bottles: list[Bottle]) -> None:
+  """The previous `top_off_bottles`, moving one unit per scan of every bottle (without the history)."""
+  largest_bottle_cap_index = find_largest_bottle_cap(bottles)
+  smallest_bottle_cap_index = find_smallest_bottle_cap(bottles)
+
+  while largest_bottle_cap_index != -1 and smallest_bottle_cap_index != -1 and smallest_bottle_cap_index != largest_bottle_cap_index:
+    from_bottle = bottles[largest_bottle_cap_index]
+    to_bottle = bottles[smallest_bottle_cap_index]
+
+    water = from_bottle.pop_water(1)
+    if not to_bottle.push_water(water):
+      from_bottle.push_water(water)
+      return
+
+    largest_bottle_cap_index = find_largest_bottle_cap(bottles)
+    smallest_bottle_cap_index = find_smallest_bottle_cap(bottles)
+
+def make_boards(color_count: int, empty_count: int, capacity: int) -> list[list[Bottle]]:
+  random.seed(0)
+  boards: list[list[Bottle]] = []
+  for _ in range(BOARD_COUNT * 8 // color_count):
+    bottles = init_bottles(empty_count, color_count, capacity, {i: (0, 0, 0) for i in range(color_count)})
+    shuffle_bottles(bottles, 1000)
+    boards.append(bottles)
+
+  return boards
+
+def time_top_off(top_off, boards: list[list[Bottle]]) -> float:
+  start_time = time.perf_counter()
+  for bottles in boards:
+    top_off(bottles)
+
+  return time.perf_counter() - start_time
+
+def check_memory(call_count: int) -> None:
+  random.seed(0)
+  puzzle = WaterSortPuzzle()
+  water_color_map = {i: (0, 0, 0) for i in range(8)}
+  report_every = max(call_count // 5, 1)
+
+  tracemalloc.start()
+  # warm up caches and interned objects before taking the baseline
+  for _ in range(100):
+    puzzle.create_bottles(2, 8, 4, water_color_map, 100)
+  base_memory, _ = tracemalloc.get_traced_memory()
+
+  for call in range(1, call_count + 1):
+    puzzle.create_bottles(2, 8, 4, water_color_map, 100)
+    if call % report_every == 0:
+      memory, _ = tracemalloc.get_traced_memory()
+      growth_kib = (memory - base_memory) / 1024
+      print(f"{call:>8} create_bottles calls: {growth_kib:+8.1f} KiB since warm up")
+      assert growth_kib <= MAX_GROWTH_KIB, f"memory grew by {growth_kib:.1f} KiB over {call} create_bottles calls"
+
+  tracemalloc.stop()
+
+def main() -> None:
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--calls", type=int, default=100_000, help="create_bottles calls for the memory check")
+  args = parser.parse_args()
+
+  for color_count, empty_count, capacity in LAYOUTS:
+    boards = make_boards(color_count, empty_count, capacity)
+    unit_boards = [copy_bottles(bottles) for bottles in boards]
+
+    heap_time = time_top_off(top_off_bottles, boards)
+    unit_time = time_top_off(top_off_bottles_by_unit, unit_boards)
+
+    same = all([str(b) for b in heap] == [str(b) for b in unit] for heap, unit in zip(boards, unit_boards))
+    print(f"{color_count + empty_count:>4} bottles x{capacity}: heap {len(boards) / heap_time:9.0f} boards/s, by unit {len(boards) / unit_time:9.0f} boards/s ({unit_time / heap_time:.1f}x), same result: {same}")
+    assert same, f"top_off_bottles left different bottles than the unit by unit version for {color_count + empty_count} bottles x{capacity}"
+
+  check_memory(args.calls)
+
+if __name__ == "__main__":
+  main()
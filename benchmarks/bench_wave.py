@@ -0,0 +1,67 @@
+"""
+Compares the per-frame cost of building wave polygons with `math.sin` against `WaveCache`.
+
+The polygon points are built for the waves of ten bottles plus the two full screen waves of
+`main_menu` for every frame. Drawing the polygons is left out so no window is needed.
+
+Run from the repository root with `python -m benchmarks.bench_wave`.
+"""
+from water_wave import WaterWave, WaveCache
+
+import math
+import time
+
+FRAME_COUNT = 1_200
+SCREEN_WIDTH = 1280
+BOTTLE_COUNT = 10
+
+def build_sin_points(width: int, offset: int, start=0, shift=0, amplitude=100, frequency=0.02, spread = 1) -> list[tuple[int, int]]:
+  """The previous `draw_sin_wave` point generation."""
+  points = []
+  for x in range(start, width):
+    y = int(amplitude * math.sin((frequency * x + shift)/spread) + offset)
+    points.append((x, y))
+
+  points[0] = (start, offset)
+  points[-1] = (width - 1, offset)
+
+  return points
+
+def get_cached_points(cache: WaveCache, width: int, offset: int, start=0, shift=0, amplitude=100, frequency=0.02, spread = 1) -> list[tuple[int, int]]:
+  """Gets the same points as `build_sin_points` the way `draw_sin_wave` does, from the cache and translated to the wave's position."""
+  points = cache.get_points(width - start, start=start, shift=shift, amplitude=amplitude, frequency=frequency, spread=spread)
+  return [(start + x, offset + y) for x, y in points]
+
+def run_frames(get_points) -> float:
+  """
+  Returns:
+      float: The average time spent per frame in milliseconds.
+  """
+  waves = [WaterWave(0, 5) for _ in range(BOTTLE_COUNT)]
+  menu_wave = WaterWave(1, 5)
+
+  start_time = time.perf_counter()
+  for _ in range(FRAME_COUNT):
+    for index, wave in enumerate(waves):
+      x = 100 + index * 100
+      get_points(x + 25, 175, start=x + 25 - 75, shift=wave.shift, amplitude=wave.amplitude, spread=7)
+      wave.increment_amplitude()
+      wave.increment_shift()
+
+    get_points(SCREEN_WIDTH, 360, shift=menu_wave.shift, amplitude=menu_wave.amplitude, spread=7)
+    get_points(SCREEN_WIDTH, 360, shift=1, amplitude=menu_wave.amplitude, spread=7)
+    menu_wave.increment_amplitude()
+    menu_wave.increment_shift()
+
+  return (time.perf_counter() - start_time) / FRAME_COUNT * 1000
+
+def main() -> None:
+  cache = WaveCache()
+
+  before = run_frames(build_sin_points)
+  after = run_frames(lambda *args, **kwargs: get_cached_points(cache, *args, **kwargs))
+  print(f"math.sin: {before:.3f} ms/frame")
+  print(f"   cache: {after:.3f} ms/frame ({before / after:.1f}x, hit rate {cache.hits / (cache.hits + cache.misses):.0%})")
+
+if __name__ == "__main__":
+  main()
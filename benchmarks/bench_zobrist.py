@@ -0,0 +1,122 @@
+"""
+Checks the incremental Zobrist board hash against hashing from scratch, measures its collision rate
+and compares its throughput against walking every `Water` of every bottle.
+
+Run from the repository root with `python -m benchmarks.bench_zobrist`.
+"""
+from bottle import Bottle, copy_bottles, get_board_hash
+from helpers.bottle_setup import init_bottles
+from helpers.shuffle import shuffle_bottles
+from water_sort_puzzle import WaterSortPuzzle
+
+import random
+import time
+
+CHECK_MOVE_COUNT = 20_000
+# (empty bottle count, colored bottle count, bottle capacity) of the boards sampled for collisions
+COLLISION_PARAMS = [(2, 4, 4), (2, 8, 4), (3, 12, 5), (4, 20, 6)]
+BOARDS_PER_PARAMS = 50_000
+HASH_REPEATS = 20_000
+WATER_COLOR_MAP = {i: (0, 0, 0) for i in range(20)}
+
+def get_contents_key(bottles: list[Bottle]) -> tuple:
+  """The exact board, hashed the slow way by walking every water segment."""
+  return tuple((bottle.capacity, tuple((water.water_id, water.amount) for water in bottle.contents)) for bottle in bottles)
+
+def check_incremental() -> None:
+  """Plays random moves, undos, redos and restarts and checks the incremental hash never drifts."""
+  random.seed(0)
+  puzzle = WaterSortPuzzle()
+  puzzle.create_bottles(2, 8, 4, WATER_COLOR_MAP, 1000)
+
+  for _ in range(CHECK_MOVE_COUNT):
+    roll = random.random()
+    legal_moves = puzzle.get_legal_moves()
+    if roll < 0.2 or len(legal_moves) == 0:
+      puzzle.go_back()
+    elif roll < 0.3:
+      puzzle.go_forward()
+    elif roll < 0.301:
+      puzzle.restart_puzzle()
+    else:
+      puzzle.select_bottle(-1)
+      from_index, to_index = random.choice(legal_moves)
+      puzzle.select_bottle(from_index)
+      puzzle.select_bottle(to_index)
+
+    # a copy rebuilds every bottle hash from its contents
+    assert puzzle.board_hash == get_board_hash(puzzle.bottles) == get_board_hash(copy_bottles(puzzle.bottles)), "incremental hash drifted"
+
+  print(f"incremental hash matched a full rehash after {CHECK_MOVE_COUNT} moves, undos, redos and restarts")
+
+def check_collisions() -> None:
+  """Hashes every board reached while shuffling and counts distinct boards that share a hash."""
+  random.seed(1)
+  hashes: dict[int, tuple] = {}
+  low_hashes: set[int] = set()
+  collisions = 0
+  low_collisions = 0
+
+  for empty_count, color_count, capacity in COLLISION_PARAMS:
+    bottles = init_bottles(empty_count, color_count, capacity, WATER_COLOR_MAP)
+    for _ in range(BOARDS_PER_PARAMS):
+      shuffle_bottles(bottles, 1)
+      board_hash = get_board_hash(bottles)
+      key = get_contents_key(bottles)
+
+      seen = hashes.setdefault(board_hash, key)
+      if seen != key:
+        collisions += 1
+
+      # the low 32 bits of new boards collide at the birthday rate if the hash is well spread
+      if seen is key:
+        if board_hash & 0xFFFFFFFF in low_hashes:
+          low_collisions += 1
+        low_hashes.add(board_hash & 0xFFFFFFFF)
+
+  board_count = len(hashes)
+  expected_low = board_count * (board_count - 1) / 2 / 2**32
+  print(f"{board_count} distinct boards: {collisions} 64 bit collisions, {low_collisions} 32 bit collisions ({expected_low:.1f} expected)")
+  assert collisions == 0, "distinct boards share a 64 bit hash"
+
+def bench_throughput() -> None:
+  random.seed(2)
+  puzzle = WaterSortPuzzle()
+  puzzle.create_bottles(4, 20, 6, WATER_COLOR_MAP, 4000)
+  bottles = puzzle.bottles
+
+  start_time = time.perf_counter()
+  for _ in range(HASH_REPEATS):
+    hash(get_contents_key(bottles))
+  walk_rate = HASH_REPEATS / (time.perf_counter() - start_time)
+
+  start_time = time.perf_counter()
+  for _ in range(HASH_REPEATS):
+    get_board_hash(bottles)
+  board_rate = HASH_REPEATS / (time.perf_counter() - start_time)
+
+  # a move plus its undo, both keeping `board_hash` up to date
+  move_count = 0
+  start_time = time.perf_counter()
+  for _ in range(HASH_REPEATS):
+    legal_moves = puzzle.get_legal_moves()
+    if len(legal_moves) == 0:
+      continue
+    from_index, to_index = random.choice(legal_moves)
+    puzzle.select_bottle(from_index)
+    puzzle.select_bottle(to_index)
+    puzzle.board_hash
+    puzzle.go_back()
+    move_count += 2
+  move_rate = move_count / (time.perf_counter() - start_time)
+
+  print(f"24 bottle board: walking every water {walk_rate:9.0f} hashes/s, from bottle hashes {board_rate:9.0f} hashes/s")
+  print(f"{'':>17} {move_rate:9.0f} moves/s with the board hash kept up to date")
+
+def main() -> None:
+  check_incremental()
+  check_collisions()
+  bench_throughput()
+
+if __name__ == "__main__":
+  main()
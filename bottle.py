@@ -1,10 +1,61 @@
 from __future__ import annotations
-from water_wave import WaterWave
+
+MASK_64 = (1 << 64) - 1
+# the odd 64 bit constant of splitmix64, multiplying by it is a bijection of 64 bit values
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+def mix_64(value: int) -> int:
+  """
+  The splitmix64 finalizer, a bijection that spreads every input bit over the 64 bit output.
+
+  Args:
+      value (int): A 64 bit value.
+
+  Returns:
+      int: The mixed 64 bit value.
+  """
+  value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+  value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+  return value ^ (value >> 31)
+
+# water id -> the XOR of the random keys of every level below each level, grown as needed
+_level_key_prefixes: list[list[int]] = []
+
+def get_segment_key(water_id: int, start_level: int, end_level: int) -> int:
+  """
+  Gets the Zobrist key of a water segment: the XOR of the random keys of `water_id` at every level it fills.
+  Keys are derived from the water id and level, so they are the same in every process.
+
+  Args:
+      water_id (int): The ID of the water in the segment.
+      start_level (int): The level of the bottom of the segment.
+      end_level (int): The level above the top of the segment.
+
+  Returns:
+      int: The 64 bit key of the segment.
+  """
+  try:
+    prefixes = _level_key_prefixes[water_id]
+    return prefixes[start_level] ^ prefixes[end_level]
+  except IndexError:
+    pass
+
+  while len(_level_key_prefixes) <= water_id:
+    _level_key_prefixes.append([0])
+
+  prefixes = _level_key_prefixes[water_id]
+  while len(prefixes) <= end_level:
+    level = len(prefixes) - 1
+    prefixes.append(prefixes[level] ^ mix_64(((((water_id << 32) | level) + 1) * GOLDEN_GAMMA) & MASK_64))
+
+  return prefixes[start_level] ^ prefixes[end_level]
 
 class Water:
   """
   The water used as contents for a `Bottle`.
   """
+  __slots__ = ("water_id", "amount", "color", "name")
+
   def __init__(self, water_id: int, amount: int, color: tuple[int, int, int], name = "") -> None:
     """
     Args:
@@ -17,8 +68,6 @@ class Water:
     self.amount = amount
     self.color = color
     self.name = name if name != "" else str(water_id)
-
-    self.wave = WaterWave(0, 5)
   
   def __eq__(self, __o: object) -> bool:
     if not isinstance(__o, Water):
@@ -66,6 +115,7 @@ class Water:
 
 class Bottle:
   """A bottle that holds water segments"""
+  __slots__ = ("capacity", "contents", "fill_level", "zobrist_hash")
 
   def __init__(self, capacity: int = 1, contents: list[Water] = []) -> None:
     """
@@ -73,8 +123,19 @@ class Bottle:
         capacity (int, optional): The maximum amount of water the bottle can hold. Defaults to 1.
         contents (list[Water], optional): The initial contents of the bottle. Defaults to [].
     """
-    self.capacity = max(capacity, sum(list(map(lambda w: w.amount, contents))))
+    fill_level = sum(w.amount for w in contents)
+
+    self.capacity = max(capacity, fill_level)
     self.contents = contents
+    # the total amount of water in `contents`, kept up to date by `pop_water` and `push_water`
+    self.fill_level = fill_level
+
+    # the XOR of the key of each filled level (see `get_segment_key`), kept up to date by `pop_water` and `push_water`
+    self.zobrist_hash = 0
+    level = 0
+    for water in contents:
+      self.zobrist_hash ^= get_segment_key(water.water_id, level, level + water.amount)
+      level += water.amount
   
   def is_empty(self) -> bool:
     """Checks if the bottle has no water segments in its contents
@@ -129,6 +190,8 @@ class Bottle:
     
     # get the water segment at the top of the bottle
     water = self.contents.pop()
+    self.fill_level -= water.amount
+    self.zobrist_hash ^= get_segment_key(water.water_id, self.fill_level, self.fill_level + water.amount)
 
     # if the amount is not specified return the entire water segment
     if amount == None or water.amount <= amount:
@@ -152,7 +215,7 @@ class Bottle:
     Returns:
         int: The remaining space in the bottle
     """
-    return self.capacity - sum(list(map(lambda w: w.amount, self.contents)))
+    return self.capacity - self.fill_level
 
   def push_water(self, water: Water) -> bool:
     curr_top_water = self.get_top_water()
@@ -164,6 +227,8 @@ class Bottle:
       self.contents.append(water)
     else:
       curr_top_water.add_amount(water.amount)
+    self.zobrist_hash ^= get_segment_key(water.water_id, self.fill_level, self.fill_level + water.amount)
+    self.fill_level += water.amount
     
     return True
 
@@ -211,4 +276,37 @@ def copy_bottles(bottles: list[Bottle]) -> list[Bottle]:
       list[Bottle]: A deep copy of `bottles`
   """
   return [b.copy() for b in bottles]
-    
+
+def get_bottle_hash(index: int, bottle: Bottle) -> int:
+  """
+  Gets the contribution of a bottle to the hash of a board, which depends on its position and capacity as well as its contents.
+
+  Args:
+      index (int): The index of the bottle on the board.
+      bottle (Bottle): The bottle.
+
+  Returns:
+      int: The 64 bit hash of the bottle at `index`.
+  """
+  # a cheaper mix than `mix_64`: each step is a bijection, so distinct bottles at a position stay distinct,
+  # and folding the high half down spreads the multiply into the low bits
+  value = ((bottle.zobrist_hash ^ ((((index << 16) | bottle.capacity) + 1) * GOLDEN_GAMMA)) * 0xBF58476D1CE4E5B9) & MASK_64
+  return value ^ (value >> 32)
+
+def get_board_hash(bottles: list[Bottle]) -> int:
+  """
+  Hashes a board from the incremental hashes of its bottles without walking their contents.
+  After a move only the two bottles changed, so the hash can be updated with `get_bottle_hash` instead
+  (see `WaterSortPuzzle.board_hash`).
+
+  Args:
+      bottles (list[Bottle]): The bottles of the board.
+
+  Returns:
+      int: The 64 bit hash of the board.
+  """
+  board_hash = 0
+  for index, bottle in enumerate(bottles):
+    board_hash ^= get_bottle_hash(index, bottle)
+
+  return board_hash
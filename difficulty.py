@@ -0,0 +1,160 @@
+"""
+Rates how hard a puzzle is from a search of its optimal solution.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from helpers.canonical import canonicalize
+from packed_state import PackedState
+from solver import get_successors, solve_state
+
+import math
+
+class DifficultyRating:
+  """
+  The difficulty score of a puzzle and the search metrics it was computed from.
+
+  The metrics are measured at each state along the optimal solution:
+    branching factor  the mean number of useful moves (see `get_successors`).
+    dead end ratio    the fraction of useful moves that lead to a dead end (see `is_dead_end`).
+    forced moves      the number of states with only one move that does not lead to a dead end.
+  """
+  def __init__(self, solution_length: int, branching_factor: float, dead_end_ratio: float, forced_moves: int) -> None:
+    """
+    Args:
+        solution_length (int): The number of moves in the shortest solution.
+        branching_factor (float): The mean number of useful moves along the solution.
+        dead_end_ratio (float): The fraction of useful moves along the solution that lead to a dead end.
+        forced_moves (int): The number of states along the solution with a single move that is not a dead end.
+    """
+    self.solution_length = solution_length
+    self.branching_factor = branching_factor
+    self.dead_end_ratio = dead_end_ratio
+    self.forced_moves = forced_moves
+    self.score = get_difficulty_score(solution_length, branching_factor, dead_end_ratio, forced_moves)
+
+  def __str__(self) -> str:
+    return f"score={self.score:.2f} moves={self.solution_length} branching={self.branching_factor:.2f} dead_ends={self.dead_end_ratio:.2f} forced={self.forced_moves}"
+
+
+def get_difficulty_score(solution_length: int, branching_factor: float, dead_end_ratio: float, forced_moves: int) -> float:
+  """
+  Combines the search metrics of a puzzle into a single score.
+
+  Every move a player has to choose (not forced) adds to the score, weighted by how many
+  moves there are to choose from and how many of them are traps.
+
+  Args:
+      solution_length (int): The number of moves in the shortest solution.
+      branching_factor (float): The mean number of useful moves along the solution.
+      dead_end_ratio (float): The fraction of useful moves along the solution that lead to a dead end.
+      forced_moves (int): The number of states along the solution with a single move that is not a dead end.
+
+  Returns:
+      float: The difficulty score, 0 for an already solved puzzle.
+  """
+  choices = solution_length - forced_moves
+  return forced_moves * 0.5 + choices * (1 + math.log2(max(branching_factor, 1))) * (1 + dead_end_ratio)
+
+def is_dead_end(state: PackedState, previous_state: PackedState) -> bool:
+  """
+  Checks if a state has no useful moves other than the one that undoes the move made to reach it.
+
+  Args:
+      state (PackedState): The state to check.
+      previous_state (PackedState): The state the move was made from.
+
+  Returns:
+      bool: True if `state` is not solved and is a dead end.
+  """
+  if state.is_solved():
+    return False
+
+  for _, next_state in get_successors(state):
+    if next_state != previous_state:
+      return False
+
+  return True
+
+def rate_state(state: PackedState, max_nodes: int | None = 200_000) -> DifficultyRating | None:
+  """
+  Solves a state and measures the search metrics along its optimal solution.
+
+  Args:
+      state (PackedState): The state to rate.
+      max_nodes (int | None, optional): The solver budget or None for no limit. Defaults to 200_000.
+
+  Returns:
+      DifficultyRating | None: The rating or None if no solution was found within the budget.
+  """
+  result = solve_state(state, max_nodes=max_nodes)
+  if not result.is_solved():
+    return None
+
+  move_count = 0
+  dead_end_count = 0
+  forced_moves = 0
+  for from_index, to_index in result.moves:
+    successors = get_successors(state)
+    dead_ends = sum(1 for _, next_state in successors if is_dead_end(next_state, state))
+
+    move_count += len(successors)
+    dead_end_count += dead_ends
+    if len(successors) - dead_ends <= 1:
+      forced_moves += 1
+
+    state = state.apply_move(from_index, to_index)
+
+  solution_length = len(result.moves)
+  branching_factor = move_count / solution_length if solution_length > 0 else 0.0
+  dead_end_ratio = dead_end_count / move_count if move_count > 0 else 0.0
+
+  return DifficultyRating(solution_length, branching_factor, dead_end_ratio, forced_moves)
+
+
+class DifficultyRater:
+  """
+  Rates states with `rate_state`, remembering the rating of each canonical state (see `canonicalize`)
+  so states that only differ by bottle order or water ids are only solved once.
+  """
+
+  def __init__(self, max_nodes: int | None = 200_000, max_entries: int = 100_000) -> None:
+    """
+    Args:
+        max_nodes (int | None, optional): The solver budget for each state or None for no limit. Defaults to 200_000.
+        max_entries (int, optional): The maximum number of ratings remembered. Defaults to 100_000.
+    """
+    self.max_nodes = max_nodes
+    self.max_entries = max(max_entries, 1)
+    self._ratings: OrderedDict[PackedState, DifficultyRating | None] = OrderedDict()
+
+    self.hits = 0
+    self.misses = 0
+
+  def rate(self, state: PackedState) -> DifficultyRating | None:
+    """
+    Args:
+        state (PackedState): The state to rate.
+
+    Returns:
+        DifficultyRating | None: The rating or None if no solution was found within the solver budget.
+    """
+    key = canonicalize(state)
+    if key in self._ratings:
+      self._ratings.move_to_end(key)
+      self.hits += 1
+      return self._ratings[key]
+
+    self.misses += 1
+    rating = rate_state(key, max_nodes=self.max_nodes)
+
+    self._ratings[key] = rating
+    if len(self._ratings) > self.max_entries:
+      self._ratings.popitem(last=False)
+
+    return rating
+
+  def __len__(self) -> int:
+    return len(self._ratings)
+
+  def __str__(self) -> str:
+    return f"entries={len(self._ratings)} hits={self.hits} misses={self.misses}"
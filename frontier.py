@@ -0,0 +1,134 @@
+from __future__ import annotations
+from packed_state import PackedState
+
+import heapq
+import sqlite3
+import struct
+
+Move = tuple[int, int]
+# a linked list of the moves made to reach a state, last move first (see `solver.MovePath`)
+MovePath = tuple[Move, "MovePath"] | None
+# (f, -g, tie breaker, state, path) as pushed by `solve_state`
+FrontierEntry = tuple[int, int, int, PackedState, MovePath]
+
+MOVE_STRUCT = struct.Struct("<HH")
+
+def pack_path(path: MovePath) -> bytes:
+  moves: list[bytes] = []
+  while path != None:
+    move, path = path
+    moves.append(MOVE_STRUCT.pack(*move))
+  moves.reverse()
+
+  return b"".join(moves)
+
+def unpack_path(data: bytes) -> MovePath:
+  path: MovePath = None
+  for move in MOVE_STRUCT.iter_unpack(data):
+    path = (move, path)
+
+  return path
+
+
+class Frontier:
+  """
+  The priority queue of states waiting to be expanded by `solve_state`, optionally bounded.
+
+  At most `max_entries` entries are held in memory. When there are more, the worse half is written
+  to an optional sqlite spill file and read back in priority order once it is needed, so the search
+  order is unchanged. Without a spill file the worse half is dropped and `dropped_min_f` records the
+  best f score lost, so the search knows when its result may not be the shortest.
+  """
+
+  def __init__(self, max_entries: int | None = None, spill_path: str | None = None) -> None:
+    """
+    Args:
+        max_entries (int | None, optional): The maximum number of entries held in memory or None for no limit. Defaults to None.
+        spill_path (str | None, optional): The sqlite file the worse entries are written to or None to drop them. Defaults to None.
+    """
+    self.max_entries = max(max_entries, 2) if max_entries != None else None
+    self._heap: list[FrontierEntry] = []
+
+    self.spills = 0
+    self.drops = 0
+    self.dropped_min_f: int | None = None
+
+    # the number of spilled entries and the priority of the best one
+    self._spilled_count = 0
+    self._spilled_min: tuple[int, int, int] | None = None
+    self._spill: sqlite3.Connection | None = None
+    if spill_path != None:
+      self._spill = sqlite3.connect(spill_path)
+      self._spill.execute("DROP TABLE IF EXISTS frontier")
+      self._spill.execute("CREATE TABLE frontier (f INTEGER, neg_g INTEGER, counter INTEGER, capacity INTEGER, data BLOB, path BLOB)")
+      self._spill.execute("CREATE INDEX frontier_order ON frontier (f, neg_g, counter)")
+
+  def push(self, entry: FrontierEntry) -> None:
+    """
+    Adds an entry, spilling or dropping the worse half of the entries if the frontier is full.
+
+    Args:
+        entry (FrontierEntry): The entry to add.
+    """
+    heapq.heappush(self._heap, entry)
+    if self.max_entries != None and len(self._heap) > self.max_entries:
+      self._evict()
+
+  def pop(self) -> FrontierEntry:
+    """
+    Removes the entry with the lowest (f, -g, tie breaker).
+
+    Returns:
+        FrontierEntry: The best entry.
+    """
+    if self._spilled_count > 0 and (len(self._heap) == 0 or self._spilled_min < self._heap[0][:3]):
+      self._reload()
+
+    return heapq.heappop(self._heap)
+
+  def _evict(self) -> None:
+    # a sorted list is a valid heap, so the better half stays in place
+    self._heap.sort()
+    keep = len(self._heap) // 2
+    evicted = self._heap[keep:]
+    del self._heap[keep:]
+
+    if self._spill == None:
+      self.drops += len(evicted)
+      f = evicted[0][0]
+      if self.dropped_min_f == None or f < self.dropped_min_f:
+        self.dropped_min_f = f
+      return
+
+    self._spill.executemany("INSERT INTO frontier VALUES (?, ?, ?, ?, ?, ?)", [
+      (f, neg_g, counter, state.capacity, state.data, pack_path(path)) for f, neg_g, counter, state, path in evicted
+    ])
+    self.spills += len(evicted)
+    self._spilled_count += len(evicted)
+    if self._spilled_min == None or evicted[0][:3] < self._spilled_min:
+      self._spilled_min = evicted[0][:3]
+
+  def _reload(self) -> None:
+    limit = self.max_entries // 2
+    rows = self._spill.execute("SELECT rowid, f, neg_g, counter, capacity, data, path FROM frontier ORDER BY f, neg_g, counter LIMIT ?", (limit,)).fetchall()
+    self._spill.executemany("DELETE FROM frontier WHERE rowid = ?", [(row[0],) for row in rows])
+    self._spilled_count -= len(rows)
+
+    for _, f, neg_g, counter, capacity, data, path in rows:
+      heapq.heappush(self._heap, (f, neg_g, counter, PackedState(data, capacity), unpack_path(path)))
+
+    self._spilled_min = None
+    if self._spilled_count > 0:
+      self._spilled_min = self._spill.execute("SELECT f, neg_g, counter FROM frontier ORDER BY f, neg_g, counter LIMIT 1").fetchone()
+
+  def close(self) -> None:
+    """Closes the spill file (if there is one)."""
+    if self._spill != None:
+      self._spill.close()
+      self._spill = None
+
+  def __len__(self) -> int:
+    return len(self._heap) + self._spilled_count
+
+  def __str__(self) -> str:
+    return f"entries={len(self)} in_memory={len(self._heap)} spills={self.spills} drops={self.drops}"
@@ -1,10 +1,18 @@
 
 from bottle import Bottle
 from water_sort_puzzle import WaterSortPuzzle
-from game_menu import GameMenu
+from game_menu import GameMenu, TextCache
+from water_wave import draw_sin_wave, WaterWave, WaveAnimator
+from renderer import BottleRenderer, ProfilerOverlay
+from hint_engine import HintEngine
+from prefetch import PuzzlePrefetcher, PuzzleParams
+from profiler import FrameProfiler
 import constants.colors as colors
-import math
 import pygame
+import time
+
+# the wave animation of the water drawn by `draw_bottle`
+wave_animator = WaveAnimator()
 
 def print_bottles(bottles: list[Bottle]) -> None:
   """
@@ -50,9 +58,10 @@ def draw_bottle(surface: pygame.Surface, bottle: Bottle, x: int, y: int, water_h
         pygame.draw.rect(surface, water.color, rect_vals)
       
       if bottle.get_remaining_capacity() != 0 and i + 1 == water.amount:
-        draw_sin_wave(surface, x+25, water.color, y - water_hight*water_seg_count, start=x+25-water_width,  shift=water.wave.shift, amplitude=water.wave.amplitude, spread=7)
-        water.wave.increment_amplitude()
-        water.wave.increment_shift()
+        wave = wave_animator.get_wave(water)
+        draw_sin_wave(surface, x+25, water.color, y - water_hight*water_seg_count, start=x+25-water_width,  shift=wave.shift, amplitude=wave.amplitude, spread=7)
+        wave.increment_amplitude()
+        wave.increment_shift()
 
       
       water_seg_count += 1
@@ -99,6 +108,8 @@ def draw_bottles(surface: pygame.Surface, bottles: list[Bottle], init_x: int, in
       x = init_x
       y += 250 + right_spacing*3
 
+  wave_animator.retain(bottles)
+
   return rects
 
 def get_mouse_colliding_rect(mouse_pos: tuple[int, int], rects: list[pygame.Rect]) -> int:
@@ -122,19 +133,6 @@ def get_mouse_colliding_rect(mouse_pos: tuple[int, int], rects: list[pygame.Rect
 
   return colliding_rect_index
 
-def draw_sin_wave(surface: pygame.Surface, width: int, color: tuple[int, int, int], offset: int, start=0, shift=0, amplitude=100, frequency=0.02, spread = 1) -> pygame.Rect:
-    points = []
-    
-    for x in range(start, width):
-        y = int(amplitude * math.sin((frequency * x + shift)/spread) + offset)
-        points.append((x, y))
-
-    points[0] = (start, offset)
-    points[-1] = (width - 1, offset)
-
-    return pygame.draw.polygon(surface, color, points)
-    
-
 def get_difficulty_params(difficulty: int, max_colored_bottle: int, max_shuffle_moves: int) -> tuple[int, int]:
   """
   Get the number of bottles with water in them and the number of shuffles to make based on the value of `difficulty`
@@ -155,8 +153,28 @@ def get_difficulty_params(difficulty: int, max_colored_bottle: int, max_shuffle_
 
   return max_colored_bottle, max_shuffle_moves
 
+def start_puzzle(puzzle: WaterSortPuzzle, prefetcher: PuzzlePrefetcher, params: PuzzleParams, water_id_map: dict[int, tuple[int, int, int]]) -> None:
+  """
+  Starts a puzzle from the prefetch queue, or builds one now if none is ready yet
+
+  Args:
+      puzzle (WaterSortPuzzle): The puzzle to start.
+      prefetcher (PuzzlePrefetcher): The queue of ready puzzles.
+      params (PuzzleParams): The empty bottle count, colored bottle count, bottle capacity and shuffle moves of the puzzle.
+      water_id_map (dict[int, tuple[int, int, int]]): The colors of the water.
+  """
+  state = prefetcher.take(params)
+  if state != None:
+    puzzle.load_bottles(state.to_bottles(water_id_map))
+    return
+
+  empty_bottle_count, colored_bottle_count, bottle_capacity, shuffle_moves = params
+  puzzle.create_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, water_id_map, shuffle_moves)
+
+def game_loop(screen: pygame.Surface, clock: pygame.time.Clock, difficulty: int, profiler: FrameProfiler | None = None) -> None:
+  if profiler == None:
+    profiler = FrameProfiler()
 
-def game_loop(screen: pygame.Surface, clock: pygame.time.Clock, difficulty: int) -> None:
   water_id_map = {
     0: colors.RED,
     1: colors.GREEN,
@@ -173,14 +191,33 @@ def game_loop(screen: pygame.Surface, clock: pygame.time.Clock, difficulty: int)
   max_colored_bottle = len(water_id_map)
   max_shuffle_moves = 1000
 
-  colored_bottle_count, shuffle_moves = get_difficulty_params(difficulty, max_colored_bottle, max_shuffle_moves)
+  # keep a few puzzles of every difficulty ready so starting the next one never stalls a frame
+  difficulty_params: list[PuzzleParams] = []
+  for params_difficulty in range(3):
+    colored_bottle_count, shuffle_moves = get_difficulty_params(params_difficulty, max_colored_bottle, max_shuffle_moves)
+    difficulty_params.append((empty_bottle_count, colored_bottle_count, bottle_capacity, shuffle_moves))
+
+  prefetcher = PuzzlePrefetcher()
+  for params in difficulty_params:
+    prefetcher.prefetch(params)
 
   puzzle = WaterSortPuzzle()
-  puzzle.create_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, water_id_map, shuffle_moves)
+  start_puzzle(puzzle, prefetcher, difficulty_params[difficulty], water_id_map)
+
+  renderer = BottleRenderer(100, 275)
+  hint_engine = HintEngine()
+  show_hint = False
+  profiler_overlay = ProfilerOverlay()
+
+  # tell the player when no move can help anymore, only undo or restart
+  text_cache = TextCache()
+  stuck_pos = (screen.get_width()//3, 40)
+  was_stuck = False
 
   running = True
 
   while running:
+    profiler.begin_frame()
     is_left_mouse_pressed = False
 
     # poll for events
@@ -189,53 +226,126 @@ def game_loop(screen: pygame.Surface, clock: pygame.time.Clock, difficulty: int)
         running = False
       if event.type == pygame.MOUSEBUTTONDOWN:
         is_left_mouse_pressed, _, _ =  pygame.mouse.get_pressed()
+      if event.type == pygame.MOUSEWHEEL:
+        # scroll the board, or zoom around the mouse while ctrl is held
+        if pygame.key.get_mods() & pygame.KMOD_CTRL:
+          renderer.viewport.zoom_at(1.1 ** event.y, pygame.mouse.get_pos())
+        else:
+          renderer.viewport.scroll_by(-event.x * 40, -event.y * 40)
       if event.type == pygame.KEYDOWN:
         if pygame.key.get_pressed()[pygame.K_r]:
           puzzle.restart_puzzle()
+          show_hint = False
 
         elif pygame.key.get_pressed()[pygame.K_RIGHT]:
-          puzzle.create_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, water_id_map, shuffle_moves)
+          start_puzzle(puzzle, prefetcher, difficulty_params[difficulty], water_id_map)
+          show_hint = False
+
+        elif pygame.key.get_pressed()[pygame.K_h]:
+          hint_engine.request(puzzle.bottles)
+          show_hint = True
 
         elif pygame.key.get_pressed()[pygame.K_LEFT]:
           puzzle.go_back()
+        elif pygame.key.get_pressed()[pygame.K_UP]:
+          puzzle.go_forward()
+        elif pygame.key.get_pressed()[pygame.K_F3]:
+          profiler.toggle()
+          renderer.invalidate()
         elif pygame.key.get_pressed()[pygame.K_ESCAPE]:
-          selected_difficulty = main_menu(screen, clock)
-          if selected_difficulty != difficulty:
-            colored_bottle_count, shuffle_moves = get_difficulty_params(selected_difficulty, max_colored_bottle, max_shuffle_moves)
-            puzzle.create_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, water_id_map, shuffle_moves)
+          selected_difficulty = main_menu(screen, clock, profiler)
+          renderer.invalidate()
+          show_hint = False
+          if selected_difficulty != difficulty and selected_difficulty != -1:
+            start_puzzle(puzzle, prefetcher, difficulty_params[selected_difficulty], water_id_map)
             difficulty = selected_difficulty
+    profiler.lap("events")
         
-    # fill the screen with a color to wipe away anything from last frame
-    screen.fill(colors.BLACK)
-
-    # render bottles
-    bottle_rects = draw_bottles(screen, puzzle.bottles, 100, 275, selected_bottle_index=puzzle.selected_bottle_index)
+    # the hint search and the next puzzles run in other processes, poll() only picks up finished results
+    prefetcher.poll()
+    hint_move = hint_engine.poll(puzzle.bottles) if show_hint else None
+
+    is_stuck = puzzle.is_stuck()
+    if is_stuck != was_stuck:
+      # a full redraw clears the message when the player gets unstuck
+      renderer.invalidate()
+      was_stuck = is_stuck
+    profiler.lap("update")
+
+    # render only the bottles and waves that changed since last frame
+    dirty_rects = renderer.draw(screen, puzzle.bottles, selected_bottle_index=puzzle.selected_bottle_index, hint_move=hint_move, profiler=profiler)
+    if is_stuck:
+      dirty_rects.append(text_cache.draw(screen, "Stuck! LEFT to undo, R to restart", 30, colors.RED, stuck_pos))
+    if profiler.enabled:
+      dirty_rects += profiler_overlay.draw(screen, profiler)
+    profiler.lap("render")
 
     if puzzle.is_puzzle_solved():
-      puzzle.create_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, water_id_map, shuffle_moves)
+      start_puzzle(puzzle, prefetcher, difficulty_params[difficulty], water_id_map)
+      show_hint = False
 
     if is_left_mouse_pressed:
-      mouse_pos = pygame.mouse.get_pos()
-      pressed_rect_index = get_mouse_colliding_rect(mouse_pos, bottle_rects)
+      pressed_bottle_index = renderer.get_bottle_at(pygame.mouse.get_pos())
 
-      puzzle.select_bottle(pressed_rect_index)
+      puzzle.select_bottle(pressed_bottle_index)
+    profiler.lap("update")
 
-    # flip() the display to put your work on screen
-    pygame.display.flip()
+    # update() only the dirty areas of the display to put your work on screen
+    pygame.display.update(dirty_rects)
+    profiler.lap("display")
 
     clock.tick(60)  # limits FPS to 60
+    profiler.lap("tick")
+    profiler.end_frame()
+
+  hint_engine.shutdown()
+  prefetcher.shutdown()
+
+def draw_main_menu(screen: pygame.Surface, game_menu: GameMenu, menu_start_pos: tuple[int, int], mouse_pos: tuple[int, int], wave: WaterWave, profiler: FrameProfiler | None = None) -> list[pygame.Rect]:
+  """
+  Draw a frame of the main menu and advance its wave animation
+
+  Args:
+      screen (pygame.Surface): The surface (game window) to draw the menu on.
+      game_menu (GameMenu): The menu to draw.
+      menu_start_pos (tuple[int, int]): The x, y coordinates of the menu title.
+      mouse_pos (tuple[int, int]): The x, y coordinates of the mouse.
+      wave (WaterWave): The state of the wave animation.
+      profiler (FrameProfiler | None, optional): Times the wave drawing as `waves`. Defaults to None.
+
+  Returns:
+      list[pygame.Rect]: The rects of the menu items that were drawn onto the surface
+  """
+  screen.fill(colors.BLACK)
+  menu_item_rects = game_menu.draw(screen, menu_start_pos, mouse_pos=mouse_pos)
+
+  timed = profiler != None and profiler.enabled
+  start_time = time.perf_counter() if timed else 0.0
+  pygame.draw.rect(screen, colors.BLUE, (0, screen.get_height()//2, screen.get_width(), screen.get_height()//2 ))
+  draw_sin_wave(screen, screen.get_width(), colors.LIGHT_BLUE, screen.get_height()//2, shift=wave.shift, amplitude=wave.amplitude, spread=7, frequency=0.02)
+  draw_sin_wave(screen, screen.get_width(), colors.LIGHT_BLUE, screen.get_height()//2, shift=1, amplitude=wave.amplitude, spread=7, frequency=0.02)
+  if timed:
+    profiler.add("waves", time.perf_counter() - start_time)
+
+  wave.increment_amplitude()
+  wave.increment_shift()
+
+  return menu_item_rects
+
+def main_menu(screen: pygame.Surface, clock: pygame.time.Clock, profiler: FrameProfiler | None = None) -> int:
+  if profiler == None:
+    profiler = FrameProfiler()
 
-def main_menu(screen: pygame.Surface, clock: pygame.time.Clock) -> int:
   menu_start_pos = (screen.get_width()//20, screen.get_height()//20)
   game_menu = GameMenu()
   difficulty = -1
 
-  offset = 1
-  amplitude = 5
-  amp_increment = 1/5
+  wave = WaterWave(1, 5)
+  profiler_overlay = ProfilerOverlay()
 
   running = True
   while running:
+    profiler.begin_frame()
     is_left_mouse_pressed = False
     pressed_menu_item_index = -1
 
@@ -245,39 +355,33 @@ def main_menu(screen: pygame.Surface, clock: pygame.time.Clock) -> int:
         running = False
       if event.type == pygame.MOUSEBUTTONDOWN:
         is_left_mouse_pressed, _, _ =  pygame.mouse.get_pressed()
+      if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+        profiler.toggle()
+    profiler.lap("events")
     
     if game_menu.is_difficulty_selected():
       difficulty = game_menu.get_difficulty()
       running = False
 
-
-    screen.fill(colors.BLACK)
     mouse_pos = pygame.mouse.get_pos()
-    menu_item_rects = game_menu.draw(screen, menu_start_pos, mouse_pos=mouse_pos)
-
-    # TODO: Move to a class/function
-    pygame.draw.rect(screen, colors.BLUE, (0, screen.get_height()//2, screen.get_width(), screen.get_height()//2 ))
-    draw_sin_wave(screen, screen.get_width(), colors.LIGHT_BLUE, screen.get_height()//2, shift=offset, amplitude=amplitude, spread=7, frequency=0.02)
-    draw_sin_wave(screen, screen.get_width(), colors.LIGHT_BLUE, screen.get_height()//2, shift=1, amplitude=amplitude, spread=7, frequency=0.02)
-
-    if amplitude <= -10:
-      amp_increment = 1/5
-    if amplitude >= 10:
-      amp_increment = -1/5
-    amplitude += amp_increment
+    menu_item_rects = draw_main_menu(screen, game_menu, menu_start_pos, mouse_pos, wave, profiler)
+    if profiler.enabled:
+      profiler_overlay.draw(screen, profiler)
+    profiler.lap("menu")
 
-    offset += 1/30
-    
-    
     if is_left_mouse_pressed:
       pressed_menu_item_index = get_mouse_colliding_rect(mouse_pos, menu_item_rects)
       game_menu.press(pressed_menu_item_index)
+    profiler.lap("update")
 
 
     # flip() the display to put your work on screen
     pygame.display.flip()
+    profiler.lap("display")
 
     clock.tick(60)  # limits FPS to 60
+    profiler.lap("tick")
+    profiler.end_frame()
 
   return difficulty
 
@@ -286,12 +390,13 @@ def main() -> None:
   pygame.init()
   screen = pygame.display.set_mode((1280, 720))
   clock = pygame.time.Clock()
+  profiler = FrameProfiler.from_env()
 
-  difficulty = main_menu(screen, clock)
-  if difficulty == -1:
-    return
-  
-  game_loop(screen, clock, difficulty)
+  difficulty = main_menu(screen, clock, profiler)
+  if difficulty != -1:
+    game_loop(screen, clock, difficulty, profiler)
+
+  profiler.export_env()
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
@@ -8,6 +8,37 @@ def draw_text(surface: pygame.Surface, text: str, font: pygame.font.Font, color:
   return surface.blit(text_surface, pos)
 
 
+class TextCache:
+  """
+  Loads each font size once and keeps every rendered text surface so menus are not re-rasterized each frame.
+  """
+
+  def __init__(self, font_name: str | None = None) -> None:
+    self.font_name = font_name
+    self.fonts: dict[int, pygame.font.Font] = {}
+    self.text_surfaces: dict[tuple[str, int, tuple[int, int, int]], pygame.Surface] = {}
+
+  def get_font(self, font_size: int) -> pygame.font.Font:
+    font = self.fonts.get(font_size)
+    if font == None:
+      font = pygame.font.SysFont(self.font_name, font_size)
+      self.fonts[font_size] = font
+
+    return font
+
+  def render(self, text: str, font_size: int, color: tuple[int, int, int]) -> pygame.Surface:
+    key = (text, font_size, color)
+    text_surface = self.text_surfaces.get(key)
+    if text_surface == None:
+      text_surface = self.get_font(font_size).render(text, True, color)
+      self.text_surfaces[key] = text_surface
+
+    return text_surface
+
+  def draw(self, surface: pygame.Surface, text: str, font_size: int, color: tuple[int, int, int], pos: tuple[int, int]) -> pygame.Rect:
+    return surface.blit(self.render(text, font_size, color), pos)
+
+
 class GameMenuItem:
 
   def __init__(self, name: str, on_press) -> None:
@@ -17,19 +48,19 @@ class GameMenuItem:
   def press(self) -> None:
     self.on_press()
 
-  def draw(self, surface: pygame.Surface, pos: tuple[int, int], font: pygame.font.Font, mouse_pos: tuple[int, int] = (-1, -1)) -> pygame.Rect:
-    rect =  draw_text(surface, self.name, font, colors.GRAY, pos)
-    if rect.collidepoint(mouse_pos):
-      rect.move(-999, -999)
-      return draw_text(surface, self.name, font, colors.LIGHT_GRAY, pos)
-    
-    return rect
+  def draw(self, surface: pygame.Surface, pos: tuple[int, int], text_cache: TextCache, font_size: int, mouse_pos: tuple[int, int] = (-1, -1)) -> pygame.Rect:
+    # both colors render to the same size so the hover test can be made before drawing
+    rect = text_cache.render(self.name, font_size, colors.GRAY).get_rect(topleft=pos)
+    color = colors.LIGHT_GRAY if rect.collidepoint(mouse_pos) else colors.GRAY
+
+    return text_cache.draw(surface, self.name, font_size, color, pos)
 
 class GameMenu:
    
   def __init__(self, font_name: str | None = None) -> None:
     self._difficulty = -1
     self.font_name = font_name
+    self.text_cache = TextCache(font_name)
     
     self.menu_items: list[GameMenuItem] = []
     names = ['Easy', "Medium", "Hard"]
@@ -57,18 +88,15 @@ class GameMenu:
     
   def draw(self, surface: pygame.Surface, pos: tuple[int, int], mouse_pos: tuple[int, int] = (-1, -1)) -> list[pygame.Rect]:
     rects: list[pygame.Rect] = []
-    
-    menu_item_font = pygame.font.SysFont(None, FONT_SIZE)
-    title_font = pygame.font.SysFont(None, FONT_SIZE*2)
 
     title_text = "Water Sort Puzzle"
     x, y = pos
 
-    draw_text(surface, title_text, title_font, colors.GRAY, (x, y))
+    self.text_cache.draw(surface, title_text, FONT_SIZE*2, colors.GRAY, (x, y))
     y += FONT_SIZE*2
     x += 10
     for menu_item in self.menu_items:
-      rect = menu_item.draw(surface, (x, y), menu_item_font, mouse_pos=mouse_pos)
+      rect = menu_item.draw(surface, (x, y), self.text_cache, FONT_SIZE, mouse_pos=mouse_pos)
       rects.append(rect)
       y += FONT_SIZE
     
@@ -0,0 +1,250 @@
+"""
+Generates batches of solvable puzzles across a process pool.
+
+Run `python generator.py --help` for the command line options.
+"""
+from __future__ import annotations
+from helpers.bottle_setup import init_bottles, top_off_bottles
+from helpers.canonical import canonicalize
+from helpers.shuffle import shuffle_bottles
+from difficulty import DifficultyRater, DifficultyRating, rate_state
+from level_pack import LevelPackWriter
+from packed_state import PackedState
+from typing import Iterator, TextIO
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+
+# the seeds tried per requested puzzle when no `max_attempts` is given
+ATTEMPTS_PER_PUZZLE = 100
+
+class GeneratorParams:
+  """
+  The layout of the puzzles to generate.
+  """
+  def __init__(self, color_count: int, empty_count: int, bottle_capacity: int, shuffle_moves: int, max_nodes: int = 200_000, min_difficulty: float | None = None, max_difficulty: float | None = None) -> None:
+    """
+    Args:
+        color_count (int): Number of bottles with colored water segments in them.
+        empty_count (int): Number of empty bottles.
+        bottle_capacity (int): The maximum amount of water a bottle can hold.
+        shuffle_moves (int): The number of times the water segments are shuffled.
+        max_nodes (int, optional): The solver budget used to prove a puzzle is solvable. Defaults to 200_000.
+        min_difficulty (float | None, optional): The lowest difficulty score to keep or None for no minimum. Defaults to None.
+        max_difficulty (float | None, optional): The highest difficulty score to keep or None for no maximum. Defaults to None.
+    """
+    self.color_count = color_count
+    self.empty_count = empty_count
+    self.bottle_capacity = bottle_capacity
+    self.shuffle_moves = shuffle_moves
+    self.max_nodes = max_nodes
+    self.min_difficulty = min_difficulty
+    self.max_difficulty = max_difficulty
+
+  def is_in_band(self, difficulty: float) -> bool:
+    """
+    Args:
+        difficulty (float): A difficulty score.
+
+    Returns:
+        bool: True if the score is within the requested difficulty band.
+    """
+    if self.min_difficulty != None and difficulty < self.min_difficulty:
+      return False
+    if self.max_difficulty != None and difficulty > self.max_difficulty:
+      return False
+    return True
+
+
+class GeneratedPuzzle:
+  """
+  A puzzle that was proven solvable along with its difficulty.
+  """
+  def __init__(self, state: PackedState, solution_length: int, difficulty: float, seed: int) -> None:
+    """
+    Args:
+        state (PackedState): The starting state of the puzzle.
+        solution_length (int): The number of moves in the shortest solution.
+        difficulty (float): The difficulty score of the puzzle (see `difficulty.rate_state`).
+        seed (int): The random seed the puzzle was generated from.
+    """
+    self.state = state
+    self.solution_length = solution_length
+    self.difficulty = difficulty
+    self.seed = seed
+
+  def to_json(self) -> str:
+    """
+    Returns:
+        str: The puzzle as a single line of JSON with the water ids of each bottle, bottom first.
+    """
+    bottles = [[slot - 1 for slot in self.state.get_bottle(i)] for i in range(self.state.bottle_count())]
+    return json.dumps({
+      "capacity": self.state.capacity,
+      "bottles": bottles,
+      "solution_length": self.solution_length,
+      "difficulty": self.difficulty,
+      "seed": self.seed,
+    })
+
+
+def generate_puzzle(params: GeneratorParams, seed: int, rater: DifficultyRater | None = None) -> GeneratedPuzzle | None:
+  """
+  Generates a single puzzle the same way `WaterSortPuzzle.create_bottles` does and rates it.
+
+  Args:
+      params (GeneratorParams): The layout of the puzzle.
+      seed (int): The random seed to generate the puzzle from.
+      rater (DifficultyRater | None, optional): A rater that remembers the ratings of earlier puzzles or None to always solve the puzzle. Defaults to None.
+
+  Returns:
+      GeneratedPuzzle | None: The puzzle or None if it could not be solved within the solver budget or is outside the difficulty band.
+  """
+  random.seed(seed)
+  water_id_map = {water_id: (0, 0, 0) for water_id in range(params.color_count)}
+
+  bottles = init_bottles(params.empty_count, params.color_count, params.bottle_capacity, water_id_map)
+  shuffle_bottles(bottles, params.shuffle_moves)
+  top_off_bottles(bottles)
+
+  state = PackedState.from_bottles(bottles)
+  if state.is_solved():
+    return None
+
+  rating: DifficultyRating | None
+  if rater != None:
+    rating = rater.rate(state)
+  else:
+    rating = rate_state(state, max_nodes=params.max_nodes)
+  if rating == None or not params.is_in_band(rating.score):
+    return None
+
+  return GeneratedPuzzle(state, rating.solution_length, rating.score, seed)
+
+# the rater of this worker process, so a puzzle that was already rated by the worker is not solved again
+_worker_rater: DifficultyRater | None = None
+
+def _generate_puzzle_task(task: tuple[GeneratorParams, int]) -> GeneratedPuzzle | None:
+  global _worker_rater
+  params, seed = task
+  if _worker_rater == None or _worker_rater.max_nodes != params.max_nodes:
+    _worker_rater = DifficultyRater(max_nodes=params.max_nodes)
+
+  return generate_puzzle(params, seed, _worker_rater)
+
+def generate_puzzles(params: GeneratorParams, count: int, processes: int | None = None, seed: int = 0, max_attempts: int | None = None) -> Iterator[GeneratedPuzzle]:
+  """
+  Generates `count` distinct solvable puzzles across a process pool, yielding each as soon as it is ready.
+  Puzzles that only differ by bottle order or water ids are treated as duplicates.
+
+  Args:
+      params (GeneratorParams): The layout of the puzzles.
+      count (int): The number of puzzles to generate.
+      processes (int | None, optional): The number of worker processes or None for one per core. Defaults to None.
+      seed (int, optional): The first random seed, each attempt uses the next seed. Defaults to 0.
+      max_attempts (int | None, optional): The maximum number of seeds to try or None for `ATTEMPTS_PER_PUZZLE` seeds per puzzle.
+        Fewer than `count` puzzles are generated if a narrow difficulty band is rarely hit or the layout has fewer distinct puzzles. Defaults to None.
+
+  Yields:
+      Iterator[GeneratedPuzzle]: The generated puzzles.
+  """
+  seen: set[PackedState] = set()
+  next_seed = seed
+  if max_attempts == None:
+    max_attempts = count * ATTEMPTS_PER_PUZZLE
+
+  with multiprocessing.Pool(processes) as pool:
+    while len(seen) < count:
+      # over-request a little since some attempts are unsolvable or duplicates
+      batch_size = min((count - len(seen)) + (count - len(seen)) // 4 + 1, seed + max_attempts - next_seed)
+      if batch_size <= 0:
+        return
+      tasks = [(params, s) for s in range(next_seed, next_seed + batch_size)]
+      next_seed += batch_size
+
+      for puzzle in pool.imap_unordered(_generate_puzzle_task, tasks, chunksize=4):
+        if puzzle == None or len(seen) >= count:
+          continue
+
+        key = canonicalize(puzzle.state)
+        if key in seen:
+          continue
+
+        seen.add(key)
+        yield puzzle
+
+def write_puzzles(puzzles: Iterator[GeneratedPuzzle], file: TextIO) -> int:
+  """
+  Streams puzzles to a file as JSON lines.
+
+  Args:
+      puzzles (Iterator[GeneratedPuzzle]): The puzzles to write.
+      file (TextIO): The file to write to.
+
+  Returns:
+      int: The number of puzzles written.
+  """
+  written = 0
+  for puzzle in puzzles:
+    file.write(puzzle.to_json() + "\n")
+    file.flush()
+    written += 1
+
+  return written
+
+def write_level_pack(puzzles: Iterator[GeneratedPuzzle], path: str, params: GeneratorParams) -> int:
+  """
+  Writes puzzles to a level pack (see `level_pack`).
+
+  Args:
+      puzzles (Iterator[GeneratedPuzzle]): The puzzles to write.
+      path (str): The level pack file to write.
+      params (GeneratorParams): The layout the puzzles were generated with.
+
+  Returns:
+      int: The number of puzzles written.
+  """
+  with LevelPackWriter(path, params.color_count + params.empty_count, params.bottle_capacity) as writer:
+    for puzzle in puzzles:
+      writer.add(puzzle.state, puzzle.solution_length, puzzle.difficulty)
+
+    return writer.record_count
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="Generate solvable water sort puzzles.")
+  parser.add_argument("count", type=int, help="number of puzzles to generate")
+  parser.add_argument("--colors", type=int, default=8, help="number of colored bottles")
+  parser.add_argument("--empties", type=int, default=2, help="number of empty bottles")
+  parser.add_argument("--capacity", type=int, default=4, help="bottle capacity")
+  parser.add_argument("--shuffles", type=int, default=1000, help="shuffle moves per puzzle")
+  parser.add_argument("--max-nodes", type=int, default=200_000, help="solver budget per puzzle")
+  parser.add_argument("--min-difficulty", type=float, default=None, help="lowest difficulty score to keep")
+  parser.add_argument("--max-difficulty", type=float, default=None, help="highest difficulty score to keep")
+  parser.add_argument("--max-attempts", type=int, default=None, help=f"maximum number of seeds to try (default: {ATTEMPTS_PER_PUZZLE} per puzzle)")
+  parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per core)")
+  parser.add_argument("--seed", type=int, default=0, help="first random seed")
+  parser.add_argument("--output", default="-", help="output file, '-' for stdout")
+  parser.add_argument("--format", choices=["jsonl", "pack"], default="jsonl", help="JSON lines or a binary level pack")
+  args = parser.parse_args()
+
+  params = GeneratorParams(args.colors, args.empties, args.capacity, args.shuffles, max_nodes=args.max_nodes, min_difficulty=args.min_difficulty, max_difficulty=args.max_difficulty)
+  puzzles = generate_puzzles(params, args.count, processes=args.processes, seed=args.seed, max_attempts=args.max_attempts)
+
+  if args.format == "pack":
+    if args.output == "-":
+      parser.error("a level pack needs an --output file")
+    written = write_level_pack(puzzles, args.output, params)
+  elif args.output == "-":
+    written = write_puzzles(puzzles, sys.stdout)
+  else:
+    with open(args.output, "w") as file:
+      written = write_puzzles(puzzles, file)
+
+  if written < args.count:
+    print(f"only {written} of {args.count} puzzles were generated, too few distinct solvable puzzles in the difficulty band were found within --max-attempts", file=sys.stderr)
+
+if __name__ == "__main__":
+  main()
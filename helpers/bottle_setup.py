@@ -1,5 +1,7 @@
 from bottle import Bottle, Water, copy_bottles
 
+import heapq
+
 ColorValue = tuple[int, int, int]
 WaterColorMap = dict[int, ColorValue]
 
@@ -18,48 +20,62 @@ def init_bottles(empty_count: int, color_count: int, bottle_capacity: int, water
 
   return bottles
 
-def find_largest_bottle_cap(bottles: list[Bottle]) -> int:
-  largest_bottle_cap_index = -1
-  largest_bottle_cap = float('-inf')
-  for index, bottle in enumerate(bottles):
-    bottle_cap =  bottle.get_remaining_capacity()
+def top_off_bottles(bottles: list[Bottle], history: list[list[Bottle]] | None = None) -> None:
+  """
+  Pours the water of the emptiest partly filled bottle into the fullest partly filled bottle
+  until at most one bottle is partly filled.
 
-    if not bottle.is_empty() and bottle_cap != 0 and largest_bottle_cap < bottle_cap:
-      largest_bottle_cap_index = index
-      largest_bottle_cap = bottle_cap
+  The bottles are kept in two heaps keyed on remaining capacity, and each pour moves a whole
+  water segment (or as much of it as fits) instead of a single unit.
 
-  
-  return largest_bottle_cap_index
+  Args:
+      bottles (list[Bottle]): The bottles to top off.
+      history (list[list[Bottle]] | None, optional): A list to append a copy of the bottles to after every pour or None to record nothing. Defaults to None.
+  """
+  # entries are (-remaining capacity, index) and (remaining capacity, -index) so ties pick
+  # the first emptiest and the last fullest bottle, entries that no longer match a bottle are skipped
+  emptiest: list[tuple[int, int]] = []
+  fullest: list[tuple[int, int]] = []
 
-def find_smallest_bottle_cap(bottles: list[Bottle]) -> int:
-  smallest_bottle_cap_index = -1
-  smallest_bottle_cap = float('inf')
-  for index, bottle in enumerate(bottles):
-    bottle_cap =  bottle.get_remaining_capacity()
+  def push(index: int) -> None:
+    bottle = bottles[index]
+    remaining_capacity = bottle.get_remaining_capacity()
+    if not bottle.is_empty() and remaining_capacity != 0:
+      heapq.heappush(emptiest, (-remaining_capacity, index))
+      heapq.heappush(fullest, (remaining_capacity, -index))
 
-    if not bottle.is_empty() and bottle_cap != 0 and smallest_bottle_cap >= bottle_cap:
-      smallest_bottle_cap_index = index
-      smallest_bottle_cap = bottle_cap
+  def is_current(remaining_capacity: int, index: int) -> bool:
+    bottle = bottles[index]
+    return not bottle.is_empty() and bottle.get_remaining_capacity() == remaining_capacity
 
-  return smallest_bottle_cap_index
+  for index in range(len(bottles)):
+    push(index)
 
-def top_off_bottles(bottles: list[Bottle], history: list[list[Bottle]] = []) -> None:
-  largest_bottle_cap_index = find_largest_bottle_cap(bottles)
-  smallest_bottle_cap_index = find_smallest_bottle_cap(bottles)
+  while True:
+    while len(emptiest) > 0 and not is_current(-emptiest[0][0], emptiest[0][1]):
+      heapq.heappop(emptiest)
+    while len(fullest) > 0 and not is_current(fullest[0][0], -fullest[0][1]):
+      heapq.heappop(fullest)
 
-  while largest_bottle_cap_index != -1 and smallest_bottle_cap_index != -1 and smallest_bottle_cap_index != largest_bottle_cap_index:
-    from_bottle = bottles[largest_bottle_cap_index]
-    to_bottle = bottles[smallest_bottle_cap_index]
+    if len(emptiest) == 0 or len(fullest) == 0:
+      return
 
-    water = from_bottle.pop_water(1)
-    if not to_bottle.push_water(water):
-      from_bottle.push_water(water)
+    from_index = emptiest[0][1]
+    to_index = -fullest[0][1]
+    if from_index == to_index:
       return
-    
-    history.append(copy_bottles(bottles))
-    
-    largest_bottle_cap_index = find_largest_bottle_cap(bottles)
-    smallest_bottle_cap_index = find_smallest_bottle_cap(bottles)
 
-    
+    from_bottle = bottles[from_index]
+    to_bottle = bottles[to_index]
+
+    # the same two bottles stay the emptiest and fullest until one of them is empty or full,
+    # so pouring segment by segment matches pouring unit by unit
+    while not from_bottle.is_empty() and to_bottle.get_remaining_capacity() != 0:
+      water = from_bottle.pop_water(min(from_bottle.get_top_water().amount, to_bottle.get_remaining_capacity()))
+      to_bottle.push_water(water)
+
+      if history != None:
+        history.append(copy_bottles(bottles))
 
+    push(from_index)
+    push(to_index)
@@ -0,0 +1,256 @@
+from packed_state import PackedState, EMPTY_SLOT
+
+def relabel(bottles: list[bytes]) -> list[bytes]:
+  """
+  Renames the water ids in order of first appearance (bottom to top, first bottle to last).
+
+  Args:
+      bottles (list[bytes]): The filled slots of each bottle.
+
+  Returns:
+      list[bytes]: The relabeled bottles.
+  """
+  table = bytearray(range(256))
+  # a dict keeps the water ids in order of first appearance
+  for label, slot in enumerate(dict.fromkeys(b"".join(bottles)), EMPTY_SLOT + 1):
+    table[slot] = label
+
+  return [water.translate(table) for water in bottles]
+
+# bottle contents -> `get_layout` of the bottle, cleared when it reaches `MAX_CACHED_LAYOUTS`
+_layouts: dict[bytes, tuple[bytes, tuple[int, ...]]] = {}
+MAX_CACHED_LAYOUTS = 1 << 16
+
+def get_layout(water: bytes) -> tuple[bytes, tuple[int, ...]]:
+  """
+  Args:
+      water (bytes): The filled slots of a bottle.
+
+  Returns:
+      tuple[bytes, tuple[int, ...]]: The bottle relabeled on its own, which only depends on the layout of its water segments,
+        and the water id of each segment, bottom segment first.
+  """
+  layout = _layouts.get(water)
+  if layout == None:
+    if len(_layouts) >= MAX_CACHED_LAYOUTS:
+      _layouts.clear()
+    segments = tuple(slot for position, slot in enumerate(water) if position == 0 or water[position - 1] != slot)
+    layout = _layouts[water] = (relabel([water])[0], segments)
+
+  return layout
+
+def get_ranks(signatures: list) -> list[int]:
+  """
+  Args:
+      signatures (list): Comparable signatures.
+
+  Returns:
+      list[int]: The position of each signature among the distinct signatures in sorted order.
+  """
+  order = {signature: rank for rank, signature in enumerate(sorted(set(signatures)))}
+  return [order[signature] for signature in signatures]
+
+def refine(bottles: list[bytes]) -> list[int]:
+  """
+  Ranks the bottles by colour refinement: a bottle is described by its own pattern and the description of
+  each water in it, a water by the bottles and positions it is found at, until the descriptions stop
+  splitting the bottles further. The ranks only depend on the layout, not on the bottle order or water ids.
+
+  Args:
+      bottles (list[bytes]): The filled slots of each bottle.
+
+  Returns:
+      list[int]: The rank of each bottle.
+  """
+  layouts = [get_layout(water) for water in bottles]
+  ranks = get_ranks([shape for shape, _ in layouts])
+  class_count = len(set(ranks))
+  # bottles with the same contents can never be split
+  distinct_count = len(set(bottles))
+
+  while class_count < distinct_count:
+    # a bottle's rank includes its shape, so (rank, segment index) places a water exactly
+    occurrences: dict[int, list[tuple[int, int]]] = {}
+    for rank, (_, segments) in zip(ranks, layouts):
+      for index, slot in enumerate(segments):
+        occurrences.setdefault(slot, []).append((rank, index))
+
+    water_ranks = dict(zip(occurrences, get_ranks([tuple(sorted(found)) for found in occurrences.values()])))
+    next_ranks = get_ranks([(rank, tuple([water_ranks[slot] for slot in segments])) for rank, (_, segments) in zip(ranks, layouts)])
+    next_class_count = len(set(next_ranks))
+    if next_class_count == class_count:
+      break
+
+    ranks = next_ranks
+    class_count = next_class_count
+
+  return ranks
+
+def get_ranked_order(bottles: list[bytes], ranks: list[int]) -> list[bytes] | None:
+  """
+  Args:
+      bottles (list[bytes]): The filled slots of each bottle.
+      ranks (list[int]): The rank of each bottle from `refine`.
+
+  Returns:
+      list[bytes] | None: The bottles sorted by rank or None if the ranks leave a choice of order. Bottles with the same rank
+        (and so the same shape) whose waters are found in no other bottle relabel the same in any order, so they leave no choice.
+  """
+  contents_by_rank: dict[int, bytes] = {}
+  totals: dict[int, int] | None = None
+  for rank, water in zip(ranks, bottles):
+    other = contents_by_rank.setdefault(rank, water)
+    if other == water:
+      continue
+
+    if totals == None:
+      totals = {}
+      for slot in b"".join(bottles):
+        totals[slot] = totals.get(slot, 0) + 1
+    if not all(totals[slot] == other.count(slot) for slot in other) or not all(totals[slot] == water.count(slot) for slot in water):
+      return None
+
+  return [water for _, water in sorted(zip(ranks, bottles))]
+
+def label_bottle(water: bytes, labels: dict[int, int]) -> tuple[bytes, dict[int, int]]:
+  """
+  Args:
+      water (bytes): The filled slots of a bottle.
+      labels (dict[int, int]): The labels given so far, new water ids get the next labels in order of appearance.
+
+  Returns:
+      tuple[bytes, dict[int, int]]: The labeled bottle and the labels including any new ones (a copy if there were any).
+  """
+  new_labels = labels
+  for slot in water:
+    if slot not in new_labels:
+      if new_labels is labels:
+        new_labels = dict(labels)
+      new_labels[slot] = len(new_labels) + 1
+
+  return bytes(new_labels[slot] for slot in water), new_labels
+
+def canonicalize_component(bottles: list[bytes]) -> tuple[list[bytes], list[bytes]]:
+  """
+  Gets the canonical form of bottles that share their waters: the smallest relabeling in order of first
+  appearance over every bottle order that keeps the bottles sorted by `refine` rank. Only bottles with the
+  same rank that also label the same way are branched on.
+
+  Args:
+      bottles (list[bytes]): The filled slots of each bottle.
+
+  Returns:
+      tuple[list[bytes], list[bytes]]: The relabeled bottles in canonical order and the same bottles with their own water ids.
+  """
+  if len(bottles) == 1:
+    return relabel(bottles), bottles
+
+  ranks = refine(bottles)
+  ordered = get_ranked_order(bottles, ranks)
+  if ordered != None:
+    return relabel(ordered), ordered
+
+  position_ranks = sorted(ranks)
+  best: list[bytes] | None = None
+  best_order: list[int] = []
+
+  def visit(remaining: list[int], labels: dict[int, int], prefix: list[bytes], order: list[int], smaller: bool) -> None:
+    nonlocal best, best_order
+    position = len(prefix)
+    if position == len(bottles):
+      best = list(prefix)
+      best_order = list(order)
+      return
+
+    candidates = [(label_bottle(bottles[i], labels), i) for i in remaining if ranks[i] == position_ranks[position]]
+    chunk = min(labeled for (labeled, _), _ in candidates)
+    if not smaller and best != None:
+      if chunk > best[position]:
+        return
+      smaller = chunk < best[position]
+
+    # bottles with the same contents are interchangeable
+    tried: set[bytes] = set()
+    for (labeled, next_labels), i in candidates:
+      if labeled != chunk or bottles[i] in tried:
+        continue
+      tried.add(bottles[i])
+
+      prefix.append(chunk)
+      order.append(i)
+      visit([j for j in remaining if j != i], next_labels, prefix, order, smaller or best == None)
+      order.pop()
+      prefix.pop()
+      # every later branch must now beat `best`
+      smaller = False
+
+  visit(list(range(len(bottles))), {}, [], [], False)
+  return best, [bottles[i] for i in best_order]
+
+def canonicalize_groups(bottles: list[bytes]) -> list[bytes]:
+  """
+  Args:
+      bottles (list[bytes]): The filled slots of each bottle.
+
+  Returns:
+      list[bytes]: The bottles in canonical order, the empty bottles first and then each group of bottles that share waters in canonical form.
+  """
+  # group the bottles that share a water with a union find over water ids
+  parents = list(range(256))
+  def find(slot: int) -> int:
+    while parents[slot] != slot:
+      parents[slot] = parents[parents[slot]]
+      slot = parents[slot]
+    return slot
+
+  for water in bottles:
+    if len(water) > 1:
+      root = find(water[0])
+      for slot in set(water):
+        parents[find(slot)] = root
+
+  components: dict[int, list[bytes]] = {}
+  empty_count = 0
+  for water in bottles:
+    if len(water) == 0:
+      empty_count += 1
+    else:
+      components.setdefault(find(water[0]), []).append(water)
+
+  # each group keeps its own water ids so the groups get distinct labels once the whole board is relabeled
+  canonical_components = sorted(canonicalize_component(component) for component in components.values())
+  return [bytes()] * empty_count + [water for _, component in canonical_components for water in component]
+
+def canonicalize(state: PackedState) -> PackedState:
+  """
+  Maps a state to a representative of every state that only differs from it by the order of
+  the bottles or by the water ids. Two states with the same canonical form are solved by the same
+  number of moves, so the canonical form can be used as a transposition key.
+
+  The bottles are ordered by `refine` rank. If that leaves a choice, the bottles are split into groups
+  that share waters, each group is put in canonical form (see `canonicalize_component`) and the groups
+  are ordered by their canonical forms.
+
+  Args:
+      state (PackedState): The state to canonicalize.
+
+  Returns:
+      PackedState: The canonical form of `state`.
+  """
+  bottles = [state.get_bottle(i) for i in range(state.bottle_count())]
+  ordered = get_ranked_order(bottles, refine(bottles))
+  if ordered == None:
+    ordered = canonicalize_groups(bottles)
+
+  data = b"".join(water.ljust(state.capacity, bytes([EMPTY_SLOT])) for water in relabel(ordered))
+  return PackedState(data, state.capacity)
+
+def canonical_hash(state: PackedState) -> int:
+  """
+  Args:
+      state (PackedState): The state to hash.
+
+  Returns:
+      int: The hash of the canonical form of `state`.
+  """
+  return hash(canonicalize(state))
@@ -26,34 +26,100 @@ def shuffle_move_water(bottles: list[Bottle], from_index: int, to_index: int, am
 
   return suc
 
-def shuffle_bottles(bottles: list[Bottle], move_count: int) -> None:
+class BottleIndexSet:
   """
-  Randomly shuffle the water segments in  the bottles `move_count` amount of times.
+  A set of bottle indices with O(1) add, remove and uniform random choice.
+  """
+  def __init__(self) -> None:
+    self.indices: list[int] = []
+    self.positions: dict[int, int] = {}
+
+  def add(self, index: int) -> None:
+    if index in self.positions:
+      return
+
+    self.positions[index] = len(self.indices)
+    self.indices.append(index)
+
+  def remove(self, index: int) -> None:
+    position = self.positions.pop(index, None)
+    if position == None:
+      return
+
+    last_index = self.indices.pop()
+    if last_index != index:
+      self.indices[position] = last_index
+      self.positions[last_index] = position
+
+  def choice(self) -> int:
+    """
+    Chooses a random index in the set. The set must not be empty.
+    """
+    return random.choice(self.indices)
+
+  def __contains__(self, index: int) -> bool:
+    return index in self.positions
+
+  def __len__(self) -> int:
+    return len(self.indices)
+
+def shuffle_bottles(bottles: list[Bottle], move_count: int) -> int:
+  """
+  Randomly shuffle the water segments in the bottles `move_count` amount of times.
+
+  Every legal shuffle move is equally likely: the bottles with water and the bottles with space
+  are tracked as the shuffle goes, so only a move from a bottle to itself is ever redrawn. The
+  shuffle stops early if no water can be moved.
 
   Args:
       bottles (list[Bottle]): The bottles to be shuffled.
       move_count (int): The amount of shuffles to make.
+
+  Returns:
+      int: The amount of shuffles made.
   """
+  # bottles water can be taken from and bottles water can be added to
+  from_indices = BottleIndexSet()
+  to_indices = BottleIndexSet()
+
+  def update(index: int) -> None:
+    bottle = bottles[index]
+    if bottle.is_empty():
+      from_indices.remove(index)
+    else:
+      from_indices.add(index)
+
+    if bottle.get_remaining_capacity() <= 0:
+      to_indices.remove(index)
+    else:
+      to_indices.add(index)
+
+  for index in range(len(bottles)):
+    update(index)
+
   i = 0
   while i < move_count:
-    from_index = random.randint(0, len(bottles) - 1)
-    to_index = random.randint(0, len(bottles) - 1)
-
-    if from_index == to_index:
-      continue
+    if len(to_indices) == 0 or len(from_indices) == 0:
+      break
 
-    from_bottle_top = bottles[from_index].get_top_water()
-    if from_bottle_top == None:
-      continue
+    # with a single bottle that is both the only source and the only target, no water can be moved
+    if len(to_indices) == 1 and len(from_indices) == 1 and to_indices.indices[0] in from_indices:
+      break
 
-    max_amount = min(bottles[to_index].get_remaining_capacity(), from_bottle_top.amount)
-    if max_amount <= 0:
+    # a uniform pair of a source and a target, redrawn if they are the same bottle, is uniform over
+    # the legal (from, to) pairs like the rejection sampling this replaced
+    from_index = from_indices.choice()
+    to_index = to_indices.choice()
+    if from_index == to_index:
       continue
 
+    max_amount = min(bottles[to_index].get_remaining_capacity(), bottles[from_index].get_top_water().amount)
     amount = random.randint(1, max_amount)
-    
-    suc = shuffle_move_water(bottles, from_index, to_index, amount)
-    if not suc:
-      continue
+
+    shuffle_move_water(bottles, from_index, to_index, amount)
+    update(from_index)
+    update(to_index)
 
     i += 1
+
+  return i
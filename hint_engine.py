@@ -0,0 +1,120 @@
+from __future__ import annotations
+from bottle import Bottle
+from concurrent.futures import Future, ProcessPoolExecutor
+from packed_state import PackedState
+from solver import solve_state, SolveResult, Move
+
+import multiprocessing
+
+# the id of the search the engine wants, shared with the worker process (see `_init_worker`)
+_wanted_search_id = None
+
+def _init_worker(wanted_search_id) -> None:
+  global _wanted_search_id
+  _wanted_search_id = wanted_search_id
+
+def _solve_hint(state: PackedState, max_nodes: int | None, time_limit: float | None, search_id: int) -> SolveResult:
+  # a search the engine moved on from stops at its next expansion instead of running to its budget
+  return solve_state(state, max_nodes, time_limit, cancelled=lambda: _wanted_search_id.value != search_id)
+
+class HintEngine:
+  """
+  Finds the best next move for a board in a worker process so the game loop never waits on the solver.
+
+  `request` starts a search and `poll` picks up its result once it is ready. Every state along a found
+  solution is remembered, so following the hints (or coming back to an earlier state) is answered instantly.
+  """
+
+  def __init__(self, max_nodes: int | None = None, time_limit: float | None = 5.0) -> None:
+    """
+    Args:
+        max_nodes (int | None, optional): The solver node budget for each search or None for no limit. Defaults to None.
+        time_limit (float | None, optional): The solver time budget for each search in seconds or None for no limit. Defaults to 5.0.
+    """
+    self.max_nodes = max_nodes
+    self.time_limit = time_limit
+
+    # the best next move of every state a solution was found for
+    self.next_moves: dict[PackedState, Move] = {}
+    # states the solver proved can not be solved, states it ran out of budget on are searched again when asked
+    self.unsolved_states: set[PackedState] = set()
+
+    self._executor: ProcessPoolExecutor | None = None
+    self._future: Future[SolveResult] | None = None
+    self._pending_state: PackedState | None = None
+    # searches are numbered from 1, 0 means no search is wanted
+    self._search_id = 0
+    self._wanted_search_id = multiprocessing.RawValue("q", 0)
+
+  def request(self, bottles: list[Bottle]) -> None:
+    """
+    Starts searching for the best next move of `bottles` unless it is already known or being searched for.
+
+    Args:
+        bottles (list[Bottle]): The bottles to find a hint for.
+    """
+    state = PackedState.from_bottles(bottles)
+    if state in self.next_moves or state in self.unsolved_states or state == self._pending_state:
+      return
+
+    self.cancel()
+
+    if self._executor == None:
+      self._executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self._wanted_search_id,))
+
+    self._search_id += 1
+    self._wanted_search_id.value = self._search_id
+    self._future = self._executor.submit(_solve_hint, state, self.max_nodes, self.time_limit, self._search_id)
+    self._pending_state = state
+
+  def cancel(self) -> None:
+    """Drops the pending search. A search that already started stops at its next expansion in the worker and its result is ignored."""
+    if self._future != None:
+      self._future.cancel()
+
+    self._wanted_search_id.value = 0
+    self._future = None
+    self._pending_state = None
+
+  def is_searching(self) -> bool:
+    return self._future != None
+
+  def poll(self, bottles: list[Bottle]) -> Move | None:
+    """
+    Collects a finished search and gets the hint for `bottles`. A pending search for a different board is cancelled.
+
+    Args:
+        bottles (list[Bottle]): The current bottles.
+
+    Returns:
+        Move | None: The best next `(from_index, to_index)` move or None if it is not known (yet).
+    """
+    state = PackedState.from_bottles(bottles)
+
+    if self._future != None and self._future.done():
+      if not self._future.cancelled():
+        self._store_result(self._pending_state, self._future.result())
+      self._future = None
+      self._pending_state = None
+
+    if self._pending_state != None and self._pending_state != state:
+      self.cancel()
+
+    return self.next_moves.get(state)
+
+  def _store_result(self, state: PackedState, result: SolveResult) -> None:
+    if not result.is_solved():
+      if not result.budget_exhausted:
+        self.unsolved_states.add(state)
+      return
+
+    for from_index, to_index in result.moves:
+      self.next_moves[state] = (from_index, to_index)
+      state = state.apply_move(from_index, to_index)
+
+  def shutdown(self) -> None:
+    """Stops the worker process."""
+    self.cancel()
+    if self._executor != None:
+      self._executor.shutdown(wait=False, cancel_futures=True)
+      self._executor = None
@@ -0,0 +1,232 @@
+"""
+Bottle placement, hit testing and the scrollable, zoomable view of the board.
+
+Everything here is in plain integer/float coordinates so it does not depend on pygame.
+World coordinates are the board as laid out at zoom 1, screen coordinates are where it is drawn.
+"""
+from __future__ import annotations
+import math
+
+# (x, y, width, height)
+RectValue = tuple[int, int, int, int]
+
+def rects_overlap(a: RectValue, b: RectValue) -> bool:
+  return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+class BottleLayout:
+  """
+  Places bottles left to right in rows, wrapping to a new row at `wrap_width` like `draw_bottles`.
+  """
+
+  def __init__(self, init_x: int, init_y: int, right_spacing=25, water_hight=50, water_width=75, row_height: int | None = None) -> None:
+    """
+    Args:
+        init_x (int): The x coordinate of the first bottle.
+        init_y (int): The y coordinate of the first bottle.
+        right_spacing (int, optional): The amount of space between each bottle. Defaults to 25.
+        water_hight (int, optional): The hight of each water segment. Defaults to 50.
+        water_width (int, optional): The width of each water segment. Defaults to 75.
+        row_height (int | None, optional): The distance between rows or None for the `draw_bottles` spacing. Defaults to None.
+    """
+    self.init_x = init_x
+    self.init_y = init_y
+    self.right_spacing = right_spacing
+    self.water_hight = water_hight
+    self.water_width = water_width
+    self.row_height = row_height if row_height != None else 250 + right_spacing*3
+
+  def get_positions(self, wrap_width: int, bottle_count: int) -> list[tuple[int, int]]:
+    """
+    Args:
+        wrap_width (int): The x coordinate bottles wrap onto a new row at.
+        bottle_count (int): The number of bottles.
+
+    Returns:
+        list[tuple[int, int]]: The x, y coordinates each bottle is drawn at (see `draw_bottle`).
+    """
+    stride = self.right_spacing + self.water_width
+    # the same wrap rule as `draw_bottles`: wrap once the next bottle would reach `wrap_width`
+    per_row = max(1, math.ceil((wrap_width - self.water_width - self.init_x) / stride))
+
+    return [(self.init_x + (i % per_row) * stride, self.init_y + (i // per_row) * self.row_height) for i in range(bottle_count)]
+
+  def get_rect(self, pos: tuple[int, int], capacity: int) -> RectValue:
+    """
+    Args:
+        pos (tuple[int, int]): The coordinates the bottle is drawn at.
+        capacity (int): The capacity of the bottle.
+
+    Returns:
+        RectValue: The outline of the bottle.
+    """
+    x, y = pos
+    return (x - self.water_hight, y - self.water_hight*(capacity-1), self.water_width, self.water_hight*capacity)
+
+
+class SpatialGrid:
+  """
+  A uniform grid of buckets holding the indices of the rects that overlap each cell,
+  so point and area queries only look at the rects near them.
+  """
+
+  def __init__(self, cell_width: int, cell_height: int) -> None:
+    """
+    Args:
+        cell_width (int): The width of a cell.
+        cell_height (int): The height of a cell.
+    """
+    self.cell_width = max(cell_width, 1)
+    self.cell_height = max(cell_height, 1)
+    self.rects: list[RectValue] = []
+    self.cells: dict[tuple[int, int], list[int]] = {}
+
+  def get_cell_range(self, rect: RectValue) -> tuple[range, range]:
+    x, y, width, height = rect
+    columns = range(x // self.cell_width, (x + max(width, 1) - 1) // self.cell_width + 1)
+    rows = range(y // self.cell_height, (y + max(height, 1) - 1) // self.cell_height + 1)
+    return columns, rows
+
+  def build(self, rects: list[RectValue]) -> None:
+    """
+    Replaces the indexed rects.
+
+    Args:
+        rects (list[RectValue]): The rects to index, queries return indices into this list.
+    """
+    self.rects = rects
+    self.cells = {}
+    for index, rect in enumerate(rects):
+      columns, rows = self.get_cell_range(rect)
+      for row in rows:
+        for column in columns:
+          self.cells.setdefault((column, row), []).append(index)
+
+  def query_point(self, x: int, y: int) -> int:
+    """
+    Args:
+        x (int): The x coordinate.
+        y (int): The y coordinate.
+
+    Returns:
+        int: The lowest index of a rect containing the point or -1 if there is none.
+    """
+    for index in self.cells.get((x // self.cell_width, y // self.cell_height), ()):
+      rect_x, rect_y, width, height = self.rects[index]
+      if rect_x <= x < rect_x + width and rect_y <= y < rect_y + height:
+        return index
+
+    return -1
+
+  def query_rect(self, rect: RectValue) -> list[int]:
+    """
+    Args:
+        rect (RectValue): The area to search.
+
+    Returns:
+        list[int]: The indices of the rects overlapping the area in ascending order.
+    """
+    columns, rows = self.get_cell_range(rect)
+    found: set[int] = set()
+    for row in rows:
+      for column in columns:
+        for index in self.cells.get((column, row), ()):
+          if index not in found and rects_overlap(self.rects[index], rect):
+            found.add(index)
+
+    return sorted(found)
+
+
+class Viewport:
+  """
+  The part of the board shown on screen: a scroll offset in world coordinates and a zoom factor.
+  """
+
+  def __init__(self, width: int, height: int, min_zoom=0.1, max_zoom=2.0) -> None:
+    """
+    Args:
+        width (int): The width of the screen area.
+        height (int): The height of the screen area.
+        min_zoom (float, optional): The smallest zoom factor. Defaults to 0.1.
+        max_zoom (float, optional): The largest zoom factor. Defaults to 2.0.
+    """
+    self.width = width
+    self.height = height
+    self.min_zoom = min_zoom
+    self.max_zoom = max_zoom
+
+    self.scroll_x = 0.0
+    self.scroll_y = 0.0
+    self.zoom = 1.0
+    # the area the view can scroll over, set by `set_bounds`
+    self.bounds: RectValue = (0, 0, width, height)
+
+  def get_state(self) -> tuple[float, float, float, int, int]:
+    """
+    Returns:
+        tuple[float, float, float, int, int]: Everything that changes what is on screen, to detect a change between frames.
+    """
+    return (self.scroll_x, self.scroll_y, self.zoom, self.width, self.height)
+
+  def set_size(self, width: int, height: int) -> None:
+    self.width = width
+    self.height = height
+    self.clamp()
+
+  def set_bounds(self, bounds: RectValue) -> None:
+    """
+    Args:
+        bounds (RectValue): The area of the board in world coordinates.
+    """
+    self.bounds = bounds
+    self.clamp()
+
+  def clamp(self) -> None:
+    """Keeps the view from scrolling past the bounds, leaving the origin in view when the board is smaller than the screen."""
+    x, y, width, height = self.bounds
+    self.scroll_x = min(max(self.scroll_x, min(x, 0)), max(0, x + width - self.width / self.zoom))
+    self.scroll_y = min(max(self.scroll_y, min(y, 0)), max(0, y + height - self.height / self.zoom))
+
+  def scroll_by(self, dx: float, dy: float) -> None:
+    """
+    Args:
+        dx (float): The horizontal distance in screen pixels.
+        dy (float): The vertical distance in screen pixels.
+    """
+    self.scroll_x += dx / self.zoom
+    self.scroll_y += dy / self.zoom
+    self.clamp()
+
+  def zoom_at(self, factor: float, screen_pos: tuple[int, int]) -> None:
+    """
+    Zooms by `factor` keeping the world point under `screen_pos` in place.
+
+    Args:
+        factor (float): The amount to multiply the zoom by.
+        screen_pos (tuple[int, int]): The screen coordinates to zoom around (e.g. the mouse).
+    """
+    world_x, world_y = self.to_world(screen_pos)
+    self.zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+    self.scroll_x = world_x - screen_pos[0] / self.zoom
+    self.scroll_y = world_y - screen_pos[1] / self.zoom
+    self.clamp()
+
+  def to_world(self, screen_pos: tuple[int, int]) -> tuple[int, int]:
+    return (math.floor(screen_pos[0] / self.zoom + self.scroll_x), math.floor(screen_pos[1] / self.zoom + self.scroll_y))
+
+  def to_screen(self, world_pos: tuple[float, float]) -> tuple[int, int]:
+    # rounded half up (not to even) so a rect keeps its size at zoom 1 with a fractional scroll
+    return (math.floor((world_pos[0] - self.scroll_x) * self.zoom + 0.5), math.floor((world_pos[1] - self.scroll_y) * self.zoom + 0.5))
+
+  def to_screen_rect(self, rect: RectValue) -> RectValue:
+    left, top = self.to_screen((rect[0], rect[1]))
+    right, bottom = self.to_screen((rect[0] + rect[2], rect[1] + rect[3]))
+    return (left, top, right - left, bottom - top)
+
+  def get_world_rect(self) -> RectValue:
+    """
+    Returns:
+        RectValue: The area of the board that is on screen.
+    """
+    left, top = self.to_world((0, 0))
+    return (left, top, math.ceil(self.width / self.zoom) + 1, math.ceil(self.height / self.zoom) + 1)
@@ -0,0 +1,239 @@
+"""
+A binary level pack format read through `mmap`.
+
+Layout (all integers little endian):
+  header   `HEADER_FORMAT`: magic, version, bottle count, capacity, record count, index entry count,
+           index offset and records offset.
+  index    one `INDEX_ENTRY_FORMAT` entry per difficulty bucket: the bucket and the first record and
+           number of records in it. Records are stored grouped by bucket in bucket order.
+  records  fixed size records: the `PackedState` data of the level followed by `RECORD_TAIL_FORMAT`
+           (the optimal solution length and the difficulty score).
+
+Any record is found in O(1) from its index, so loading a level does not depend on the pack size.
+"""
+from __future__ import annotations
+from bottle import Bottle
+from packed_state import PackedState, ColorValue
+
+import mmap
+import random
+import struct
+
+MAGIC = b"WSLP"
+VERSION = 1
+HEADER_FORMAT = "<4sHHHQIQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_ENTRY_FORMAT = "<iQQ"
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_ENTRY_FORMAT)
+RECORD_TAIL_FORMAT = "<Hf"
+RECORD_TAIL_SIZE = struct.calcsize(RECORD_TAIL_FORMAT)
+
+def get_difficulty_bucket(difficulty: float) -> int:
+  """
+  Args:
+      difficulty (float): A difficulty score.
+
+  Returns:
+      int: The index bucket of levels with this score.
+  """
+  return int(difficulty)
+
+
+class LevelPackWriter:
+  """
+  Collects levels and writes them as a level pack. Levels are kept as packed bytes until `close`.
+  Used as a context manager the pack is written on exit, unless the block raised.
+  """
+
+  def __init__(self, path: str, bottle_count: int, capacity: int) -> None:
+    """
+    Args:
+        path (str): The file to write.
+        bottle_count (int): The number of bottles in every level.
+        capacity (int): The capacity of every bottle.
+    """
+    self.path = path
+    self.bottle_count = bottle_count
+    self.capacity = capacity
+    self.record_size = bottle_count * capacity + RECORD_TAIL_SIZE
+
+    self._buckets: dict[int, bytearray] = {}
+    self.record_count = 0
+
+  def add(self, state: PackedState, solution_length: int, difficulty: float) -> None:
+    """
+    Adds a level to the pack.
+
+    Args:
+        state (PackedState): The starting state of the level.
+        solution_length (int): The number of moves in the shortest solution.
+        difficulty (float): The difficulty score of the level.
+    """
+    if state.capacity != self.capacity or state.bottle_count() != self.bottle_count:
+      raise ValueError("every level in a pack must have the same bottle count and capacity")
+
+    bucket = self._buckets.setdefault(get_difficulty_bucket(difficulty), bytearray())
+    bucket += state.data
+    bucket += struct.pack(RECORD_TAIL_FORMAT, solution_length, difficulty)
+    self.record_count += 1
+
+  def close(self) -> None:
+    """Writes the pack to `path`."""
+    bucket_keys = sorted(self._buckets.keys())
+    index_offset = HEADER_SIZE
+    records_offset = index_offset + INDEX_ENTRY_SIZE * len(bucket_keys)
+
+    with open(self.path, "wb") as file:
+      file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.bottle_count, self.capacity, self.record_count, len(bucket_keys), index_offset, records_offset))
+
+      start = 0
+      for key in bucket_keys:
+        count = len(self._buckets[key]) // self.record_size
+        file.write(struct.pack(INDEX_ENTRY_FORMAT, key, start, count))
+        start += count
+
+      for key in bucket_keys:
+        file.write(self._buckets[key])
+
+    self._buckets = {}
+
+  def discard(self) -> None:
+    """Drops the collected levels without writing the pack."""
+    self._buckets = {}
+    self.record_count = 0
+
+  def __enter__(self) -> LevelPackWriter:
+    return self
+
+  def __exit__(self, exc_type, *args) -> None:
+    # a pack is only written if every level was added
+    if exc_type != None:
+      self.discard()
+    else:
+      self.close()
+
+
+class LevelPack:
+  """
+  A read only, memory-mapped level pack.
+  """
+
+  def __init__(self, path: str) -> None:
+    """
+    Args:
+        path (str): The level pack file.
+    """
+    self._file = open(path, "rb")
+    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    self._view = memoryview(self._mmap)
+
+    magic, version, self.bottle_count, self.capacity, self.record_count, index_count, index_offset, self.records_offset = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+    if magic != MAGIC or version != VERSION:
+      self.close()
+      raise ValueError(f"{path} is not a version {VERSION} level pack")
+
+    self.state_size = self.bottle_count * self.capacity
+    self.record_size = self.state_size + RECORD_TAIL_SIZE
+
+    # difficulty bucket -> (first record, record count)
+    self.index: dict[int, tuple[int, int]] = {}
+    for i in range(index_count):
+      bucket, start, count = struct.unpack_from(INDEX_ENTRY_FORMAT, self._mmap, index_offset + i * INDEX_ENTRY_SIZE)
+      self.index[bucket] = (start, count)
+
+  def get_state_view(self, record_index: int) -> memoryview:
+    """
+    Gets the packed state data of a level without copying it out of the file mapping.
+    Release the view before closing the pack.
+
+    Args:
+        record_index (int): The index of the level.
+
+    Returns:
+        memoryview: The `PackedState` data of the level.
+    """
+    if record_index < 0 or record_index >= self.record_count:
+      raise IndexError(record_index)
+
+    offset = self.records_offset + record_index * self.record_size
+    return self._view[offset:offset + self.state_size]
+
+  def get_state(self, record_index: int) -> PackedState:
+    """
+    Gets the starting state of a level. The state data is copied once out of the file mapping,
+    since a `PackedState` holds `bytes` (see `get_state_view` to read it in place).
+
+    Args:
+        record_index (int): The index of the level.
+
+    Returns:
+        PackedState: The starting state of the level.
+    """
+    with self.get_state_view(record_index) as view:
+      return PackedState(view.tobytes(), self.capacity)
+
+  def get_info(self, record_index: int) -> tuple[int, float]:
+    """
+    Args:
+        record_index (int): The index of the level.
+
+    Returns:
+        tuple[int, float]: The optimal solution length and the difficulty score of the level.
+    """
+    if record_index < 0 or record_index >= self.record_count:
+      raise IndexError(record_index)
+
+    offset = self.records_offset + record_index * self.record_size + self.state_size
+    return struct.unpack_from(RECORD_TAIL_FORMAT, self._mmap, offset)
+
+  def get_bottles(self, record_index: int, water_color_map: dict[int, ColorValue]) -> list[Bottle]:
+    """
+    Args:
+        record_index (int): The index of the level.
+        water_color_map (dict[int, ColorValue]): The colors of the water.
+
+    Returns:
+        list[Bottle]: The starting bottles of the level.
+    """
+    return self.get_state(record_index).to_bottles(water_color_map)
+
+  def get_bucket_range(self, bucket: int) -> range:
+    """
+    Args:
+        bucket (int): A difficulty bucket (see `get_difficulty_bucket`).
+
+    Returns:
+        range: The record indices of the levels in the bucket.
+    """
+    start, count = self.index.get(bucket, (0, 0))
+    return range(start, start + count)
+
+  def choose_level(self, bucket: int | None = None) -> int:
+    """
+    Picks a random level, optionally from a single difficulty bucket.
+
+    Args:
+        bucket (int | None, optional): The difficulty bucket or None for any level. Defaults to None.
+
+    Returns:
+        int: The index of the level or -1 if there are no matching levels.
+    """
+    levels = range(self.record_count) if bucket == None else self.get_bucket_range(bucket)
+    if len(levels) == 0:
+      return -1
+
+    return random.choice(levels)
+
+  def close(self) -> None:
+    self._view.release()
+    self._mmap.close()
+    self._file.close()
+
+  def __len__(self) -> int:
+    return self.record_count
+
+  def __enter__(self) -> LevelPack:
+    return self
+
+  def __exit__(self, *args) -> None:
+    self.close()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from bottle import Bottle
+from solver import Move
+
+class LegalMoveIndex:
+  """
+  An index of the bottles by top water id plus the sets of empty and not full bottles,
+  updated one bottle at a time so legal moves and dead states are found without scanning every bottle.
+  """
+
+  def __init__(self) -> None:
+    self.bottles: list[Bottle] = []
+    # water id -> indices of the bottles with that water on top
+    self.tops: dict[int, set[int]] = {}
+    self.empty: set[int] = set()
+    self.not_full: set[int] = set()
+    # indices of the bottles holding a single water segment
+    self.single_segment: set[int] = set()
+    # the top water id of each bottle as last indexed, -1 if it was empty
+    self._top_ids: list[int] = []
+
+  def rebuild(self, bottles: list[Bottle]) -> None:
+    """
+    Indexes every bottle (e.g. after the bottles were created or replaced).
+
+    Args:
+        bottles (list[Bottle]): The bottles to index.
+    """
+    self.bottles = bottles
+    self.tops = {}
+    self.empty = set()
+    self.not_full = set()
+    self.single_segment = set()
+    self._top_ids = [-1] * len(bottles)
+
+    for index in range(len(bottles)):
+      self._add(index)
+
+  def update(self, *indices: int) -> None:
+    """
+    Re-indexes the bottles that changed (e.g. the two bottles of a move).
+
+    Args:
+        indices (int): The indices of the changed bottles.
+    """
+    for index in indices:
+      self._remove(index)
+      self._add(index)
+
+  def _add(self, index: int) -> None:
+    bottle = self.bottles[index]
+    top_water = bottle.get_top_water()
+
+    if top_water == None:
+      self.empty.add(index)
+      self._top_ids[index] = -1
+    else:
+      self.tops.setdefault(top_water.water_id, set()).add(index)
+      self._top_ids[index] = top_water.water_id
+      if len(bottle.contents) == 1:
+        self.single_segment.add(index)
+
+    if bottle.get_remaining_capacity() != 0:
+      self.not_full.add(index)
+
+  def _remove(self, index: int) -> None:
+    top_id = self._top_ids[index]
+    if top_id == -1:
+      self.empty.discard(index)
+    else:
+      sources = self.tops[top_id]
+      sources.discard(index)
+      if len(sources) == 0:
+        del self.tops[top_id]
+
+    self.not_full.discard(index)
+    self.single_segment.discard(index)
+
+  def get_legal_moves(self) -> list[Move]:
+    """
+    Returns:
+        list[Move]: Every `(from_index, to_index)` move that `move_water_segment` would accept.
+    """
+    moves: list[Move] = []
+    for sources in self.tops.values():
+      targets = (sources & self.not_full) | self.empty
+      for from_index in sources:
+        for to_index in targets:
+          if from_index != to_index:
+            moves.append((from_index, to_index))
+
+    return moves
+
+  def has_legal_moves(self) -> bool:
+    """
+    Returns:
+        bool: True if any move is possible.
+    """
+    if len(self.tops) == 0:
+      return False
+    if len(self.empty) > 0:
+      return True
+
+    return any(len(sources) > 1 and not sources.isdisjoint(self.not_full) for sources in self.tops.values())
+
+  def has_useful_moves(self) -> bool:
+    """
+    Returns:
+        bool: True if any move changes more than the order of the bottles, which
+          pouring a bottle holding a single water segment into an empty bottle does not.
+    """
+    if len(self.empty) > 0 and any(len(sources - self.single_segment) > 0 for sources in self.tops.values()):
+      return True
+
+    return any(len(sources) > 1 and not sources.isdisjoint(self.not_full) for sources in self.tops.values())
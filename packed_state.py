@@ -0,0 +1,248 @@
+from __future__ import annotations
+from bottle import Bottle, Water
+
+ColorValue = tuple[int, int, int]
+
+EMPTY_SLOT = 0
+MAX_WATER_ID = 254
+
+class PackedState:
+  """
+  A compact, immutable and hashable snapshot of a list of bottles.
+
+  Every bottle is stored as `capacity` slots in a single `bytes` object, bottom slot first.
+  A slot holds `water_id + 1` for a unit of water or `EMPTY_SLOT` if it is unfilled.
+  """
+  __slots__ = ("data", "capacity")
+
+  def __init__(self, data: bytes, capacity: int) -> None:
+    """
+    Args:
+        data (bytes): The packed slots of every bottle, `capacity` slots per bottle.
+        capacity (int): The amount of water each bottle can hold.
+    """
+    self.data = data
+    self.capacity = capacity
+
+  @classmethod
+  def from_bottles(cls, bottles: list[Bottle]) -> PackedState:
+    """
+    Packs a list of bottles. Every bottle must have the same capacity.
+
+    Args:
+        bottles (list[Bottle]): The bottles to pack.
+
+    Returns:
+        PackedState: The packed state of `bottles`.
+    """
+    capacity = bottles[0].capacity if len(bottles) > 0 else 0
+    data = bytearray(capacity * len(bottles))
+
+    for bottle_index, bottle in enumerate(bottles):
+      if bottle.capacity != capacity:
+        raise ValueError("every bottle must have the same capacity to be packed")
+
+      slot = bottle_index * capacity
+      for water in bottle.contents:
+        if water.water_id < 0 or water.water_id > MAX_WATER_ID:
+          raise ValueError(f"water id {water.water_id} can not be packed")
+
+        data[slot:slot + water.amount] = bytes([water.water_id + 1]) * water.amount
+        slot += water.amount
+
+    return cls(bytes(data), capacity)
+
+  def to_bottles(self, water_color_map: dict[int, ColorValue]) -> list[Bottle]:
+    """
+    Unpacks the state into a list of bottles.
+
+    Args:
+        water_color_map (dict[int, ColorValue]): The colors of the water used to build each `Water`.
+
+    Returns:
+        list[Bottle]: The unpacked bottles.
+    """
+    bottles: list[Bottle] = []
+    for bottle_index in range(self.bottle_count()):
+      contents: list[Water] = []
+      for water_id, amount in self.get_segments(bottle_index):
+        contents.append(Water(water_id, amount, water_color_map[water_id]))
+
+      bottles.append(Bottle(self.capacity, contents))
+
+    return bottles
+
+  def bottle_count(self) -> int:
+    """
+    Returns:
+        int: The number of bottles in the state.
+    """
+    return len(self.data) // self.capacity if self.capacity > 0 else 0
+
+  def get_bottle(self, bottle_index: int) -> bytes:
+    """
+    Gets the filled slots of a bottle, bottom slot first.
+
+    Args:
+        bottle_index (int): The index of the bottle.
+
+    Returns:
+        bytes: The filled slots of the bottle.
+    """
+    start = bottle_index * self.capacity
+    end = start + self.capacity
+    fill = self.data.find(EMPTY_SLOT, start, end)
+
+    return self.data[start:end if fill == -1 else fill]
+
+  def get_segments(self, bottle_index: int) -> list[tuple[int, int]]:
+    """
+    Gets the water segments of a bottle, bottom segment first.
+
+    Args:
+        bottle_index (int): The index of the bottle.
+
+    Returns:
+        list[tuple[int, int]]: A `(water_id, amount)` pair for each water segment in the bottle.
+    """
+    segments: list[tuple[int, int]] = []
+    for slot in self.get_bottle(bottle_index):
+      if len(segments) > 0 and segments[-1][0] == slot - 1:
+        segments[-1] = (slot - 1, segments[-1][1] + 1)
+      else:
+        segments.append((slot - 1, 1))
+
+    return segments
+
+  def get_move_amount(self, from_index: int, to_index: int) -> int:
+    """
+    Gets the amount of water `move_water_segment` would move from one bottle to another.
+
+    Args:
+        from_index (int): The index of the bottle to remove water from.
+        to_index (int): The index of the bottle to add water to.
+
+    Returns:
+        int: The amount of water moved, 0 if the move is not legal.
+    """
+    if from_index == to_index:
+      return 0
+
+    from_water = self.get_bottle(from_index)
+    to_water = self.get_bottle(to_index)
+    if len(from_water) == 0 or len(to_water) == self.capacity:
+      return 0
+
+    top = from_water[-1]
+    if len(to_water) > 0 and to_water[-1] != top:
+      return 0
+
+    top_amount = len(from_water) - len(from_water.rstrip(bytes([top])))
+    return min(top_amount, self.capacity - len(to_water))
+
+  def apply_move(self, from_index: int, to_index: int) -> PackedState | None:
+    """
+    Applies `move_water_segment` semantics to a copy of the state.
+
+    Args:
+        from_index (int): The index of the bottle to remove water from.
+        to_index (int): The index of the bottle to add water to.
+
+    Returns:
+        PackedState | None: The new state or None if the move is not legal.
+    """
+    amount = self.get_move_amount(from_index, to_index)
+    if amount == 0:
+      return None
+
+    return self.pour(from_index, to_index, amount)
+
+  def pour(self, from_index: int, to_index: int, amount: int) -> PackedState:
+    """
+    Moves the top `amount` slots of one bottle onto another without checking the move rules (e.g. to undo a move).
+    `amount` must not be larger than the water in the from bottle or the space in the to bottle.
+
+    Args:
+        from_index (int): The index of the bottle to remove water from.
+        to_index (int): The index of the bottle to add water to.
+        amount (int): The amount of water to move.
+
+    Returns:
+        PackedState: The new state.
+    """
+    from_fill = len(self.get_bottle(from_index))
+    to_fill = len(self.get_bottle(to_index))
+    from_slot = from_index * self.capacity + from_fill
+    to_slot = to_index * self.capacity + to_fill
+
+    data = bytearray(self.data)
+    data[to_slot:to_slot + amount] = data[from_slot - amount:from_slot]
+    data[from_slot - amount:from_slot] = bytes(amount)
+
+    return PackedState(bytes(data), self.capacity)
+
+  def legal_moves(self) -> list[tuple[int, int, int]]:
+    """
+    Gets every move that `move_water_segment` would accept.
+
+    Returns:
+        list[tuple[int, int, int]]: A `(from_index, to_index, amount)` triple for each legal move.
+    """
+    bottle_count = self.bottle_count()
+    tops: list[int] = []
+    fills: list[int] = []
+    for bottle_index in range(bottle_count):
+      water = self.get_bottle(bottle_index)
+      fills.append(len(water))
+      tops.append(water[-1] if len(water) > 0 else EMPTY_SLOT)
+
+    moves: list[tuple[int, int, int]] = []
+    for from_index in range(bottle_count):
+      if fills[from_index] == 0:
+        continue
+
+      for to_index in range(bottle_count):
+        if from_index == to_index or fills[to_index] == self.capacity:
+          continue
+        if fills[to_index] > 0 and tops[to_index] != tops[from_index]:
+          continue
+
+        moves.append((from_index, to_index, self.get_move_amount(from_index, to_index)))
+
+    return moves
+
+  def is_solved(self) -> bool:
+    """
+    Checks if each bottle is empty or full of a single water segment (see `WaterSortPuzzle.is_puzzle_solved`).
+
+    Returns:
+        bool: Returns True if the state is solved else returns False.
+    """
+    for bottle_index in range(self.bottle_count()):
+      water = self.get_bottle(bottle_index)
+      if len(water) == 0:
+        continue
+      if len(water) != self.capacity or water.count(water[0]) != self.capacity:
+        return False
+
+    return True
+
+  def __eq__(self, __o: object) -> bool:
+    if not isinstance(__o, PackedState):
+      return False
+
+    return self.capacity == __o.capacity and self.data == __o.data
+
+  def __hash__(self) -> int:
+    return hash((self.capacity, self.data))
+
+  def __str__(self) -> str:
+    bottle_strs: list[str] = []
+    for bottle_index in range(self.bottle_count()):
+      bottle_str = ""
+      for water_id, amount in self.get_segments(bottle_index):
+        bottle_str += "|" + str(water_id) * amount
+      bottle_str += "_" * (self.capacity - len(self.get_bottle(bottle_index)))
+      bottle_strs.append(bottle_str)
+
+    return "\n".join(bottle_strs)
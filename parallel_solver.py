@@ -0,0 +1,240 @@
+"""
+A hash-distributed A* (HDA*) search across worker processes.
+
+Every state is owned by one worker, picked by a hash of its canonical form. A worker expands the states
+it owns in A* order and sends each successor to its owner through the owner's inbox queue, batched per
+worker. Once a solution is found, states that can not beat it are pruned, and the search ends when every
+worker is idle and every message that was sent has been received, which proves the best solution found is
+the shortest.
+"""
+from __future__ import annotations
+from helpers.canonical import canonicalize
+from packed_state import PackedState
+from solver import get_successors, heuristic, Move, SolveResult
+
+import heapq
+import multiprocessing
+import os
+import queue
+import struct
+import time
+import zlib
+
+# the moves of a path are packed as little endian (from_index, to_index) pairs
+MOVE_STRUCT = struct.Struct("<HH")
+# states expanded between checking the inbox and sending batches
+EXPANSIONS_PER_ROUND = 64
+NO_SOLUTION = 2**31 - 1
+
+def get_owner(key: PackedState, worker_count: int) -> int:
+  """
+  Args:
+      key (PackedState): The canonical form of a state.
+      worker_count (int): The number of workers.
+
+  Returns:
+      int: The worker that owns the state, the same in every process (unlike `hash`).
+  """
+  return zlib.crc32(key.data) % worker_count
+
+def unpack_moves(moves: bytes) -> list[Move]:
+  return list(MOVE_STRUCT.iter_unpack(moves))
+
+
+class SharedSearchState:
+  """
+  The counters and flags shared by the search workers and the process waiting on them.
+  """
+  def __init__(self, worker_count: int) -> None:
+    self.stop = multiprocessing.Event()
+    self.incumbent = multiprocessing.Value("i", NO_SOLUTION)
+    self.nodes_expanded = multiprocessing.Value("q", 0)
+    self.budget_exhausted = multiprocessing.Value("b", 0)
+    # per worker slots, only written by their own worker
+    self.idle = multiprocessing.Array("b", worker_count, lock=False)
+    self.sent = multiprocessing.Array("q", worker_count, lock=False)
+    self.received = multiprocessing.Array("q", worker_count, lock=False)
+    self.peak_frontier = multiprocessing.Array("q", worker_count, lock=False)
+
+  def is_finished(self) -> bool:
+    """
+    Returns:
+        bool: True if every worker is idle and no batch is in flight. A worker only leaves idle
+          by receiving a batch, so if the received count did not change while every worker was
+          seen idle and it matches the sent count, there is no work left anywhere.
+    """
+    received = sum(self.received)
+    if not all(self.idle):
+      return False
+
+    sent = sum(self.sent)
+    return all(self.idle) and sum(self.received) == received == sent
+
+
+def _search_worker(worker_id: int, start: PackedState, inboxes: list, solutions, shared: SharedSearchState, max_nodes: int | None) -> None:
+  for inbox in inboxes:
+    # a worker told to stop exits without waiting for unread batches to be flushed
+    inbox.cancel_join_thread()
+  solutions.cancel_join_thread()
+
+  worker_count = len(inboxes)
+  inbox = inboxes[worker_id]
+  g_scores: dict[PackedState, int] = {}
+  # entries are (f, -g, tie breaker, state, moves) as in `solve_state`
+  frontier: list[tuple[int, int, int, PackedState, bytes]] = []
+  outboxes: list[list[tuple[int, bytes, bytes, bytes]]] = [[] for _ in range(worker_count)]
+  counter = 0
+  peak_frontier = 0
+
+  def add(g: int, state: PackedState, key: PackedState, moves: bytes) -> None:
+    nonlocal counter
+    if g >= g_scores.get(key, g + 1):
+      return
+
+    g_scores[key] = g
+    f = g + heuristic(state)
+    if f < shared.incumbent.value:
+      heapq.heappush(frontier, (f, -g, counter, state, moves))
+      counter += 1
+
+  def flush() -> None:
+    for owner, batch in enumerate(outboxes):
+      if len(batch) > 0:
+        shared.sent[worker_id] += 1
+        inboxes[owner].put(batch)
+        outboxes[owner] = []
+
+  start_key = canonicalize(start)
+  if get_owner(start_key, worker_count) == worker_id:
+    add(0, start, start_key, b"")
+
+  while not shared.stop.is_set():
+    try:
+      while True:
+        batch = inbox.get_nowait()
+        shared.idle[worker_id] = 0
+        shared.received[worker_id] += 1
+        for g, data, key_data, moves in batch:
+          add(g, PackedState(data, start.capacity), PackedState(key_data, start.capacity), moves)
+    except queue.Empty:
+      pass
+
+    incumbent = shared.incumbent.value
+    if len(frontier) == 0 or frontier[0][0] >= incumbent:
+      shared.idle[worker_id] = 1
+      try:
+        batch = inbox.get(timeout=0.005)
+      except queue.Empty:
+        continue
+
+      shared.idle[worker_id] = 0
+      shared.received[worker_id] += 1
+      for g, data, key_data, moves in batch:
+        add(g, PackedState(data, start.capacity), PackedState(key_data, start.capacity), moves)
+      continue
+
+    shared.idle[worker_id] = 0
+    expanded = 0
+    while len(frontier) > 0 and expanded < EXPANSIONS_PER_ROUND:
+      f, neg_g, _, state, moves = heapq.heappop(frontier)
+      g = -neg_g
+      if f >= incumbent:
+        frontier.clear()
+        break
+      if g > g_scores.get(canonicalize(state), g):
+        continue
+
+      if state.is_solved():
+        with shared.incumbent.get_lock():
+          if g < shared.incumbent.value:
+            shared.incumbent.value = g
+            solutions.put((g, moves))
+        incumbent = shared.incumbent.value
+        continue
+
+      expanded += 1
+      for move, next_state in get_successors(state):
+        next_key = canonicalize(next_state)
+        next_moves = moves + MOVE_STRUCT.pack(*move)
+        owner = get_owner(next_key, worker_count)
+        if owner == worker_id:
+          add(g + 1, next_state, next_key, next_moves)
+        else:
+          outboxes[owner].append((g + 1, next_state.data, next_key.data, next_moves))
+
+      peak_frontier = max(peak_frontier, len(frontier))
+
+    flush()
+    shared.peak_frontier[worker_id] = peak_frontier
+
+    with shared.nodes_expanded.get_lock():
+      shared.nodes_expanded.value += expanded
+      if max_nodes != None and shared.nodes_expanded.value >= max_nodes:
+        shared.budget_exhausted.value = 1
+        shared.stop.set()
+
+def solve_state_parallel(start: PackedState, workers: int | None = None, max_nodes: int | None = 1_000_000, time_limit: float | None = None) -> SolveResult:
+  """
+  Finds the shortest sequence of moves that solves `start` with a hash-distributed A* search across worker processes.
+  States are always treated as the same if they only differ by bottle order or water ids (see `solve_state`).
+
+  Args:
+      start (PackedState): The state to solve.
+      workers (int | None, optional): The number of worker processes or None for one per core. Defaults to None.
+      max_nodes (int | None, optional): The maximum number of states to expand across every worker or None for no limit. Defaults to 1_000_000.
+      time_limit (float | None, optional): The maximum number of seconds to search or None for no limit. Defaults to None.
+
+  Returns:
+      SolveResult: The solution (if one was found) and the search statistics. If the budget ran out after a solution was found,
+        the solution is returned with `budget_exhausted` set and may not be the shortest.
+  """
+  start_time = time.perf_counter()
+  worker_count = workers if workers != None else (os.cpu_count() or 1)
+
+  shared = SharedSearchState(worker_count)
+  inboxes = [multiprocessing.Queue() for _ in range(worker_count)]
+  solutions = multiprocessing.Queue()
+
+  processes = [multiprocessing.Process(target=_search_worker, args=(worker_id, start, inboxes, solutions, shared, max_nodes), daemon=True) for worker_id in range(worker_count)]
+  for process in processes:
+    process.start()
+
+  best: tuple[int, bytes] | None = None
+  budget_exhausted = False
+  while True:
+    try:
+      while True:
+        solution = solutions.get_nowait()
+        if best == None or solution[0] < best[0]:
+          best = solution
+    except queue.Empty:
+      pass
+
+    if shared.stop.is_set():
+      budget_exhausted = True
+      break
+    if time_limit != None and time.perf_counter() - start_time >= time_limit:
+      budget_exhausted = True
+      break
+    if shared.is_finished():
+      break
+
+    time.sleep(0.001)
+
+  shared.stop.set()
+  for process in processes:
+    process.join(timeout=1)
+    if process.is_alive():
+      process.terminate()
+
+  # a solution can be reported right before the workers go idle
+  try:
+    while True:
+      solution = solutions.get_nowait()
+      if best == None or solution[0] < best[0]:
+        best = solution
+  except queue.Empty:
+    pass
+
+  moves = unpack_moves(best[1]) if best != None else None
+  return SolveResult(moves, shared.nodes_expanded.value, sum(shared.peak_frontier), time.perf_counter() - start_time, budget_exhausted)
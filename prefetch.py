@@ -0,0 +1,107 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from helpers.bottle_setup import init_bottles, top_off_bottles
+from helpers.shuffle import shuffle_bottles
+from packed_state import PackedState
+
+import random
+
+# (empty bottle count, colored bottle count, bottle capacity, shuffle moves), see `WaterSortPuzzle.create_bottles`
+PuzzleParams = tuple[int, int, int, int]
+
+def build_puzzle_state(params: PuzzleParams, seed: int) -> PackedState:
+  """
+  Builds a puzzle the same way `WaterSortPuzzle.create_bottles` does.
+
+  Args:
+      params (PuzzleParams): The layout of the puzzle.
+      seed (int): The random seed to shuffle with.
+
+  Returns:
+      PackedState: The starting state of the puzzle.
+  """
+  empty_bottle_count, colored_bottle_count, bottle_capacity, shuffle_moves = params
+  random.seed(seed)
+
+  bottles = init_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, {i: (0, 0, 0) for i in range(colored_bottle_count)})
+  shuffle_bottles(bottles, shuffle_moves)
+  top_off_bottles(bottles)
+
+  return PackedState.from_bottles(bottles)
+
+
+class PuzzlePrefetcher:
+  """
+  Keeps a small queue of ready puzzles for each puzzle layout, built in a worker process,
+  so starting the next puzzle is a dequeue instead of a shuffle in the middle of a frame.
+
+  `prefetch` registers a layout, `poll` collects finished puzzles and keeps every queue topped up,
+  and `take` gets a ready puzzle.
+  """
+
+  def __init__(self, queue_size: int = 3) -> None:
+    """
+    Args:
+        queue_size (int, optional): The number of puzzles kept ready (or being built) for each layout. Defaults to 3.
+    """
+    self.queue_size = queue_size
+
+    self.ready: dict[PuzzleParams, deque[PackedState]] = {}
+    self._pending: dict[PuzzleParams, list[Future[PackedState]]] = {}
+    self._executor: ProcessPoolExecutor | None = None
+
+  def prefetch(self, params: PuzzleParams) -> None:
+    """
+    Starts keeping puzzles ready for a layout.
+
+    Args:
+        params (PuzzleParams): The layout of the puzzles.
+    """
+    if params in self.ready:
+      return
+
+    self.ready[params] = deque()
+    self._pending[params] = []
+    self.poll()
+
+  def poll(self) -> None:
+    """Collects finished puzzles and starts building more for every queue that is not full. Never waits on the worker."""
+    for params, pending in self._pending.items():
+      ready = self.ready[params]
+      for future in [future for future in pending if future.done()]:
+        pending.remove(future)
+        if not future.cancelled() and future.exception() == None:
+          ready.append(future.result())
+
+      while len(ready) + len(pending) < self.queue_size:
+        if self._executor == None:
+          self._executor = ProcessPoolExecutor(max_workers=1)
+
+        # seeds come from this process so every worker puzzle is different
+        pending.append(self._executor.submit(build_puzzle_state, params, random.getrandbits(64)))
+
+  def take(self, params: PuzzleParams) -> PackedState | None:
+    """
+    Args:
+        params (PuzzleParams): The layout of the puzzle.
+
+    Returns:
+        PackedState | None: A ready puzzle or None if none is ready yet.
+    """
+    self.prefetch(params)
+
+    ready = self.ready[params]
+    if len(ready) == 0:
+      return None
+
+    # the queue is refilled by the next `poll` so taking a puzzle never waits on starting the worker
+    return ready.popleft()
+
+  def shutdown(self) -> None:
+    """Stops the worker process."""
+    if self._executor != None:
+      self._executor.shutdown(wait=False, cancel_futures=True)
+      self._executor = None
+
+    self._pending = {params: [] for params in self._pending}
@@ -0,0 +1,210 @@
+"""
+Per-frame timing of named sections of the game and menu loops.
+
+Set the `WATER_SORT_PROFILE` environment variable to `1` to start with profiling on (F3 toggles it in game),
+and `WATER_SORT_PROFILE_OUT` to a `.csv` or `.json` file to export the recorded frames on exit.
+"""
+from __future__ import annotations
+from collections import deque
+
+import csv
+import json
+import os
+import time
+
+PROFILE_ENV = "WATER_SORT_PROFILE"
+PROFILE_OUT_ENV = "WATER_SORT_PROFILE_OUT"
+
+# (frame number, {section name: seconds})
+FrameSample = tuple[int, dict[str, float]]
+
+class FrameProfiler:
+  """
+  Records how long each named section of a frame takes.
+
+  A frame is started with `begin_frame`, split into sections with `lap` (the time since the
+  previous lap) and finished with `end_frame`. Code called inside a lap can time its own
+  sub-sections with `add`, which are taken out of the enclosing lap so sections never overlap.
+
+  Every method returns immediately while the profiler is disabled.
+  """
+
+  def __init__(self, enabled: bool = False, max_frames: int = 3600) -> None:
+    """
+    Args:
+        enabled (bool, optional): True to start recording. Defaults to False.
+        max_frames (int, optional): The number of most recent frames kept. Defaults to 3600.
+    """
+    self.enabled = enabled
+    self.frames: deque[FrameSample] = deque(maxlen=max_frames)
+    self.section_names: list[str] = []
+    self.frame_count = 0
+
+    self._sections: dict[str, float] = {}
+    self._lap_start = 0.0
+    self._nested = 0.0
+
+  @classmethod
+  def from_env(cls) -> FrameProfiler:
+    """
+    Returns:
+        FrameProfiler: A profiler enabled if `WATER_SORT_PROFILE` is set to a value other than `0`.
+    """
+    return cls(enabled=os.environ.get(PROFILE_ENV, "0") not in ("", "0"))
+
+  def toggle(self) -> None:
+    """Turns recording on or off, dropping any partly recorded frame."""
+    self.enabled = not self.enabled
+    self._sections = {}
+    self._lap_start = time.perf_counter()
+    self._nested = 0.0
+
+  def begin_frame(self) -> None:
+    if not self.enabled:
+      return
+
+    self._sections = {}
+    self._nested = 0.0
+    self._lap_start = time.perf_counter()
+
+  def lap(self, name: str) -> None:
+    """
+    Ends the current section, naming the time since the previous lap (less any `add` time) `name`.
+
+    Args:
+        name (str): The name of the section.
+    """
+    if not self.enabled:
+      return
+
+    now = time.perf_counter()
+    self._record(name, now - self._lap_start - self._nested)
+    self._lap_start = now
+    self._nested = 0.0
+
+  def add(self, name: str, seconds: float) -> None:
+    """
+    Adds time to a section from within another section.
+
+    Args:
+        name (str): The name of the section.
+        seconds (float): The time to add.
+    """
+    if not self.enabled:
+      return
+
+    self._record(name, seconds)
+    self._nested += seconds
+
+  def _record(self, name: str, seconds: float) -> None:
+    if name not in self._sections:
+      self._sections[name] = 0.0
+      if name not in self.section_names:
+        self.section_names.append(name)
+
+    self._sections[name] += seconds
+
+  def end_frame(self) -> None:
+    if not self.enabled or len(self._sections) == 0:
+      return
+
+    self.frames.append((self.frame_count, self._sections))
+    self.frame_count += 1
+    self._sections = {}
+
+  def get_frame_times(self) -> list[float]:
+    """
+    Returns:
+        list[float]: The total time of each kept frame in seconds.
+    """
+    return [sum(sections.values()) for _, sections in self.frames]
+
+  def get_fps(self) -> float:
+    """
+    Returns:
+        float: The mean frames per second over the kept frames.
+    """
+    total = sum(self.get_frame_times())
+    return len(self.frames) / total if total > 0 else 0.0
+
+  def get_percentile(self, percentile: float, section: str | None = None) -> float:
+    """
+    Args:
+        percentile (float): The percentile, 0 to 100.
+        section (str | None, optional): A section name or None for the whole frame. Defaults to None.
+
+    Returns:
+        float: The frame (or section) time at `percentile` in seconds, 0 if no frames were recorded.
+    """
+    if section == None:
+      times = self.get_frame_times()
+    else:
+      times = [sections.get(section, 0.0) for _, sections in self.frames]
+
+    if len(times) == 0:
+      return 0.0
+
+    times.sort()
+    return times[min(len(times) - 1, int(len(times) * percentile / 100))]
+
+  def get_section_means(self) -> dict[str, float]:
+    """
+    Returns:
+        dict[str, float]: The mean time in seconds of each section over the kept frames.
+    """
+    if len(self.frames) == 0:
+      return {}
+
+    totals = {name: 0.0 for name in self.section_names}
+    for _, sections in self.frames:
+      for name, seconds in sections.items():
+        totals[name] += seconds
+
+    return {name: total / len(self.frames) for name, total in totals.items()}
+
+  def export_csv(self, path: str) -> None:
+    """
+    Writes one row per kept frame with the frame total and each section in milliseconds.
+
+    Args:
+        path (str): The file to write.
+    """
+    with open(path, "w", newline="") as file:
+      writer = csv.writer(file)
+      writer.writerow(["frame", "total_ms"] + [name + "_ms" for name in self.section_names])
+      for frame, sections in self.frames:
+        row = [frame, sum(sections.values()) * 1000]
+        row += [sections.get(name, 0.0) * 1000 for name in self.section_names]
+        writer.writerow(row)
+
+  def export_json(self, path: str) -> None:
+    """
+    Writes the kept frames and their sections in milliseconds.
+
+    Args:
+        path (str): The file to write.
+    """
+    frames = []
+    for frame, sections in self.frames:
+      frames.append({
+        "frame": frame,
+        "total_ms": sum(sections.values()) * 1000,
+        "sections": {name: seconds * 1000 for name, seconds in sections.items()},
+      })
+
+    with open(path, "w") as file:
+      json.dump({"sections": self.section_names, "frames": frames}, file)
+
+  def export_env(self) -> None:
+    """Exports the kept frames to the file in `WATER_SORT_PROFILE_OUT` (if set), as JSON for a `.json` file else as CSV."""
+    path = os.environ.get(PROFILE_OUT_ENV)
+    if not path or len(self.frames) == 0:
+      return
+
+    if path.endswith(".json"):
+      self.export_json(path)
+    else:
+      self.export_csv(path)
+
+  def __str__(self) -> str:
+    return f"fps={self.get_fps():.1f} p95={self.get_percentile(95) * 1000:.2f}ms frames={len(self.frames)}"
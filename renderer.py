@@ -0,0 +1,349 @@
+from bottle import Bottle
+from water_wave import draw_wave, WaveAnimator
+from layout import BottleLayout, SpatialGrid, Viewport
+from profiler import FrameProfiler
+import constants.colors as colors
+import math
+import pygame
+import time
+
+# the largest distance a wave reaches above or below its offset (see `WaterWave.max_amplitude`)
+WAVE_MARGIN = 12
+
+BottleSignature = tuple[tuple[tuple[int, int, int], int], ...]
+
+def get_bottle_signature(bottle: Bottle) -> BottleSignature:
+  """
+  Gets the color and amount of each water segment in a bottle, which only changes when the bottle is poured into or from.
+
+  Args:
+      bottle (Bottle): The bottle.
+
+  Returns:
+      BottleSignature: The color and amount of each water segment, bottom segment first.
+  """
+  return tuple((water.color, water.amount) for water in bottle.contents)
+
+class BottleRenderer:
+  """
+  Draws bottles the same way `draw_bottles` does but only redraws what changed since the last frame.
+
+  Bottles are placed in world coordinates by a `BottleLayout` and drawn through a scrollable, zoomable
+  `Viewport`. Only the bottles on screen (found with a `SpatialGrid`) are drawn and animated.
+
+  The water and outline of each bottle are cached as surfaces. A bottle is redrawn when its contents
+  or selection change and otherwise only the strip around its animated wave is redrawn. `draw` returns
+  the dirty rects to pass to `pygame.display.update`.
+  """
+
+  def __init__(self, init_x: int, init_y: int, right_spacing=25, water_hight=50, water_width=75, radius=20, row_height: int | None = None) -> None:
+    """
+    Args:
+        init_x (int): The initial x axis coordinate on the surface to start drawing the bottles
+        init_y (int): The initial y axis coordinate on the surface to start drawing the bottles
+        right_spacing (int, optional): The amount of space between each bottle when drawn onto the surface. Defaults to 25.
+        water_hight (int, optional): The hight of each water segment in each bottle. Defaults to 50.
+        water_width (int, optional): The width of each water segment in each bottle. Defaults to 75.
+        radius (int, optional): The radius of bottom most water segment in each bottle. Defaults to 20.
+        row_height (int | None, optional): The distance between rows of bottles or None for the `draw_bottles` spacing. Defaults to None.
+    """
+    self.layout = BottleLayout(init_x, init_y, right_spacing=right_spacing, water_hight=water_hight, water_width=water_width, row_height=row_height)
+    self.water_hight = water_hight
+    self.water_width = water_width
+    self.radius = radius
+
+    self.viewport = Viewport(0, 0)
+    self.grid = SpatialGrid(right_spacing + water_width, self.layout.row_height)
+    self.waves = WaveAnimator()
+
+    self._bottles: list[Bottle] | None = None
+    self._wrap_width = 0
+    self._positions: list[tuple[int, int]] = []
+    self._view_state: tuple | None = None
+    # the bottles on screen and, for each of them, its screen rect, drawn signature and water surface
+    # (kept with the contents and size it was built for so scrolling does not rebuild it)
+    self._visible: list[int] = []
+    self._screen_rects: dict[int, pygame.Rect] = {}
+    self._signatures: dict[int, tuple[BottleSignature, tuple[int, int, int]]] = {}
+    self._water_surfaces: dict[int, tuple[BottleSignature, tuple[int, int], pygame.Surface]] = {}
+    self._contents_changed = True
+    self._outline_surfaces: dict[tuple[int, tuple[int, int, int], tuple[int, int]], pygame.Surface] = {}
+    self._invalidated = True
+
+  def invalidate(self) -> None:
+    """Forces the next `draw` to redraw the whole surface (e.g. after something else was drawn over it)."""
+    self._invalidated = True
+
+  def update_layout(self, bottles: list[Bottle], wrap_width: int) -> None:
+    """Places every bottle in world coordinates and indexes them for hit testing and culling."""
+    self._bottles = bottles
+    self._wrap_width = wrap_width
+    self._positions = self.layout.get_positions(wrap_width, len(bottles))
+
+    rects = [self.layout.get_rect(pos, bottle.capacity) for bottle, pos in zip(bottles, self._positions)]
+    self.grid.build(rects)
+
+    right = max((x + width for x, _, width, _ in rects), default=0)
+    bottom = max((y + height for _, y, _, height in rects), default=0)
+    self.viewport.set_bounds((0, 0, right + self.layout.right_spacing, bottom + self.layout.right_spacing))
+
+    self._water_surfaces = {}
+    self._contents_changed = True
+
+  def get_bottle_at(self, screen_pos: tuple[int, int]) -> int:
+    """
+    Args:
+        screen_pos (tuple[int, int]): The x, y coordinates on screen (e.g. the mouse).
+
+    Returns:
+        int: The index of the bottle at `screen_pos` or -1 if there is none.
+    """
+    return self.grid.query_point(*self.viewport.to_world(screen_pos))
+
+  def get_bottle_rect(self, index: int) -> pygame.Rect:
+    """
+    Returns:
+        pygame.Rect: The outline of a bottle on screen.
+    """
+    return pygame.Rect(self.viewport.to_screen_rect(self.grid.rects[index]))
+
+  def build_water_surface(self, bottle: Bottle, size: tuple[int, int]) -> pygame.Surface:
+    """
+    Draws the water segments of a bottle, without the wave, onto a surface the size of the bottle.
+
+    Args:
+        bottle (Bottle): The bottle to draw.
+        size (tuple[int, int]): The size of the bottle on screen.
+
+    Returns:
+        pygame.Surface: The water of the bottle over the background color.
+    """
+    water_surface = pygame.Surface((self.water_width, self.water_hight*bottle.capacity))
+    water_surface.fill(colors.BLACK)
+
+    water_seg_count = 0
+    for water_index, water in enumerate(bottle.contents):
+      for i in range(water.amount):
+        rect_vals = (0, self.water_hight*(bottle.capacity-1-water_seg_count), self.water_width, self.water_hight)
+
+        if i + water_index == 0:
+          pygame.draw.rect(water_surface, water.color, rect_vals, border_bottom_left_radius=self.radius, border_bottom_right_radius=self.radius)
+        else:
+          pygame.draw.rect(water_surface, water.color, rect_vals)
+
+        water_seg_count += 1
+
+    if water_surface.get_size() != size:
+      return pygame.transform.smoothscale(water_surface, size)
+
+    return water_surface
+
+  def get_outline_surface(self, capacity: int, color: tuple[int, int, int], size: tuple[int, int]) -> pygame.Surface:
+    key = (capacity, color, size)
+    outline_surface = self._outline_surfaces.get(key)
+    if outline_surface == None:
+      outline_surface = pygame.Surface((self.water_width, self.water_hight*capacity), pygame.SRCALPHA)
+      pygame.draw.rect(outline_surface, color, outline_surface.get_rect(), width=5, border_bottom_left_radius=self.radius, border_bottom_right_radius=self.radius)
+      if outline_surface.get_size() != size:
+        outline_surface = pygame.transform.smoothscale(outline_surface, size)
+
+      # every zoom level has its own sizes, keep only the current ones
+      if len(self._outline_surfaces) > 64:
+        self._outline_surfaces.clear()
+      self._outline_surfaces[key] = outline_surface
+
+    return outline_surface
+
+  def get_wave_geometry(self, index: int, bottle: Bottle) -> tuple[int, int, int]:
+    """
+    Returns:
+        tuple[int, int, int]: The screen x coordinates the top wave starts and ends at and the y coordinate of its middle.
+    """
+    x, y = self._positions[index]
+    offset = y - self.water_hight*(bottle.fill_level-1)
+    start, screen_offset = self.viewport.to_screen((x+25-self.water_width, offset))
+    end, _ = self.viewport.to_screen((x+25, offset))
+    return start, end, screen_offset
+
+  def get_wave_rect(self, index: int, bottle: Bottle) -> pygame.Rect | None:
+    """
+    Returns:
+        pygame.Rect | None: The area the wave of the top water segment can cover or None if the bottle has no visible wave.
+    """
+    if bottle.is_empty() or bottle.get_remaining_capacity() == 0:
+      return None
+
+    start, end, offset = self.get_wave_geometry(index, bottle)
+    margin = math.ceil(WAVE_MARGIN * self.viewport.zoom)
+    return pygame.Rect(start, offset - margin, end - start, margin*2)
+
+  def draw_area(self, surface: pygame.Surface, index: int, bottle: Bottle, area: pygame.Rect) -> None:
+    """
+    Redraws the part of a bottle inside `area`: the background, the water, the top wave and the outline.
+    """
+    bottle_rect = self._screen_rects[index]
+    local_area = area.move(-bottle_rect.x, -bottle_rect.y)
+    outline_color = self._signatures[index][1]
+
+    surface.fill(colors.BLACK, area)
+    surface.blit(self._water_surfaces[index][2], area.topleft, local_area)
+
+    top_water = bottle.get_top_water()
+    if top_water != None and bottle.get_remaining_capacity() != 0:
+      start, _, offset = self.get_wave_geometry(index, bottle)
+      zoom = self.viewport.zoom
+      previous_clip = surface.get_clip()
+      surface.set_clip(area)
+      wave = self.waves.get_wave(top_water)
+      # the wave is built in board coordinates and moved to the screen, so scrolling and zooming reuse the cached polygon
+      # and the wave keeps the phase `draw_bottles` gives it at its board x
+      wave_start = self._positions[index][0] + 25 - self.water_width
+      draw_wave(surface, top_water.color, (start, offset), self.water_width, start=wave_start, shift=wave.shift, amplitude=wave.amplitude, spread=7, zoom=zoom)
+      surface.set_clip(previous_clip)
+
+    surface.blit(self.get_outline_surface(bottle.capacity, outline_color, bottle_rect.size), area.topleft, local_area)
+
+  def draw(self, surface: pygame.Surface, bottles: list[Bottle], selected_bottle_index=-1, hint_move: tuple[int, int] | None = None, profiler: FrameProfiler | None = None) -> list[pygame.Rect]:
+    """
+    Draws the bottles onto the surface, redrawing only what changed since the last call.
+
+    Args:
+        surface (pygame.Surface): The surface (game window) to draw the bottles on.
+        bottles (list[Bottle]): The list of bottle objects to draw.
+        selected_bottle_index (int, optional): The index of the bottle that is selected or -1 if not bottles are selected. Defaults to -1.
+        hint_move (tuple[int, int] | None, optional): The `(from_index, to_index)` bottles to highlight as a hint or None. Defaults to None.
+        profiler (FrameProfiler | None, optional): Times whole bottle redraws as `draw_bottles` and wave only redraws as `waves`. Defaults to None.
+
+    Returns:
+        list[pygame.Rect]: The areas of the surface that were redrawn.
+    """
+    timed = profiler != None and profiler.enabled
+
+    if bottles is not self._bottles or len(bottles) != len(self._positions) or surface.get_width() != self._wrap_width:
+      self.update_layout(bottles, surface.get_width())
+      self._invalidated = True
+
+    if surface.get_size() != (self.viewport.width, self.viewport.height):
+      self.viewport.set_size(*surface.get_size())
+
+    full_redraw = self._invalidated or self.viewport.get_state() != self._view_state
+
+    if full_redraw:
+      self._view_state = self.viewport.get_state()
+      self._visible = self.grid.query_rect(self.viewport.get_world_rect())
+      self._screen_rects = {index: self.get_bottle_rect(index) for index in self._visible}
+      self._signatures = {}
+      self._water_surfaces = {index: self._water_surfaces[index] for index in self._visible if index in self._water_surfaces}
+      self._invalidated = False
+      surface.fill(colors.BLACK)
+
+    surface_rect = surface.get_rect()
+    dirty_rects: list[pygame.Rect] = []
+    for index in self._visible:
+      bottle = bottles[index]
+      if index == selected_bottle_index:
+        outline_color = colors.LIGHT_GRAY
+      elif hint_move != None and index in hint_move:
+        outline_color = colors.YELLOW
+      else:
+        outline_color = colors.GRAY
+
+      signature = (get_bottle_signature(bottle), outline_color)
+      previous_signature = self._signatures.get(index)
+
+      if signature != previous_signature:
+        size = self._screen_rects[index].size
+        water_surface = self._water_surfaces.get(index)
+        if water_surface == None or water_surface[0] != signature[0] or water_surface[1] != size:
+          # a bottle that was drawn before with other contents was poured into or from
+          self._contents_changed |= water_surface != None and water_surface[0] != signature[0]
+          self._water_surfaces[index] = (signature[0], size, self.build_water_surface(bottle, size))
+        self._signatures[index] = signature
+
+        area = self._screen_rects[index]
+        section = "draw_bottles"
+      else:
+        area = self.get_wave_rect(index, bottle)
+        section = "waves"
+
+      if area != None:
+        area = area.clip(surface_rect)
+
+      if area != None and area.width > 0 and area.height > 0:
+        start_time = time.perf_counter() if timed else 0.0
+        self.draw_area(surface, index, bottle, area)
+        dirty_rects.append(area)
+        if timed:
+          profiler.add(section, time.perf_counter() - start_time)
+
+      self.waves.animate(bottle)
+
+    # water segments only leave the board when bottles are poured into or replaced
+    if self._contents_changed:
+      self.waves.retain(bottles)
+      self._contents_changed = False
+
+    if full_redraw:
+      return [surface_rect]
+
+    return dirty_rects
+
+
+class ProfilerOverlay:
+  """
+  Draws the frame rate, p95 frame time and mean time of each section of a `FrameProfiler` in a corner of the screen.
+  The text is only re-rendered every `refresh_frames` frames.
+  """
+
+  def __init__(self, pos: tuple[int, int] = (8, 8), font_size=18, refresh_frames=15) -> None:
+    """
+    Args:
+        pos (tuple[int, int], optional): The x, y coordinates of the top left of the overlay. Defaults to (8, 8).
+        font_size (int, optional): The size of the text. Defaults to 18.
+        refresh_frames (int, optional): The number of frames between text updates. Defaults to 15.
+    """
+    self.pos = pos
+    self.font_size = font_size
+    self.refresh_frames = refresh_frames
+
+    self._font: pygame.font.Font | None = None
+    self._surface: pygame.Surface | None = None
+    self._frames_until_refresh = 0
+    # the overlay never shrinks so a shorter line does not leave old text behind
+    self._size = (0, 0)
+
+  def build_surface(self, profiler: FrameProfiler) -> pygame.Surface:
+    if self._font == None:
+      self._font = pygame.font.SysFont(None, self.font_size)
+
+    lines = [f"{profiler.get_fps():6.1f} fps  p95 {profiler.get_percentile(95) * 1000:6.2f} ms"]
+    for name, seconds in profiler.get_section_means().items():
+      lines.append(f"{name:<14}{seconds * 1000:7.2f} ms")
+
+    line_height = self._font.get_linesize()
+    text_surfaces = [self._font.render(line, True, colors.LIGHT_GRAY) for line in lines]
+    width = max(text_surface.get_width() for text_surface in text_surfaces) + 8
+    self._size = (max(self._size[0], width), max(self._size[1], line_height * len(lines) + 8))
+
+    surface = pygame.Surface(self._size)
+    surface.fill(colors.BLACK)
+    for index, text_surface in enumerate(text_surfaces):
+      surface.blit(text_surface, (4, 4 + index * line_height))
+
+    return surface
+
+  def draw(self, surface: pygame.Surface, profiler: FrameProfiler) -> list[pygame.Rect]:
+    """
+    Args:
+        surface (pygame.Surface): The surface (game window) to draw on.
+        profiler (FrameProfiler): The profiler to show.
+
+    Returns:
+        list[pygame.Rect]: The area of the surface that was drawn or an empty list if nothing was drawn.
+    """
+    if self._frames_until_refresh <= 0 or self._surface == None:
+      self._surface = self.build_surface(profiler)
+      self._frames_until_refresh = self.refresh_frames
+    self._frames_until_refresh -= 1
+
+    return [surface.blit(self._surface, self.pos)]
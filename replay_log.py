@@ -0,0 +1,268 @@
+"""
+An append-only log of played games and a streaming verifier for it.
+
+Every event is a one byte tag followed by a fixed payload (all integers little endian):
+  GAME_TAG     bottle count (u16), capacity (u8), then the `PackedState` data of the starting bottles
+  MOVE_TAG     from index (u16), to index (u16) of a move made with `select_bottle`
+  UNDO_TAG     a `go_back`
+  REDO_TAG     a `go_forward`
+  RESTART_TAG  a `restart_puzzle`
+  END_TAG      solved flag (u8) of the game that just ended
+
+Run `python replay_log.py LOG_FILE` to verify a log.
+"""
+from __future__ import annotations
+from bottle import Bottle
+from packed_state import PackedState
+from typing import BinaryIO, Iterator
+
+import struct
+import sys
+import time
+
+GAME_TAG = 1
+MOVE_TAG = 2
+UNDO_TAG = 3
+REDO_TAG = 4
+RESTART_TAG = 5
+END_TAG = 6
+
+GAME_HEADER = struct.Struct("<BHB")
+MOVE_EVENT = struct.Struct("<BHH")
+END_EVENT = struct.Struct("<BB")
+
+READ_CHUNK_SIZE = 1 << 20
+
+ReplayEvent = tuple[int, object]
+
+class ReplayRecorder:
+  """
+  Appends the events of the games played by a `WaterSortPuzzle` to a binary file.
+  """
+
+  def __init__(self, file: BinaryIO) -> None:
+    """
+    Args:
+        file (BinaryIO): The file to append to.
+    """
+    self.file = file
+    self.game_open = False
+
+  def start_game(self, bottles: list[Bottle]) -> None:
+    state = PackedState.from_bottles(bottles)
+    self.file.write(GAME_HEADER.pack(GAME_TAG, state.bottle_count(), state.capacity))
+    self.file.write(state.data)
+    self.game_open = True
+
+  def record_move(self, from_index: int, to_index: int) -> None:
+    self.file.write(MOVE_EVENT.pack(MOVE_TAG, from_index, to_index))
+
+  def record_undo(self) -> None:
+    self.file.write(bytes([UNDO_TAG]))
+
+  def record_redo(self) -> None:
+    self.file.write(bytes([REDO_TAG]))
+
+  def record_restart(self) -> None:
+    self.file.write(bytes([RESTART_TAG]))
+
+  def end_game(self, solved: bool) -> None:
+    if not self.game_open:
+      return
+
+    self.file.write(END_EVENT.pack(END_TAG, solved))
+    self.game_open = False
+
+
+def read_events(file: BinaryIO) -> Iterator[ReplayEvent]:
+  """
+  Streams the events of a log without reading it all into memory.
+
+  Args:
+      file (BinaryIO): The log to read.
+
+  Yields:
+      Iterator[ReplayEvent]: `(GAME_TAG, PackedState)`, `(MOVE_TAG, (from_index, to_index))`, `(END_TAG, solved)`
+        or `(tag, None)` for the other events.
+  """
+  buffer = b""
+  offset = 0
+
+  while True:
+    chunk = file.read(READ_CHUNK_SIZE)
+    if len(chunk) == 0:
+      break
+
+    buffer = buffer[offset:] + chunk
+    offset = 0
+    end = len(buffer)
+
+    while offset < end:
+      tag = buffer[offset]
+
+      if tag == MOVE_TAG:
+        if offset + MOVE_EVENT.size > end:
+          break
+        _, from_index, to_index = MOVE_EVENT.unpack_from(buffer, offset)
+        offset += MOVE_EVENT.size
+        yield MOVE_TAG, (from_index, to_index)
+
+      elif tag == GAME_TAG:
+        if offset + GAME_HEADER.size > end:
+          break
+        _, bottle_count, capacity = GAME_HEADER.unpack_from(buffer, offset)
+        state_end = offset + GAME_HEADER.size + bottle_count * capacity
+        if state_end > end:
+          break
+        state = PackedState(buffer[offset + GAME_HEADER.size:state_end], capacity)
+        offset = state_end
+        yield GAME_TAG, state
+
+      elif tag == END_TAG:
+        if offset + END_EVENT.size > end:
+          break
+        _, solved = END_EVENT.unpack_from(buffer, offset)
+        offset += END_EVENT.size
+        yield END_TAG, bool(solved)
+
+      elif tag in (UNDO_TAG, REDO_TAG, RESTART_TAG):
+        offset += 1
+        yield tag, None
+
+      else:
+        raise ValueError(f"unknown replay event tag {tag}")
+
+  if offset < len(buffer):
+    raise ValueError("replay log ends with a partial event")
+
+
+class VerifyReport:
+  """
+  The totals of a `verify_replays` run.
+  """
+  def __init__(self) -> None:
+    self.games = 0
+    self.valid_games = 0
+    self.solved_games = 0
+    self.moves = 0
+    self.wall_time = 0.0
+    # (game number, reason) of each invalid game
+    self.errors: list[tuple[int, str]] = []
+
+  def __str__(self) -> str:
+    rate = self.games / self.wall_time if self.wall_time > 0 else 0
+    return f"games={self.games} valid={self.valid_games} solved={self.solved_games} moves={self.moves} time={self.wall_time:.2f}s ({rate:.0f} replays/s)"
+
+
+def verify_replays(events: Iterator[ReplayEvent], max_errors: int = 100) -> VerifyReport:
+  """
+  Replays every logged game through the `move_water_segment` rules. A game is valid if every move,
+  undo and redo was possible and its recorded solved flag matches the final state.
+
+  Only the current state and the undo/redo moves of the current game are kept in memory.
+
+  Args:
+      events (Iterator[ReplayEvent]): The events from `read_events`.
+      max_errors (int, optional): The maximum number of invalid games to keep in the report. Defaults to 100.
+
+  Returns:
+      VerifyReport: The totals of the run.
+  """
+  report = VerifyReport()
+  start_time = time.perf_counter()
+
+  initial_state: PackedState | None = None
+  state: PackedState | None = None
+  undo_moves: list[tuple[int, int, int]] = []
+  redo_moves: list[tuple[int, int]] = []
+  error: str | None = None
+
+  def fail(reason: str) -> None:
+    nonlocal error
+    if error == None:
+      error = reason
+
+  for tag, payload in events:
+    if tag == GAME_TAG:
+      initial_state = state = payload
+      undo_moves = []
+      redo_moves = []
+      error = None
+      report.games += 1
+      continue
+
+    if state == None:
+      raise ValueError("replay event before the first game")
+
+    if tag == MOVE_TAG:
+      from_index, to_index = payload
+      amount = state.get_move_amount(from_index, to_index) if max(from_index, to_index) < state.bottle_count() else 0
+      if amount == 0:
+        fail(f"illegal move {from_index} -> {to_index}")
+        continue
+
+      state = state.pour(from_index, to_index, amount)
+      undo_moves.append((from_index, to_index, amount))
+      redo_moves = []
+      report.moves += 1
+
+    elif tag == UNDO_TAG:
+      if len(undo_moves) == 0:
+        fail("undo with no moves")
+        continue
+
+      from_index, to_index, amount = undo_moves.pop()
+      state = state.pour(to_index, from_index, amount)
+      redo_moves.append((from_index, to_index))
+
+    elif tag == REDO_TAG:
+      if len(redo_moves) == 0:
+        fail("redo with no undone moves")
+        continue
+
+      from_index, to_index = redo_moves.pop()
+      amount = state.get_move_amount(from_index, to_index)
+      if amount == 0:
+        fail(f"illegal redo {from_index} -> {to_index}")
+        continue
+
+      state = state.pour(from_index, to_index, amount)
+      undo_moves.append((from_index, to_index, amount))
+      report.moves += 1
+
+    elif tag == RESTART_TAG:
+      state = initial_state
+      undo_moves = []
+      redo_moves = []
+
+    elif tag == END_TAG:
+      solved = state.is_solved()
+      if payload != solved:
+        fail(f"recorded solved={payload} but the final state is solved={solved}")
+
+      if error == None:
+        report.valid_games += 1
+        if solved:
+          report.solved_games += 1
+      elif len(report.errors) < max_errors:
+        report.errors.append((report.games, error))
+
+  report.wall_time = time.perf_counter() - start_time
+  return report
+
+def main() -> None:
+  if len(sys.argv) != 2:
+    print("usage: python replay_log.py LOG_FILE")
+    sys.exit(2)
+
+  with open(sys.argv[1], "rb") as file:
+    report = verify_replays(read_events(file))
+
+  print(report)
+  for game, reason in report.errors:
+    print(f"game {game}: {reason}")
+
+  sys.exit(0 if report.valid_games == report.games else 1)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+from bottle import Bottle
+from packed_state import PackedState, EMPTY_SLOT
+from helpers.canonical import canonicalize
+from transposition_table import TranspositionTable
+from frontier import Frontier, Move, MovePath
+from typing import Callable
+
+import time
+
+class SolveResult:
+  """
+  The result and statistics of a search made by `solve_state`.
+  """
+  def __init__(self, moves: list[Move] | None, nodes_expanded: int, peak_frontier: int, wall_time: float, budget_exhausted: bool) -> None:
+    """
+    Args:
+        moves (list[Move] | None): The shortest `(from_index, to_index)` move sequence or None if no solution was found.
+        nodes_expanded (int): The number of states expanded by the search.
+        peak_frontier (int): The largest size reached by the search frontier.
+        wall_time (float): The time spent searching in seconds.
+        budget_exhausted (bool): True if the search stopped because of the node or time budget.
+    """
+    self.moves = moves
+    self.nodes_expanded = nodes_expanded
+    self.peak_frontier = peak_frontier
+    self.wall_time = wall_time
+    self.budget_exhausted = budget_exhausted
+
+  def is_solved(self) -> bool:
+    """
+    Returns:
+        bool: True if a solution was found.
+    """
+    return self.moves != None
+
+  def __str__(self) -> str:
+    length = len(self.moves) if self.moves != None else "-"
+    return f"moves={length} expanded={self.nodes_expanded} peak_frontier={self.peak_frontier} time={self.wall_time:.3f}s"
+
+
+def heuristic(state: PackedState) -> int:
+  """
+  An admissible estimate of the moves needed to solve `state`.
+
+  Only a move that pours a whole water segment onto the same color merges two segments,
+  and a move into an empty bottle never does. So the estimate is the number of extra segments
+  plus one move for every color that is not at the bottom of any bottle.
+
+  Args:
+      state (PackedState): The state to estimate.
+
+  Returns:
+      int: A lower bound on the number of moves needed to solve `state`.
+  """
+  capacity = state.capacity
+  data = state.data
+  segment_count = 0
+  color_totals: dict[int, int] = {}
+  bottom_colors: set[int] = set()
+
+  for start in range(0, len(data), capacity):
+    prev = EMPTY_SLOT
+    for slot in data[start:start + capacity]:
+      if slot == EMPTY_SLOT:
+        break
+      if slot != prev:
+        segment_count += 1
+        prev = slot
+      color_totals[slot] = color_totals.get(slot, 0) + 1
+
+    if data[start] != EMPTY_SLOT:
+      bottom_colors.add(data[start])
+
+  solved_segment_count = sum(-(-total // capacity) for total in color_totals.values())
+
+  return segment_count - solved_segment_count + len(color_totals) - len(bottom_colors)
+
+def get_successors(state: PackedState) -> list[tuple[Move, PackedState]]:
+  """
+  Gets the states reachable from `state` in one useful move.
+  Moving a bottle that holds a single water segment into an empty bottle is skipped
+  as it only swaps the two bottles.
+
+  Args:
+      state (PackedState): The state to expand.
+
+  Returns:
+      list[tuple[Move, PackedState]]: The move made and resulting state for each successor.
+  """
+  successors: list[tuple[Move, PackedState]] = []
+  for from_index, to_index, _ in state.legal_moves():
+    if len(state.get_bottle(to_index)) == 0:
+      from_water = state.get_bottle(from_index)
+      if from_water.count(from_water[0]) == len(from_water):
+        continue
+
+    successors.append(((from_index, to_index), state.apply_move(from_index, to_index)))
+
+  return successors
+
+def solve_state(start: PackedState, max_nodes: int | None = 1_000_000, time_limit: float | None = None, canonical = False, table: TranspositionTable | None = None, frontier: Frontier | None = None, cancelled: Callable[[], bool] | None = None) -> SolveResult:
+  """
+  Finds the shortest sequence of moves that solves `start` with an A* search.
+  Pass both a bounded `table` and a bounded `frontier` to bound the memory of the search.
+
+  Args:
+      start (PackedState): The state to solve.
+      max_nodes (int | None, optional): The maximum number of states to expand or None for no limit. Defaults to 1_000_000.
+      time_limit (float | None, optional): The maximum number of seconds to search or None for no limit. Defaults to None.
+      canonical (bool, optional): True to treat states that only differ by bottle order or water ids as the same state, which expands fewer states
+        but costs more per state than it saves on typical boards. Defaults to False.
+      table (TranspositionTable | None, optional): An empty bounded table to keep the best move count of each visited state in
+        or None to keep every visited state in a dict. Defaults to None.
+      frontier (Frontier | None, optional): An empty bounded frontier to keep the states waiting to be expanded in
+        or None to keep them all in memory. Defaults to None.
+      cancelled (Callable[[], bool] | None, optional): Checked before each expansion, the search stops as if out of budget
+        once it returns True (e.g. when another process no longer needs the result). Defaults to None.
+
+  Returns:
+      SolveResult: The solution (if one was found) and the search statistics. If a frontier without a spill file dropped
+        states that could have led to a shorter solution, the solution is returned with `budget_exhausted` set.
+  """
+  start_time = time.perf_counter()
+
+  get_key = canonicalize if canonical else lambda state: state
+
+  # g scores are kept per transposition key while each frontier entry carries its own move path
+  # so the returned moves always use the bottle indices of `start`
+  g_scores: dict[PackedState, int] | TranspositionTable = table if table != None else {}
+  g_scores[get_key(start)] = 0
+
+  # entries are (f, -g, tie breaker, state, path) so deeper states are preferred on equal f
+  if frontier == None:
+    frontier = Frontier()
+  frontier.push((heuristic(start), 0, 0, start, None))
+  counter = 1
+  nodes_expanded = 0
+  peak_frontier = 1
+
+  def make_result(moves: list[Move] | None, budget_exhausted: bool) -> SolveResult:
+    return SolveResult(moves, nodes_expanded, peak_frontier, time.perf_counter() - start_time, budget_exhausted)
+
+  while len(frontier) > 0:
+    _, neg_g, _, state, path = frontier.pop()
+    g = -neg_g
+    # a state evicted from a bounded table is expanded again rather than skipped
+    if g > g_scores.get(get_key(state), g):
+      continue
+
+    if state.is_solved():
+      moves: list[Move] = []
+      while path != None:
+        move, path = path
+        moves.append(move)
+      moves.reverse()
+      return make_result(moves, frontier.dropped_min_f != None and frontier.dropped_min_f < g)
+
+    if max_nodes != None and nodes_expanded >= max_nodes:
+      return make_result(None, True)
+    if time_limit != None and time.perf_counter() - start_time >= time_limit:
+      return make_result(None, True)
+    if cancelled != None and cancelled():
+      return make_result(None, True)
+
+    nodes_expanded += 1
+
+    for move, next_state in get_successors(state):
+      next_g = g + 1
+      next_key = get_key(next_state)
+      if next_g >= g_scores.get(next_key, next_g + 1):
+        continue
+
+      g_scores[next_key] = next_g
+      frontier.push((next_g + heuristic(next_state), -next_g, counter, next_state, (move, path)))
+      counter += 1
+
+    peak_frontier = max(peak_frontier, len(frontier))
+
+  # with states dropped the search did not prove there is no solution
+  return make_result(None, frontier.dropped_min_f != None)
+
+def solve_bottles(bottles: list[Bottle], max_nodes: int | None = 1_000_000, time_limit: float | None = None, canonical = False, table: TranspositionTable | None = None, frontier: Frontier | None = None) -> SolveResult:
+  """
+  Finds the shortest sequence of moves that solves `bottles`. See `solve_state`.
+
+  Args:
+      bottles (list[Bottle]): The bottles to solve.
+      max_nodes (int | None, optional): The maximum number of states to expand or None for no limit. Defaults to 1_000_000.
+      time_limit (float | None, optional): The maximum number of seconds to search or None for no limit. Defaults to None.
+      canonical (bool, optional): True to treat states that only differ by bottle order or water ids as the same state, which expands fewer states
+        but costs more per state than it saves on typical boards. Defaults to False.
+      table (TranspositionTable | None, optional): An empty bounded table to keep the best move count of each visited state in
+        or None to keep every visited state in a dict. Defaults to None.
+      frontier (Frontier | None, optional): An empty bounded frontier to keep the states waiting to be expanded in
+        or None to keep them all in memory. Defaults to None.
+
+  Returns:
+      SolveResult: The solution (if one was found) and the search statistics.
+  """
+  return solve_state(PackedState.from_bottles(bottles), max_nodes=max_nodes, time_limit=time_limit, canonical=canonical, table=table, frontier=frontier)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+from collections import OrderedDict
+from packed_state import PackedState
+
+import sqlite3
+
+class TranspositionTable:
+  """
+  A bounded map from puzzle states to integer scores (e.g. the best known move count).
+
+  At most `max_entries` states are held in memory. When the table is full the least recently
+  used state is evicted, and written to an optional sqlite spill file so it can be found again later.
+  """
+
+  def __init__(self, max_entries: int = 1_000_000, spill_path: str | None = None) -> None:
+    """
+    Args:
+        max_entries (int, optional): The maximum number of states held in memory. Defaults to 1_000_000.
+        spill_path (str | None, optional): The sqlite file evicted states are written to or None to drop them. Defaults to None.
+    """
+    self.max_entries = max(max_entries, 1)
+    self._entries: OrderedDict[PackedState, int] = OrderedDict()
+
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.spills = 0
+
+    self._spill: sqlite3.Connection | None = None
+    if spill_path != None:
+      self._spill = sqlite3.connect(spill_path)
+      self._spill.execute("CREATE TABLE IF NOT EXISTS states (capacity INTEGER, data BLOB, value INTEGER, PRIMARY KEY (capacity, data))")
+
+  def get(self, state: PackedState, default: int | None = None) -> int | None:
+    """
+    Gets the score of a state and marks it as recently used.
+
+    Args:
+        state (PackedState): The state to look up.
+        default (int | None, optional): The value returned if the state is not in the table. Defaults to None.
+
+    Returns:
+        int | None: The score of the state or `default`.
+    """
+    value = self._entries.get(state)
+    if value != None:
+      self._entries.move_to_end(state)
+      self.hits += 1
+      return value
+
+    value = self._load_spilled(state)
+    if value != None:
+      self.hits += 1
+      self._insert(state, value)
+      return value
+
+    self.misses += 1
+    return default
+
+  def put(self, state: PackedState, value: int) -> None:
+    """
+    Sets the score of a state, evicting the least recently used state if the table is full.
+
+    Args:
+        state (PackedState): The state to store.
+        value (int): The score of the state.
+    """
+    if state in self._entries:
+      self._entries[state] = value
+      self._entries.move_to_end(state)
+      return
+
+    self._insert(state, value)
+
+  def _insert(self, state: PackedState, value: int) -> None:
+    self._entries[state] = value
+
+    while len(self._entries) > self.max_entries:
+      evicted_state, evicted_value = self._entries.popitem(last=False)
+      self.evictions += 1
+
+      if self._spill != None:
+        self._spill.execute("INSERT OR REPLACE INTO states VALUES (?, ?, ?)", (evicted_state.capacity, evicted_state.data, evicted_value))
+        self.spills += 1
+
+  def _load_spilled(self, state: PackedState) -> int | None:
+    if self._spill == None:
+      return None
+
+    row = self._spill.execute("SELECT value FROM states WHERE capacity = ? AND data = ?", (state.capacity, state.data)).fetchone()
+    if row == None:
+      return None
+
+    self._spill.execute("DELETE FROM states WHERE capacity = ? AND data = ?", (state.capacity, state.data))
+    return row[0]
+
+  def close(self) -> None:
+    """Closes the spill file (if there is one)."""
+    if self._spill != None:
+      self._spill.close()
+      self._spill = None
+
+  def __contains__(self, state: PackedState) -> bool:
+    # a membership test does not count as a hit or miss, mark the state as recently used or load it from the spill file
+    if state in self._entries:
+      return True
+    if self._spill == None:
+      return False
+
+    return self._spill.execute("SELECT 1 FROM states WHERE capacity = ? AND data = ?", (state.capacity, state.data)).fetchone() != None
+
+  def __getitem__(self, state: PackedState) -> int:
+    value = self.get(state)
+    if value == None:
+      raise KeyError(state)
+
+    return value
+
+  def __setitem__(self, state: PackedState, value: int) -> None:
+    self.put(state, value)
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def __str__(self) -> str:
+    return f"entries={len(self)} hits={self.hits} misses={self.misses} evictions={self.evictions} spills={self.spills}"
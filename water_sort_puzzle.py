@@ -1,19 +1,40 @@
-from bottle import Bottle, move_water_segment, copy_bottles
+from bottle import Bottle, move_water_segment, copy_bottles, get_board_hash, get_bottle_hash
 from helpers.shuffle import shuffle_bottles
 from helpers.bottle_setup import init_bottles, top_off_bottles, WaterColorMap
+from solver import solve_bottles, SolveResult, Move
+from parallel_solver import solve_state_parallel
+from packed_state import PackedState
+from level_pack import LevelPack
+from replay_log import ReplayRecorder
+from move_index import LegalMoveIndex
+from collections import deque
+
+# a move that was made as (from_index, to_index, amount)
+MoveDelta = tuple[int, int, int]
 
 class WaterSortPuzzle:
   """
   A class that maintains the state of the water sort puzzle
   """
 
-  def __init__(self) -> None:
+  def __init__(self, max_history: int | None = None, recorder: ReplayRecorder | None = None) -> None:
+    """
+    Args:
+        max_history (int | None, optional): The maximum number of moves that can be undone or None for no limit. Defaults to None.
+        recorder (ReplayRecorder | None, optional): Logs every game played for `replay_log` to verify. Defaults to None.
+    """
     self.bottles: list[Bottle] = []
     self.init_bottles: list[Bottle] = []
 
-    self.history: list[list[Bottle]] = []
+    # the moves made (undone by `go_back`) and the moves undone (redone by `go_forward`)
+    self.history: deque[MoveDelta] = deque(maxlen=max_history)
+    self.redo_history: list[MoveDelta] = []
 
     self.selected_bottle_index = -1
+    self.recorder = recorder
+    self.move_index = LegalMoveIndex()
+    # the hash of `bottles` (see `get_board_hash`), updated from the two changed bottles after every move
+    self.board_hash = 0
 
   def create_bottles(self, empty_bottle_count: int, colored_bottle_count: int, bottle_capacity: int, water_color_map: WaterColorMap, shuffle_moves: int) -> None:
     """
@@ -26,14 +47,57 @@ class WaterSortPuzzle:
         water_color_map (WaterColorMap): The colors different of the water.
         shuffle_moves (int): The number of times the water segments in the bottles are shuffled.
     """
+    self.end_recording()
     self.selected_bottle_index = -1
-    self.history = []
+    self.history.clear()
+    self.redo_history = []
     
     self.init_bottles = init_bottles(empty_bottle_count, colored_bottle_count, bottle_capacity, water_color_map)
     shuffle_bottles(self.init_bottles, shuffle_moves)
     top_off_bottles(self.init_bottles)
 
     self.bottles = copy_bottles(self.init_bottles)
+    self.move_index.rebuild(self.bottles)
+    self.board_hash = get_board_hash(self.bottles)
+    self._start_recording()
+
+  def load_bottles(self, bottles: list[Bottle]) -> None:
+    """
+    Set up the state to start the water sort puzzle from already generated bottles.
+
+    Args:
+        bottles (list[Bottle]): The starting bottles of the puzzle.
+    """
+    self.end_recording()
+    self.selected_bottle_index = -1
+    self.history.clear()
+    self.redo_history = []
+
+    self.init_bottles = bottles
+    self.bottles = copy_bottles(self.init_bottles)
+    self.move_index.rebuild(self.bottles)
+    self.board_hash = get_board_hash(self.bottles)
+    self._start_recording()
+
+  def _start_recording(self) -> None:
+    if self.recorder != None:
+      self.recorder.start_game(self.bottles)
+
+  def end_recording(self) -> None:
+    """Logs the end of the current game to the recorder (if any)."""
+    if self.recorder != None and len(self.bottles) > 0:
+      self.recorder.end_game(self.is_puzzle_solved())
+
+  def load_level(self, level_pack: LevelPack, level_index: int, water_color_map: WaterColorMap) -> None:
+    """
+    Set up the state to start the water sort puzzle from a level in a level pack, an alternative to `create_bottles`.
+
+    Args:
+        level_pack (LevelPack): The level pack to load from.
+        level_index (int): The index of the level in the pack.
+        water_color_map (WaterColorMap): The colors different of the water.
+    """
+    self.load_bottles(level_pack.get_bottles(level_index, water_color_map))
   
   def select_bottle(self, bottle_index: int) -> None:
     """
@@ -51,12 +115,37 @@ class WaterSortPuzzle:
       self.selected_bottle_index = bottle_index
     
     elif self.selected_bottle_index >= 0 and bottle_index >= 0:
-      tmp_bottles = copy_bottles(self.bottles)
-      suc = move_water_segment(self.bottles[self.selected_bottle_index], self.bottles[bottle_index])
-      if suc:
-        self.history.append(tmp_bottles)
+      move = self.move_water(self.selected_bottle_index, bottle_index)
+      if move != None:
+        self.history.append(move)
+        self.redo_history = []
+        if self.recorder != None:
+          self.recorder.record_move(move[0], move[1])
       
       self.selected_bottle_index = -1
+
+  def move_water(self, from_index: int, to_index: int) -> MoveDelta | None:
+    """
+    Moves the top water segment of one bottle into another (see `move_water_segment`).
+
+    Args:
+        from_index (int): The index of the bottle to remove water from.
+        to_index (int): The index of the bottle to add water to.
+
+    Returns:
+        MoveDelta | None: The move that was made or None if the move was not possible.
+    """
+    from_bottle = self.bottles[from_index]
+    to_bottle = self.bottles[to_index]
+    fill_level = to_bottle.fill_level
+    board_hash = self.board_hash ^ get_bottle_hash(from_index, from_bottle) ^ get_bottle_hash(to_index, to_bottle)
+
+    if not move_water_segment(from_bottle, to_bottle):
+      return None
+
+    self.move_index.update(from_index, to_index)
+    self.board_hash = board_hash ^ get_bottle_hash(from_index, from_bottle) ^ get_bottle_hash(to_index, to_bottle)
+    return (from_index, to_index, to_bottle.fill_level - fill_level)
   
   def is_puzzle_solved(self) -> bool:
     """
@@ -70,19 +159,91 @@ class WaterSortPuzzle:
         return False
     return True
 
+  def get_legal_moves(self) -> list[Move]:
+    """
+    Returns:
+        list[Move]: Every `(from_index, to_index)` move that `select_bottle` would make.
+    """
+    return self.move_index.get_legal_moves()
+
+  def has_legal_moves(self) -> bool:
+    """
+    Returns:
+        bool: True if any move is possible.
+    """
+    return self.move_index.has_legal_moves()
+
+  def is_stuck(self) -> bool:
+    """
+    Checks if the puzzle is unsolved and no move can change more than the order of the bottles,
+    so the only ways forward are `go_back` and `restart_puzzle`.
+
+    Returns:
+        bool: Returns True if the puzzle is stuck else returns False.
+    """
+    return not self.move_index.has_useful_moves() and not self.is_puzzle_solved()
+
   def go_back(self) -> None:
-    """Sets the bottles state to the previous valid move made."""
+    """Undoes the last valid move made."""
     if len(self.history) == 0:
       return
 
-    self.bottles = self.history.pop()
+    from_index, to_index, amount = self.history.pop()
+    from_bottle = self.bottles[from_index]
+    to_bottle = self.bottles[to_index]
+    board_hash = self.board_hash ^ get_bottle_hash(from_index, from_bottle) ^ get_bottle_hash(to_index, to_bottle)
+
+    from_bottle.push_water(to_bottle.pop_water(amount))
+    self.move_index.update(from_index, to_index)
+    self.board_hash = board_hash ^ get_bottle_hash(from_index, from_bottle) ^ get_bottle_hash(to_index, to_bottle)
+
+    self.redo_history.append((from_index, to_index, amount))
+    self.selected_bottle_index = -1
+    if self.recorder != None:
+      self.recorder.record_undo()
+
+  def go_forward(self) -> None:
+    """Redoes the last move undone by `go_back`."""
+    if len(self.redo_history) == 0:
+      return
+
+    from_index, to_index, _ = self.redo_history.pop()
+    move = self.move_water(from_index, to_index)
+    if move != None:
+      self.history.append(move)
+      if self.recorder != None:
+        self.recorder.record_redo()
+
     self.selected_bottle_index = -1
   
   def restart_puzzle(self) -> None:
     """Reset the bottles to there initial state."""
     self.bottles = copy_bottles(self.init_bottles)
+    self.move_index.rebuild(self.bottles)
+    self.board_hash = get_board_hash(self.bottles)
     self.selected_bottle_index = -1
-    self.history = []
+    self.history.clear()
+    self.redo_history = []
+    if self.recorder != None:
+      self.recorder.record_restart()
+
+  def solve(self, max_nodes: int | None = 1_000_000, time_limit: float | None = None, workers: int = 1) -> SolveResult:
+    """
+    Finds the shortest sequence of moves that solves the current bottles.
+
+    Args:
+        max_nodes (int | None, optional): The maximum number of states to expand or None for no limit. Defaults to 1_000_000.
+        time_limit (float | None, optional): The maximum number of seconds to search or None for no limit. Defaults to None.
+        workers (int, optional): The number of worker processes to split the search across (see `solve_state_parallel`)
+          or 1 to search in this process. Defaults to 1.
+
+    Returns:
+        SolveResult: The `(from_index, to_index)` moves to pass to `select_bottle` (if a solution was found) and the search statistics.
+    """
+    if workers > 1:
+      return solve_state_parallel(PackedState.from_bottles(self.bottles), workers=workers, max_nodes=max_nodes, time_limit=time_limit)
+
+    return solve_bottles(self.bottles, max_nodes=max_nodes, time_limit=time_limit)
     
 
 
@@ -1,17 +1,122 @@
+from bottle import Bottle, Water
+from collections import OrderedDict
 import math
 import pygame
 
-def draw_sin_wave(surface: pygame.Surface, width: int, color: tuple[int, int, int], offset: int, shift=0, amplitude=100, frequency=0.02, spread = 1) -> pygame.Rect:
-  points = []
-  
-  for x in range(width):
-    y = int(amplitude * math.sin((frequency * x + shift)/spread) + offset)
-    points.append((x, y))
+SINE_TABLE_SIZE = 4096
+SINE_TABLE = [math.sin(2 * math.pi * i / SINE_TABLE_SIZE) for i in range(SINE_TABLE_SIZE)]
+
+# the wave shift is rounded to one of `PHASE_STEPS` phases per period and the amplitude
+# to a multiple of `AMPLITUDE_STEP` so that animation frames can share cached polygons
+PHASE_STEPS = 512
+AMPLITUDE_STEP = 0.5
+MAX_CACHED_WAVES = 4096
+
+WavePoints = list[tuple[int, int]]
+
+class WaveCache:
+  """
+  A least recently used cache of wave polygons.
+
+  The polygons are built relative to the start of the wave and translated when they are drawn
+  (see `draw_wave`), so the same polygon is reused wherever the wave is on screen.
+  """
+  def __init__(self, max_size: int = MAX_CACHED_WAVES) -> None:
+    self.max_size = max_size
+    self.waves: OrderedDict[tuple, WavePoints] = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+
+  def get_points(self, length: int, start=0, shift=0, amplitude=100, frequency=0.02, spread = 1) -> WavePoints:
+    """
+    Gets the points of a sine wave polygon, from the cache if a wave with the same rounded shift and amplitude was already built.
+
+    Args:
+        length (int): The number of points of the wave.
+        start (int, optional): The x coordinate the wave starts at, which only sets its phase. Defaults to 0.
+        shift (float, optional): The horizontal shift of the wave. Defaults to 0.
+        amplitude (float, optional): The height of the wave. Defaults to 100.
+        frequency (float, optional): The frequency of the wave. Defaults to 0.02.
+        spread (float, optional): Stretches the wave horizontally. Defaults to 1.
+
+    Returns:
+        WavePoints: The points of the wave polygon, starting at (0, 0) and ending at (length - 1, 0).
+    """
+    phase_step = round(shift / spread / (2 * math.pi) * PHASE_STEPS) % PHASE_STEPS
+    # the phase the wave has at `start`, so it looks the same as a wave built from x = 0 and cut at `start`
+    start_index = round(start * frequency / spread / (2 * math.pi) * SINE_TABLE_SIZE) % SINE_TABLE_SIZE
+    amplitude_step = round(amplitude / AMPLITUDE_STEP)
+    key = (length, start_index, phase_step, amplitude_step, frequency, spread)
+
+    points = self.waves.get(key)
+    if points != None:
+      self.waves.move_to_end(key)
+      self.hits += 1
+      return points
+
+    self.misses += 1
+    points = build_wave_points(length, start_index, phase_step, amplitude_step * AMPLITUDE_STEP, frequency, spread)
+
+    self.waves[key] = points
+    if len(self.waves) > self.max_size:
+      self.waves.popitem(last=False)
+
+    return points
+
+def build_wave_points(length: int, start_index: int, phase_step: int, amplitude: float, frequency: float, spread: float) -> WavePoints:
+  """
+  Builds the points of a sine wave polygon from `SINE_TABLE`, relative to the start of the wave.
+
+  Returns:
+      WavePoints: The points of the wave polygon.
+  """
+  table_scale = SINE_TABLE_SIZE / (2 * math.pi)
+  base_index = start_index + phase_step * SINE_TABLE_SIZE / PHASE_STEPS
+  index_step = frequency / spread * table_scale
+  mask = SINE_TABLE_SIZE - 1
+
+  # floored rather than truncated so the points round the same way once they are moved below the top of the screen
+  floor = math.floor
+  points = [(x, floor(amplitude * SINE_TABLE[int(base_index + index_step * x) & mask])) for x in range(length)]
+
+  points[0] = (0, 0)
+  points[-1] = (length - 1, 0)
+
+  return points
+
+wave_cache = WaveCache()
 
-  points[0] = (0, offset)
-  points[-1] = (width - 1, offset)
+def draw_wave(surface: pygame.Surface, color: tuple[int, int, int], position: tuple[int, int], length: int, start=0, shift=0, amplitude=100, frequency=0.02, spread = 1, zoom = 1) -> pygame.Rect:
+  """
+  Draws a filled sine wave starting at `position` using the shared `wave_cache`. See `WaveCache.get_points`.
 
-  return pygame.draw.polygon(surface, color, points)
+  Args:
+      surface (pygame.Surface): The surface to draw the wave on.
+      color (tuple[int, int, int]): The color of the wave.
+      position (tuple[int, int]): The point the wave starts at, at the height of its middle.
+      length (int): The length of the wave before zooming.
+      start (int, optional): The x coordinate the wave starts at before scrolling and zooming, which sets its phase
+        so each wave keeps the phase it has in `draw_sin_wave` wherever it is drawn. Defaults to 0.
+      zoom (float, optional): Scales the wave around `position`. Defaults to 1.
+
+  Returns:
+      pygame.Rect: The pygame Rect of the wave that is drawn onto the surface.
+  """
+  left, top = position
+  points = wave_cache.get_points(length, start=start, shift=shift, amplitude=amplitude, frequency=frequency, spread=spread)
+  if zoom == 1:
+    return pygame.draw.polygon(surface, color, [(left + x, top + y) for x, y in points])
+
+  return pygame.draw.polygon(surface, color, [(left + x*zoom, top + y*zoom) for x, y in points])
+
+def draw_sin_wave(surface: pygame.Surface, width: int, color: tuple[int, int, int], offset: int, start=0, shift=0, amplitude=100, frequency=0.02, spread = 1) -> pygame.Rect:
+  """
+  Draws a filled sine wave from `start` to `width`, with its middle at `offset`. See `draw_wave`.
+
+  Returns:
+      pygame.Rect: The pygame Rect of the wave that is drawn onto the surface.
+  """
+  return draw_wave(surface, color, (start, offset), width - start, start=start, shift=shift, amplitude=amplitude, frequency=frequency, spread=spread)
 
 class WaterWave:
   def __init__(self, shift: float, amplitude: float, amp_increment = 1/5, shift_increment = 1/30) -> None:
@@ -31,3 +136,59 @@ class WaterWave:
   
   def increment_shift(self):
     self.shift += self.shift_increment
+
+
+class WaveAnimator:
+  """
+  The wave animation of each water segment being drawn, kept on the rendering side so the model does not depend on pygame.
+
+  A water segment gets a new wave the first time it is drawn, keeps it while it moves between bottles
+  and loses it once it is no longer in any bottle (see `retain`).
+  """
+
+  def __init__(self) -> None:
+    # id of the water segment -> (the water segment, its wave)
+    self._waves: dict[int, tuple[Water, WaterWave]] = {}
+
+  def get_wave(self, water: Water) -> WaterWave:
+    """
+    Args:
+        water (Water): A water segment.
+
+    Returns:
+        WaterWave: The wave of the water segment.
+    """
+    entry = self._waves.get(id(water))
+    # the water is kept in the entry so its id can not be reused while the entry exists
+    if entry == None or entry[0] is not water:
+      entry = (water, WaterWave(0, 5))
+      self._waves[id(water)] = entry
+
+    return entry[1]
+
+  def animate(self, bottle: Bottle) -> None:
+    """Advances the wave of every water segment in a bottle that is not full."""
+    if bottle.get_remaining_capacity() == 0:
+      return
+
+    for water in bottle.contents:
+      wave = self.get_wave(water)
+      wave.increment_amplitude()
+      wave.increment_shift()
+
+  def retain(self, bottles: list[Bottle]) -> None:
+    """
+    Drops the waves of water segments that are not in `bottles` (e.g. after a restart or a new puzzle).
+
+    Args:
+        bottles (list[Bottle]): Every bottle being drawn.
+    """
+    if len(self._waves) == 0:
+      return
+
+    water_ids = {id(water) for bottle in bottles for water in bottle.contents}
+    if len(water_ids) != len(self._waves) or any(water_id not in water_ids for water_id in self._waves):
+      self._waves = {water_id: entry for water_id, entry in self._waves.items() if water_id in water_ids}
+
+  def __len__(self) -> int:
+    return len(self._waves)